@@ -0,0 +1,103 @@
+# analysis.py
+"""Row analysis for /api/analysis/<id>: regions, people exposed and a
+political-cost estimate.
+
+Regions come from the shared gazetteer (backend/gazetteer.py), so a lookup
+costs about the same however many places it knows. Results are memoized
+per news id in a small LRU. Every entry stores the row fields it was
+computed from and is only used while the row still has them.
+``api_classify`` drops the entry outright, and a worker that missed the
+classify still sees the changed category and recomputes.
+"""
+import threading
+from collections import OrderedDict
+
+from backend.gazetteer import FALLBACK, get_gazetteer
+from backend.scoring import HOST_REGIONS, host_region, scan, scoring_text
+from backend.threats import map_category
+
+MEMO_SIZE = 4096  # analyses kept per process
+# /api/analysis has always placed CNN in the US; the stored threat fields
+# have not, and changing that would re-derive existing rows
+ANALYSIS_HOST_REGIONS = HOST_REGIONS + (("cnn", ("Country", "US")),)
+DEFAULT_POPULATION = 10_000_000  # a place with no population on file
+
+_memo = OrderedDict()  # news id -> (inputs, result)
+_memo_lock = threading.Lock()
+memo_stats = {"hits": 0, "misses": 0}
+
+
+def regions_for(headline, source):
+    """Places named in the headline or URL, else a guess from the host."""
+    gazetteer = get_gazetteer()
+    places = gazetteer.find((headline or "") + " " + (source or ""))
+    if not places:
+        guess = host_region(source, ANALYSIS_HOST_REGIONS)
+        places = [gazetteer.get(guess[1] if guess else FALLBACK)]
+    return places
+
+
+def estimate_exposure(population, severity):
+    # severity 0-100: assume linear percent exposed between 0.1% and 25%
+    pct = 0.001 + (min(100, max(0, severity)) / 100.0) * 0.249
+    return int(population * pct)
+
+
+def estimate_political_loss_pct(severity, category):
+    # simple heuristic: severity-driven percent of a small national budget share
+    base = 0.1  # baseline 0.1%
+    severity_factor = severity / 100.0 * 5.0  # up to +5%
+    category_factor = 0.0
+    if 'Conflict' in category:
+        category_factor = 1.0
+    if 'Economic' in category:
+        category_factor = 0.5
+    return round(min(30.0, base + severity_factor + category_factor), 2)
+
+
+def analyze(row):
+    """Analysis dict for a row with id, headline, source, category and bias."""
+    category = row["category"] or ""
+    # keyword score without the bias bump used for stored threat severity
+    severity, _ = scan(scoring_text(row["headline"], category, row["bias"]))
+    threat_type = map_category(category)
+    places = regions_for(row["headline"], row["source"])
+    population = sum(p.population or DEFAULT_POPULATION for p in places)
+    return {
+        "id": row["id"],
+        "type": threat_type,
+        "citizens_affected": estimate_exposure(population, severity),
+        "regions": [p.name for p in places],
+        "region_details": [
+            {"name": p.name, "iso2": p.iso2, "iso3": p.iso3, "population": p.population} for p in places
+        ],
+        "political_capital_lost_pct": estimate_political_loss_pct(severity, threat_type),
+    }
+
+
+def analysis_for(row):
+    """``analyze(row)``, memoized on the row's id and analysed fields."""
+    inputs = (row["headline"], row["source"], row["category"], row["bias"])
+    with _memo_lock:
+        hit = _memo.get(row["id"])
+        if hit and hit[0] == inputs:
+            _memo.move_to_end(row["id"])
+            memo_stats["hits"] += 1
+            return hit[1]
+        memo_stats["misses"] += 1
+    result = analyze(row)
+    with _memo_lock:
+        _memo[row["id"]] = (inputs, result)
+        _memo.move_to_end(row["id"])
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return result
+
+
+def invalidate(news_id=None):
+    """Forget one row's analysis, or every one when ``news_id`` is None."""
+    with _memo_lock:
+        if news_id is None:
+            _memo.clear()
+        else:
+            _memo.pop(news_id, None)
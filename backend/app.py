@@ -1,15 +1,38 @@
 # app.py
-from flask import Flask, jsonify, request
-import sqlite3
+"""The dashboard API and the React build, served by one Flask app.
+
+``create_app()`` gets a process ready to serve. It migrates the database,
+then starts the collection scheduler and warms the static manifest on
+background threads, so requests are answered from the existing data
+straight away. Modules only the collector or batch jobs need (fetcher with
+feedparser, classifier with numpy) are imported on first use, keeping them
+out of the web process's import time.
+"""
+from flask import Flask, Response, g, has_request_context, jsonify, request
+import base64
+import cProfile
+import io
+import json
+import os
+import pstats
 import threading
 import time
-import schedule
-import feedparser
+import traceback
 from datetime import datetime
-from backend.models import init_db, DB_FILE
+from backend.collector import FEEDS as COLLECTOR_FEEDS
+from backend.models import init_db, insert_news, load_counts, DB_FILE
+from backend.db import connection, pool_stats
+from backend.httpcache import cached_json, data_version, dumps, expire_version
+from backend.scheduler import Scheduler, status as scheduler_status
+from backend.search import FTS_JOIN, FTS_MATCH, SEARCH_ORDER, SNIPPET_SQL, match_expr
+from backend.stream import RETRY_AFTER as STREAM_RETRY_AFTER, get_broadcaster
+from backend.threats import (MATURITY_SQL, THREAT_SELECT, backfill_derived, derive, threat_columns, threat_item,
+                             trend_key)
+from backend import analysis, export, httpcache, metrics, retention, static, timeseries
 
 DB = DB_FILE
-app = Flask(__name__)
+# no built-in /static route: it would shadow the React build's static/ (see serve)
+app = Flask(__name__, static_folder=None)
 
 # ------------------ FEEDS ------------------
 FEEDS = {
@@ -24,73 +47,277 @@ FEEDS = {
     "https://www.theguardian.com/environment/rss": "Environment",
     "https://rss.nytimes.com/services/xml/rss/nyt/Climate.xml": "Environment"
 }
+# backend/collector.py's feeds, uncategorized, in the same scheduled set, so
+# whichever process holds the collection lease fetches all of them
+for _url in COLLECTOR_FEEDS:
+    FEEDS.setdefault(_url, None)
+
+# per-feed fetch interval in seconds; feeds not listed use
+# scheduler.DEFAULT_INTERVAL (10 minutes)
+FEED_INTERVALS = {}
 
 # ------------------ COLLECTOR ------------------
-def fetch_and_store():
-    print("🚀 Fetching at", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+def fetch_and_store(urls=None):
+    """Fetch ``urls`` (default: every feed in FEEDS) and store new items."""
+    # feedparser and the parse pool load with the first collection, not the app
+    from backend.fetcher import fetch_feeds, load_feed_state, save_feed_state
+
+    urls = list(FEEDS) if urls is None else urls
+    print("🚀 Fetching", len(urls), "feeds at", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    start = time.perf_counter()
     try:
-        conn = sqlite3.connect(DB, timeout=10, check_same_thread=False)
-        c = conn.cursor()
-
-        for url, default_category in FEEDS.items():
-            feed = feedparser.parse(url)
-            for entry in feed.entries[:10]:
-                link = getattr(entry, "link", None)
-                title = getattr(entry, "title", "")
+        with connection(DB, readonly=True) as conn:
+            state = load_feed_state(conn)
+
+        # network first: no write lock is held while feeds download
+        with metrics.COLLECT_SECONDS.time("fetch"):
+            results = fetch_feeds(urls, state, max_entries=10)
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = []
+        for res in results:
+            if res["status"] == 304:
+                print(f"⏭️  Not modified: {res['url']}")
+                continue
+            if res["error"]:
+                print(f"⚠️  {res['url']}: {res['error']}")
+                continue
+            default_category = FEEDS[res["url"]]
+            for entry in res["entries"]:
+                link = entry["link"]
+                title = entry["title"]
 
                 if not link:
                     continue
-
-                c.execute("SELECT 1 FROM news WHERE source=?", (link,))
-                if not c.fetchone():
-                    c.execute(
-                        "INSERT INTO news (headline, source, timestamp, category, bias) VALUES (?, ?, ?, ?, ?)",
-                        (title, link, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), default_category, None)
-                    )
-                    print(f"✅ Saved: {title}")
-
-        conn.commit()
-        conn.close()
+                rows.append((title, link, now, default_category, None) + derive(title, link, default_category, None))
+
+        # then one short transaction for the whole cycle
+        with metrics.COLLECT_SECONDS.time("store"), connection(DB) as conn:
+            inserted = insert_news(conn, rows)
+            save_feed_state(conn, results)
+        metrics.COLLECT_ROWS.inc(inserted, "inserted")
+        metrics.COLLECT_ROWS.inc(len(rows) - inserted, "duplicate")
+        if inserted:
+            expire_version(DB)
+            get_broadcaster(DB).notify()
+        print(f"✅ Saved {inserted} new items, skipped {len(rows) - inserted} already stored")
     except Exception as e:
+        metrics.ERRORS.inc(1, "collect")
         print("❌ Error:", e)
-
-def run_scheduler():
-    schedule.every(10).minutes.do(fetch_and_store)
-    while True:
-        schedule.run_pending()
-        time.sleep(5)
+        traceback.print_exc()
+    metrics.COLLECT_SECONDS.observe(time.perf_counter() - start, "total")
+
+scheduler = None
+
+def run_retention():
+    if retention.run(DB)["archived"]:
+        expire_version(DB)
+
+def scheduler_jobs():
+    """Maintenance run by the scheduler's leader: name -> (seconds, fn)."""
+    return {"retention": (retention.INTERVAL, run_retention)}
+
+def start_scheduler():
+    """Start this process's scheduler thread. Every process may call it; the
+    lease in backend/scheduler.py lets only one of them fetch at a time."""
+    global scheduler
+    if scheduler is None:
+        scheduler = Scheduler(DB, FEEDS, fetch_and_store, FEED_INTERVALS, jobs=scheduler_jobs()).start()
+    return scheduler
+
+def warm_static():
+    """Write missing compressed variants of build/ and load its manifest."""
+    if static.precompress():
+        static.get_manifest.cache_clear()
+    static.get_manifest()
+
+def create_app(db_path=None, collect=None):
+    """Migrate ``db_path`` (default DB) and return the app, ready to serve.
+
+    Nothing slow runs before it returns. Feeds never fetched (or overdue)
+    are collected on the scheduler thread's first tick, and build/ is
+    precompressed and indexed on another thread. ``collect`` defaults to
+    true unless GCAI_SCHEDULER=0, for when ``python -m backend.scheduler``
+    runs as its own process.
+    """
+    global DB
+    if db_path is not None:
+        DB = db_path
+    init_db(DB)
+    threading.Thread(target=warm_static, name="static-warmup", daemon=True).start()
+    if collect is None:
+        collect = os.environ.get("GCAI_SCHEDULER", "1") != "0"
+    if collect:
+        start_scheduler()
+    return app
 
 # ------------------ DB HELPER ------------------
-def query_db(query, args=(), one=False):
-    conn = sqlite3.connect(DB)
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute(query, args)
-    rows = cur.fetchall()
-    conn.close()
+def current_version():
+    return data_version(DB)
+
+
+def sql_timer(label=None):
+    """Time a query block in metrics.SQL_SECONDS under ``label`` (default:
+    the endpoint of the current request)."""
+    if label is None:
+        label = request.endpoint if has_request_context() else "other"
+    return metrics.SQL_SECONDS.time(label)
+
+
+def query_db(query, args=(), one=False, label=None):
+    with sql_timer(label), connection(DB, readonly=True) as conn:
+        rows = conn.execute(query, args).fetchall()
     return (rows[0] if rows else None) if one else rows
 
+# ------------------ PAGINATION ------------------
+# Keyset pagination: pages are ordered by (timestamp, id) descending and a
+# cursor is the last row's (timestamp, id), opaque to clients. Unlike OFFSET
+# the cost does not grow with page depth and rows do not shift between
+# pages while ingestion runs.
+# the row-value form lets SQLite seek (timestamp, rowid) indexes directly
+KEYSET_SQL = "(timestamp, id) < (?, ?)"
+
+
+def encode_cursor(row):
+    raw = json.dumps([row["timestamp"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return SQL params for KEYSET_SQL, or raise ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, news_id = json.loads(raw)
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(timestamp, str) or not isinstance(news_id, int):
+        raise ValueError("invalid cursor")
+    return [timestamp, news_id]
+
+
+def next_cursor(rows, limit):
+    return encode_cursor(rows[-1]) if rows and len(rows) == limit else None
+
+# ------------------ METRICS ------------------
+# ``?profile=1`` returns a cProfile summary of the request instead of its
+# body; only in debug mode or with GCAI_PROFILE=1
+PROFILE = os.environ.get("GCAI_PROFILE") == "1"
+PROFILE_LINES = 40
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = None
+    if (PROFILE or app.debug) and request.args.get("profile") == "1":
+        # drop cached bodies so the profile covers the view itself
+        httpcache.clear()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def record_request(response):
+    # streamed bodies (export, SSE) count until the headers are ready
+    rule = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, rule, request.method,
+                                    str(response.status_code))
+    profiler = g.get("profiler")
+    if profiler is None:
+        return response
+    profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+    return Response(out.getvalue(), mimetype="text/plain")
+
+@metrics.register
+def pool_gauges():
+    pools = pool_stats()
+    return [(f"gcai_pool_{key}", f"Connection pool {key}, by database and mode.",
+             [({"pool": name}, snap[key]) for name, snap in pools.items()])
+            for key in ("in_use", "peak_in_use", "idle", "created", "reused", "waited")]
+
+@metrics.register
+def cache_gauges():
+    return [
+        ("gcai_response_cache", "Response cache (backend/httpcache.py) lookups, by result.",
+         [({"result": k}, v) for k, v in httpcache.stats.items()]),
+        ("gcai_analysis_memo", "Analysis memo lookups, by result.",
+         [({"result": k}, v) for k, v in analysis.memo_stats.items()]),
+    ]
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Request, SQL, collection and scheduler timings in Prometheus text."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 # ------------------ ROUTES ------------------
 @app.route("/api/news")
+@cached_json(current_version)
 def api_news():
+    """Latest news rows.
+
+    Pass ``cursor`` (empty for the first page) for keyset pagination; the
+    response is then ``{"items": [...], "next_cursor": ...}``. Without it
+    the legacy ``limit``/``offset`` list is returned.
+
+    ``q`` searches headlines: rows come back best match first (``sort=recent``
+    for newest first), each with a ``snippet`` that wraps the matched terms
+    in ``<mark>``. Search results page with ``offset`` only.
+
+    A ``date`` older than the hot window is read from its monthly archive
+    file (backend/retention.py); search does not cover archived days.
+    """
     date_filter = request.args.get("date")
     limit = int(request.args.get("limit", 10))
     offset = int(request.args.get("offset", 0))
+    cursor = request.args.get("cursor")
+    match = match_expr(request.args.get("q"))
+
+    join, select, order = "", "", "timestamp DESC, news.id DESC"
+    where, params = [], []
+    if match:
+        if cursor is not None:
+            return jsonify({"error": "cursor is not supported with q; use offset"}), 400
+        order = SEARCH_ORDER.get(request.args.get("sort", "relevance"))
+        if order is None:
+            return jsonify({"error": "sort must be relevance or recent"}), 400
+        join, select = FTS_JOIN, f", {SNIPPET_SQL} AS snippet"
+        where.append(FTS_MATCH)
+        params.append(match)
+    if date_filter:
+        where.append("day=?")
+        params.append(date_filter)
+    if cursor:
+        try:
+            params += decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        where.append(KEYSET_SQL)
+        offset = 0
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
 
+    path = DB
     if date_filter:
-        rows = query_db(
-            "SELECT id, headline, source, timestamp, category, bias FROM news WHERE date(timestamp)=? ORDER BY timestamp DESC LIMIT ? OFFSET ?",
-            (date_filter, limit, offset)
-        )
-    else:
-        rows = query_db(
-            "SELECT id, headline, source, timestamp, category, bias FROM news ORDER BY timestamp DESC LIMIT ? OFFSET ?",
-            (limit, offset)
-        )
-    return jsonify([dict(r) for r in rows]), 200
+        with sql_timer("api_news.archive"), connection(DB, readonly=True) as conn:
+            month = retention.archived_month(conn, date_filter)
+        if month:
+            if match:
+                return jsonify({"error": "search does not cover archived days"}), 400
+            path = retention.archive_path(DB, month)
+    with sql_timer(), connection(path, readonly=True) as conn:
+        rows = conn.execute(
+            f"""SELECT news.id AS id, news.headline AS headline, source, timestamp, category, bias{select}
+                FROM news {join} {where_sql} ORDER BY {order} LIMIT ? OFFSET ?""",
+            params + [limit, offset]
+        ).fetchall()
+    if cursor is None:
+        return jsonify([dict(r) for r in rows]), 200
+    return jsonify({"items": [dict(r) for r in rows], "next_cursor": next_cursor(rows, limit)}), 200
 
 @app.route("/api/dates")
+@cached_json(current_version)
 def api_dates():
-    rows = query_db("SELECT DISTINCT date(timestamp) as d FROM news ORDER BY d DESC")
+    # hot days plus the days moved to the archive (backend/retention.py)
+    rows = query_db("""SELECT day AS d FROM news WHERE day IS NOT NULL GROUP BY day
+                       UNION SELECT day FROM archived_days ORDER BY d DESC""")
     return jsonify([r["d"] for r in rows]), 200
 
 @app.route("/api/classify/<int:news_id>", methods=["POST"])
@@ -98,40 +325,102 @@ def api_classify(news_id):
     data = request.json or {}
     category = data.get("category")
     bias = data.get("bias")
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    c.execute("UPDATE news SET category=?, bias=? WHERE id=?", (category, bias, news_id))
-    conn.commit()
-    conn.close()
+    with sql_timer(), connection(DB) as conn:
+        conn.execute("UPDATE news SET category=?, bias=?, label_source='manual' WHERE id=?", (category, bias, news_id))
+        backfill_derived(conn, "id=?", (news_id,))
+    expire_version(DB)
+    analysis.invalidate(news_id)
     return jsonify({"ok": True}), 200
 
+@app.route("/api/classify/batch", methods=["POST"])
+def api_classify_batch():
+    """Label rows stored without a category (backend/classifier.py).
+
+    JSON body (all optional): ``limit`` (rows, default 10000), ``chunk``,
+    ``retrain`` (refit the model from labelled rows first).
+    """
+    from backend import classifier  # numpy, only when a batch is asked for
+
+    data = request.json or {}
+    try:
+        limit = int(data.get("limit", 10_000))
+        chunk = int(data.get("chunk", classifier.CHUNK))
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit and chunk must be integers"}), 400
+    if limit < 1 or chunk < 1:
+        return jsonify({"error": "limit and chunk must be positive"}), 400
+
+    model = classifier.get_model(DB, retrain=bool(data.get("retrain")))
+    if model is None:
+        return jsonify({"error": "not enough labelled rows to train on"}), 409
+    start = time.perf_counter()
+    classified = classifier.classify_backlog(DB, model, chunk, limit)
+    elapsed = time.perf_counter() - start
+    if classified:
+        expire_version(DB)
+        analysis.invalidate()
+    return jsonify({
+        "classified": classified,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(classified / elapsed) if elapsed else None,
+    }), 200
+
+@app.route("/api/stream")
+def api_stream():
+    """Server-Sent Events: ``threat`` items and ``stats`` deltas as rows are
+    ingested. Event ids are news ids; ``Last-Event-ID`` (or ``?lastEventId=``)
+    resumes after that row.
+
+    Each stream holds a server thread, so past stream.MAX_SUBSCRIBERS the
+    answer is 503 with Retry-After; the client polls in the meantime.
+    ``python -m backend.streamserver`` serves this route without the cap."""
+    last = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+    try:
+        last = int(last) if last else None
+    except ValueError:
+        last = None
+    hub = get_broadcaster(DB)
+    position = hub.subscribe()
+    if position is None:
+        rv = jsonify({"error": "too many open streams; poll instead"})
+        rv.headers["Retry-After"] = str(STREAM_RETRY_AFTER)
+        return rv, 503
+    rv = Response(
+        hub.stream(position, last),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # runs when the server closes the response, even if it never iterated it
+    rv.call_on_close(hub.unsubscribe)
+    return rv
+
+@app.route("/api/pool")
+def api_pool():
+    """Connection pool counters per database file and mode."""
+    return jsonify(pool_stats()), 200
+
+@app.route("/api/scheduler")
+def api_scheduler():
+    """Collection lease holder and each feed's last/next run."""
+    with sql_timer(), connection(DB, readonly=True) as conn:
+        data = scheduler_status(conn, FEEDS, FEED_INTERVALS,
+                                {name: job[0] for name, job in scheduler_jobs().items()})
+    data["this_process"] = scheduler.holder if scheduler else None
+    return jsonify(data), 200
+
 # ------------------ NEW: /api/stats ------------------
 @app.route("/api/stats")
+@cached_json(current_version)
 def api_stats():
-    conn = sqlite3.connect(DB)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    # Categories
-    c.execute("SELECT category, COUNT(*) as count FROM news GROUP BY category")
-    categories = {}
-    for row in c.fetchall():
-        key = row["category"] if row["category"] is not None else "Unclassified"
-        categories[key] = row["count"]
+    # maintained incrementally by triggers on news (see models._m4_counts)
+    with sql_timer(), connection(DB, readonly=True) as conn:
+        counts = load_counts(conn)
 
     # Bias = treating as "severity" for now
-    c.execute("SELECT bias, COUNT(*) as count FROM news GROUP BY bias")
-    # coerce NULL/None bias values to a stable string so jsonify won't fail when sorting keys
-    severity = {}
-    for row in c.fetchall():
-        key = row["bias"] if row["bias"] is not None else "Unclassified"
-        severity[key] = row["count"]
-
-    # Total
-    c.execute("SELECT COUNT(*) as total FROM news")
-    total = c.fetchone()["total"]
-
-    conn.close()
+    categories = counts["category"]
+    severity = counts["bias"]
+    total = counts["total"]
+
     return jsonify({
         "categories": categories,
         "severity": severity,
@@ -140,24 +429,13 @@ def api_stats():
 
 # ------------------ NEW: /api/insights ------------------
 @app.route("/api/insights")
+@cached_json(current_version)
 def api_insights():
-    conn = sqlite3.connect(DB)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    c.execute("SELECT category, COUNT(*) as count FROM news GROUP BY category")
-    cats = {}
-    for row in c.fetchall():
-        key = row["category"] if row["category"] is not None else "Unclassified"
-        cats[key] = row["count"]
-
-    c.execute("SELECT bias, COUNT(*) as count FROM news GROUP BY bias")
-    bias = {}
-    for row in c.fetchall():
-        key = row["bias"] if row["bias"] is not None else "Unclassified"
-        bias[key] = row["count"]
-
-    conn.close()
+    with sql_timer(), connection(DB, readonly=True) as conn:
+        counts = load_counts(conn)
+    # syndicated copies of one event count once (models._m8_clusters)
+    cats = counts["story"]
+    bias = counts["bias"]
 
     summary = []
     if cats.get("Conflict", 0) > 5:
@@ -174,153 +452,69 @@ def api_insights():
 
 
 # ------------------ NEW: /api/threats (derived items + server-side filters)
+# query param -> stored column; maturity is evaluated from the row's age in SQL
+THREAT_FILTERS = {
+    "threatType": "threat_type",
+    "locationScope": "location_scope",
+    "locationName": "location_name",
+    "emergency": "emergency",
+    "maturity": f"({MATURITY_SQL})",
+}
+
+def threat_query(q):
+    """FROM-clause join, extra select, ORDER BY, WHERE terms and params for
+    the /api/threats filters in ``q``; raises ValueError for a bad ``sort``
+    or a ``cursor`` combined with ``q``."""
+    match = match_expr(q.get("q"))
+    join, select, order = "", "", "timestamp DESC, news.id DESC"
+    where, params = [], []
+    if match:
+        if q.get("cursor") is not None:
+            raise ValueError("cursor is not supported with q; use offset")
+        order = SEARCH_ORDER.get(q.get("sort", "relevance"))
+        if order is None:
+            raise ValueError("sort must be relevance or recent")
+        join, select = FTS_JOIN, f", {SNIPPET_SQL} AS snippet"
+        where.append(FTS_MATCH)
+        params.append(match)
+    if q.get("group") == "cluster":
+        # the first row of each cluster stands for the story
+        where.append("news.cluster_id IS NULL")
+    for arg, expr in THREAT_FILTERS.items():
+        if q.get(arg):
+            where.append(f"{expr} = ?")
+            params.append(q.get(arg))
+    return join, select, order, where, params
+
 @app.route("/api/threats")
+# maturity is age-dependent, so the ETag also rolls over hourly
+@cached_json(current_version, clock=3600, gzip=True)
 def api_threats():
-    """Return derived threat items computed from news rows.
+    """Return threat items read from the stored derived columns.
 
     Query params supported (all optional):
-      threatType, locationScope, locationName, emergency, maturity, limit, offset
+      threatType, locationScope, locationName, emergency, maturity, limit, offset,
+      cursor (keyset pagination; takes precedence over offset),
+      q (headline search: best match first, or newest with sort=recent;
+         items gain a ``snippet``; offset paging only),
+      group=cluster (one item per near-duplicate story: ``sources`` lists
+         every outlet's link and ``clusterSize`` counts them),
+      format=columnar (parallel arrays instead of item objects; see
+         threats.threat_columns)
+
+    Large responses are gzipped for clients that accept it.
     """
-    # simple helpers
-    def map_category(cat):
-        if not cat:
-            return "Unknown"
-        m = {
-            "Conflict": "Armed Conflict",
-            "Economy": "Economic Collapse",
-            "Environment": "Climate Change",
-            "Technology": "Technology",
-            "Health": "Pandemic & Health",
-            "Climate": "Climate Change",
-        }
-        return m.get(cat, cat)
-
-    def detect_location(headline, source):
-        # naive country/region detection from headline keywords or hostname
-        regions = {
-            "UK": ["UK", "Britain", "Britain's", "British", "England"],
-            "China": ["China", "Chinese", "Taiwan"],
-            "Middle East": ["Gaza", "Israel", "Palestine", "Syria", "Iraq"],
-            "Ukraine": ["Ukraine", "Kiev", "Kyiv"],
-            "US": ["US", "United States", "America", "Washington"],
-            "India": ["India", "Indian"],
-        }
-        for name, kws in regions.items():
-            for kw in kws:
-                if kw.lower() in (headline or "").lower():
-                    return ("Country", name)
-
-        # fallback by hostname
-        try:
-            host = source and source.split("//")[-1].split("/")[0]
-            if host and ("bbc" in host or host.endswith('.co.uk')):
-                return ("Region", "UK")
-            if host and "aljazeera" in host:
-                return ("Region", "Middle East")
-            if host and "nytimes" in host:
-                return ("Country", "US")
-            if host and "reuters" in host:
-                return ("Region", "Global")
-        except Exception:
-            pass
-        return ("Global", "Global")
-
-    def score_severity(headline, category, bias):
-        # deterministic keyword scoring (0-100)
-        text = (headline or "") + " " + (category or "") + " " + (bias or "")
-        text = text.lower()
-        score = 0
-        keywords = {
-            30: ["risk", "risk of", "threat"],
-            40: ["flood", "storm", "typhoon", "hurricane", "drought", "climate"],
-            50: ["disease", "outbreak", "pandemic", "virus", "infection"],
-            60: ["protest", "unrest", "violence", "attack", "killed", "dead", "death"],
-            80: ["war", "invasion", "massacre", "genocide", "collapse", "crisis"]
-        }
-        for pts, kws in keywords.items():
-            for kw in kws:
-                if kw in text:
-                    score = max(score, pts)
-        # bias increases severity slightly
-        if bias and "potential" in bias.lower():
-            score = min(100, score + 5)
-        return score
-
-    def maturity_from(severity, timestamp_str):
-        try:
-            t = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-        except Exception:
-            try:
-                t = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M")
-            except Exception:
-                return "Emerging"
-        age_days = (datetime.now() - t).days
-        if severity >= 80 or (age_days <= 1 and severity >= 60):
-            return "Critical"
-        if severity >= 55 or age_days <= 7:
-            return "Escalating"
-        return "Emerging"
-
-    def emergency_from(severity):
-        if severity >= 75:
-            return "High"
-        if severity >= 50:
-            return "Medium"
-        return "Low"
-
-    # fetch rows
-    rows = query_db("SELECT id, headline, source, timestamp, category, bias FROM news ORDER BY timestamp DESC")
-
-    items = []
-    for r in rows:
-        headline = r["headline"]
-        source = r["source"]
-        category = r["category"]
-        bias = r["bias"]
-        threatType = map_category(category)
-        locationScope, locationName = detect_location(headline, source)
-        severity = score_severity(headline, category, bias)
-        maturity = maturity_from(severity, r["timestamp"])
-        emergency = emergency_from(severity)
-
-        item = {
-            "id": r["id"],
-            "title": headline,
-            "threatType": threatType,
-            "locationScope": locationScope,
-            "locationName": locationName,
-            "emergency": emergency,
-            "maturity": maturity,
-            "severity": severity,
-            "sources": [r["source"]],
-            "time": r["timestamp"],
-            # small deterministic trend sample
-            "trend": [max(0, severity - 5), severity, min(100, severity + 3)],
-        }
-        items.append(item)
-
-    # apply filters from query params
     q = request.args
-    threatType_q = q.get("threatType")
-    locationScope_q = q.get("locationScope")
-    locationName_q = q.get("locationName")
-    emergency_q = q.get("emergency")
-    maturity_q = q.get("maturity")
-
-    def passes(it):
-        if threatType_q and it["threatType"] != threatType_q:
-            return False
-        if locationScope_q and it["locationScope"] != locationScope_q:
-            return False
-        if locationName_q and it["locationName"] != locationName_q:
-            return False
-        if emergency_q and it["emergency"] != emergency_q:
-            return False
-        if maturity_q and it["maturity"] != maturity_q:
-            return False
-        return True
-
-    filtered = [it for it in items if passes(it)]
+    try:
+        join, select, order, where, params = threat_query(q)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    fmt = q.get("format", "items")
+    if fmt not in ("items", "columnar"):
+        return jsonify({"error": "format must be items or columnar"}), 400
+    match = match_expr(q.get("q"))
+    grouped = q.get("group") == "cluster"
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
 
     # pagination
     try:
@@ -332,12 +526,158 @@ def api_threats():
     except Exception:
         offset = 0
 
-    paged = filtered[offset: offset + limit]
-    return jsonify({"total": len(filtered), "items": paged}), 200
+    total = query_db(f"SELECT COUNT(*) AS n FROM news {join} {where_sql}", params, one=True,
+                     label="api_threats.count")["n"]
+
+    page_where, page_params = list(where), list(params)
+    if q.get("cursor"):
+        try:
+            page_params += decode_cursor(q.get("cursor"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        page_where.append(KEYSET_SQL)
+        offset = 0
+    page_where_sql = ("WHERE " + " AND ".join(page_where)) if page_where else ""
+    with sql_timer(), connection(DB, readonly=True) as conn:
+        rows = conn.execute(
+            f"""SELECT {THREAT_SELECT}{select}
+                FROM news {join} {page_where_sql}
+                ORDER BY {order} LIMIT ? OFFSET ?""",
+            page_params + [limit, offset]
+        ).fetchall()
+        series = timeseries.trends(conn, {trend_key(r) for r in rows})
+    cursor = None if match else next_cursor(rows, limit)
+    if fmt == "columnar":
+        payload = threat_columns(rows, series, cluster_sources([r["id"] for r in rows]) if grouped else None)
+        if match:
+            payload["columns"]["snippet"] = [r["snippet"] for r in rows]
+        payload.update(format="columnar", total=total, count=len(rows), next_cursor=cursor)
+        return Response(dumps(payload), mimetype="application/json"), 200
+    items = [threat_item(r, series) for r in rows]
+    if match:
+        for item, r in zip(items, rows):
+            item["snippet"] = r["snippet"]
+    if grouped:
+        merge_cluster_sources(items)
+    return jsonify({"total": total, "items": items, "next_cursor": cursor}), 200
+
+
+def cluster_sources(ids):
+    """Cluster leader id -> links of the later rows in its cluster."""
+    sources = {}
+    if not ids:
+        return sources
+    marks = ", ".join("?" * len(ids))
+    for r in query_db(f"SELECT cluster_id, source FROM news WHERE cluster_id IN ({marks}) ORDER BY id",
+                      list(ids), label="api_threats.clusters"):
+        sources.setdefault(r["cluster_id"], []).append(r["source"])
+    return sources
+
+
+def merge_cluster_sources(items):
+    """Append the links of every later row in each item's cluster."""
+    sources = cluster_sources([item["id"] for item in items])
+    for item in items:
+        item["sources"].extend(sources.get(item["id"], ()))
+        item["clusterSize"] = len(item["sources"])
+
+
+# ------------------ /api/export ------------------
+@app.route("/api/export")
+def api_export():
+    """Stream every row matching the /api/threats filters as NDJSON (one
+    object per line) or CSV (header row first), with the derived threat
+    fields and ``clusterId``.
+
+    Query params: format (ndjson | csv, default ndjson), limit (default
+    all), plus threatType, locationScope, locationName, emergency, maturity,
+    q, sort and group=cluster as in /api/threats. With group=cluster each
+    row also has ``sources`` (every outlet's link in the story; a JSON array
+    in CSV) and ``clusterSize``. The body is gzipped when the client accepts
+    gzip.
+
+    Past export.MAX_EXPORTS running exports the answer is 503 with
+    Retry-After.
+    """
+    q = request.args
+    fmt = q.get("format", "ndjson")
+    if fmt not in export.FORMATS:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    try:
+        join, _, order, where, params = threat_query(q)
+        limit = int(q.get("limit", -1))  # -1: no limit
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    columns = export.columns(q.get("group") == "cluster")
+    sql = f"SELECT {', '.join(columns.values())} FROM news {join} {where_sql} ORDER BY {order} LIMIT ?"
+
+    gzip = "gzip" in request.accept_encodings
+    mimetype, ext = export.FORMATS[fmt]
+    headers = {
+        "Content-Disposition": f'attachment; filename="threats-{datetime.now():%Y%m%d-%H%M}.{ext}"',
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding",
+        # let a proxy pass chunks through as they are produced
+        "X-Accel-Buffering": "no",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    if not export.reserve():
+        rv = jsonify({"error": "too many exports running; retry later"})
+        rv.headers["Retry-After"] = str(export.RETRY_AFTER)
+        return rv, 503
+    rv = Response(export.stream(DB, sql, params + [limit], fmt, gzip, fields=list(columns)),
+                  mimetype=mimetype, headers=headers)
+    # runs when the server closes the response, even if it never iterated it
+    rv.call_on_close(export.release)
+    return rv
+
+
+# ------------------ /api/timeseries ------------------
+@app.route("/api/timeseries")
+# default ranges end "now", so roll the ETag every minute as well
+@cached_json(current_version, clock=60)
+def api_timeseries():
+    """Counts and mean severity per hour or day, from news_series.
+
+    Query params (all optional):
+      bucket (hour | day, default day), from, to (ISO date/datetime; default
+      the last 48 hours or 30 days up to now), threatType, locationName
+      (omit to sum over all; "" selects rows without one)
+    """
+    q = request.args
+    size = q.get("bucket", "day")
+    if size not in timeseries.BUCKETS:
+        return jsonify({"error": "bucket must be hour or day"}), 400
+    try:
+        end = timeseries.parse_time(q["to"]) if q.get("to") else datetime.now()
+        start = timeseries.parse_time(q["from"]) if q.get("from") else end - timeseries.DEFAULT_SPAN[size]
+    except ValueError:
+        return jsonify({"error": "from/to must be ISO dates"}), 400
+    if len(q.get("to", "")) == 10:
+        # a bare end date covers that whole day
+        end = end.replace(hour=23, minute=59, second=59)
+    steps = (end - start) / timeseries.BUCKETS[size][1]
+    if steps < 0:
+        return jsonify({"error": "from must not be after to"}), 400
+    # both ends are included, so a full MAX_POINTS span has one label more
+    if steps > timeseries.MAX_POINTS:
+        return jsonify({"error": f"range must span at most {timeseries.MAX_POINTS} buckets"}), 400
+
+    with sql_timer(), connection(DB, readonly=True) as conn:
+        points = timeseries.series(conn, size, start, end, q.get("threatType"), q.get("locationName"))
+    return jsonify({
+        "bucket": size,
+        "threatType": q.get("threatType"),
+        "locationName": q.get("locationName"),
+        "points": points,
+    }), 200
 
 
 # ------------------ NEW: /api/analysis/<id> ------------------
 @app.route("/api/analysis/<int:news_id>")
+@cached_json(current_version)
 def api_analysis(news_id):
     """Return simple analysis for a given news row id.
 
@@ -347,154 +687,28 @@ def api_analysis(news_id):
          "type": <mapped threat type>,
          "citizens_affected": <int>,
          "regions": ["Region A", ...],
+         "region_details": [{"name", "iso2", "iso3", "population"}, ...],
          "political_capital_lost_pct": <float>
       }
     """
-    row = query_db("SELECT id, headline, source, timestamp, category, bias FROM news WHERE id=?", (news_id,), one=True)
+    row = query_db("SELECT id, headline, source, category, bias FROM news WHERE id=?", (news_id,), one=True)
     if not row:
         return jsonify({"error": "not found"}), 404
+    return jsonify(analysis.analysis_for(row)), 200
 
-    # reuse mapping helpers from above by inlining simplified logic
-    def map_category(cat):
-        if not cat:
-            return "Unknown"
-        m = {
-            "Conflict": "Armed Conflict",
-            "Economy": "Economic Collapse",
-            "Environment": "Climate Change",
-            "Technology": "Technology",
-            "Health": "Pandemic & Health",
-            "Climate": "Climate Change",
-        }
-        return m.get(cat, cat)
-
-    def detect_regions(headline, source):
-        regions = []
-        # naive region detection
-        kws_map = {
-            'US': ['US', 'United States', 'America', 'Washington'],
-            'UK': ['UK', 'Britain', 'British', 'England'],
-            'China': ['China', 'Chinese', 'Beijing'],
-            'India': ['India', 'Indian'],
-            'Middle East': ['Gaza', 'Israel', 'Palestine', 'Syria', 'Iraq'],
-            'Ukraine': ['Ukraine', 'Kyiv', 'Kiev'],
-        }
-        text = (headline or "") + ' ' + (source or '')
-        t = text.lower()
-        for region, kws in kws_map.items():
-            for kw in kws:
-                if kw.lower() in t:
-                    regions.append(region)
-                    break
-        if not regions:
-            # fallback to host-based rough region
-            try:
-                host = source and source.split('//')[-1].split('/')[0]
-                if host:
-                    if 'aljazeera' in host:
-                        regions.append('Middle East')
-                    elif 'bbc' in host or host.endswith('.co.uk'):
-                        regions.append('UK')
-                    elif 'nytimes' in host or 'cnn' in host:
-                        regions.append('US')
-            except Exception:
-                pass
-        if not regions:
-            regions = ['Global']
-        return regions
-
-    def estimate_population_for_regions(regions):
-        # simple lookups (orders of magnitude)
-        pop_map = {
-            'US': 330_000_000,
-            'UK': 67_000_000,
-            'China': 1_400_000_000,
-            'India': 1_380_000_000,
-            'Middle East': 300_000_000,
-            'Ukraine': 44_000_000,
-            'Global': 8_000_000_000,
-        }
-        # return sum of populations for matched regions
-        s = 0
-        for r in regions:
-            s += pop_map.get(r, 10_000_000)
-        return s
-
-    def estimate_exposure(population, severity):
-        # severity 0-100: assume linear percent exposed between 0.1% and 25%
-        pct = 0.001 + (min(100, max(0, severity)) / 100.0) * 0.249
-        return int(population * pct)
-
-    def estimate_political_loss_pct(severity, category):
-        # simple heuristic: severity-driven percent of a small national budget share
-        base = 0.1  # baseline 0.1%
-        severity_factor = severity / 100.0 * 5.0  # up to +5%
-        category_factor = 0.0
-        if 'Conflict' in category:
-            category_factor = 1.0
-        if 'Economic' in category:
-            category_factor = 0.5
-        return round(min(30.0, base + severity_factor + category_factor), 2)
-
-    headline = row['headline']
-    source = row['source']
-    category = row['category'] or ''
-    # derive severity similarly to threats endpoint
-    def score_severity(headline, category, bias):
-        text = (headline or '') + ' ' + (category or '') + ' ' + (bias or '')
-        text = text.lower()
-        score = 0
-        keywords = {
-            30: ['risk', 'risk of', 'threat'],
-            40: ['flood', 'storm', 'typhoon', 'hurricane', 'drought', 'climate'],
-            50: ['disease', 'outbreak', 'pandemic', 'virus', 'infection'],
-            60: ['protest', 'unrest', 'violence', 'attack', 'killed', 'dead', 'death'],
-            80: ['war', 'invasion', 'massacre', 'genocide', 'collapse', 'crisis']
-        }
-        for pts, kws in keywords.items():
-            for kw in kws:
-                if kw in text:
-                    score = max(score, pts)
-        return score
-
-    # sqlite3.Row supports mapping access but not .get
-    bias_val = None
-    try:
-        bias_val = row['bias']
-    except Exception:
-        bias_val = None
-    severity = score_severity(headline, category, bias_val)
-    threat_type = map_category(category)
-    regions = detect_regions(headline, source)
-    population = estimate_population_for_regions(regions)
-    citizens_affected = estimate_exposure(population, severity)
-    political_loss_pct = estimate_political_loss_pct(severity, threat_type)
-
-    return jsonify({
-        'id': news_id,
-        'type': threat_type,
-        'citizens_affected': citizens_affected,
-        'regions': regions,
-        'political_capital_lost_pct': political_loss_pct
-    }), 
-from flask import send_from_directory
-import os
-
-# Serve React frontend
+# Serve React frontend from the in-memory manifest of build/ (backend/static.py);
+# unknown paths get index.html for client-side routing
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    if path != "" and os.path.exists("build/" + path):
-        return send_from_directory('build', path)
-    else:
-        return send_from_directory('build', 'index.html')
-    
+    site = static.get_manifest()
+    asset = site.get(path) or site.get(static.INDEX)
+    if asset is None:
+        return jsonify({"error": "frontend build not found"}), 404
+    return static.response(asset)
+
 
 # ------------------ MAIN ------------------
 if __name__ == "__main__":
-    init_db()
-    fetch_and_store()  # initial run
-    t = threading.Thread(target=run_scheduler, daemon=True)
-    t.start()
-    app.run(host="0.0.0.0", port=5000, debug=False)
+    create_app().run(host="0.0.0.0", port=5000, debug=False)
 
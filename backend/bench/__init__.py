@@ -0,0 +1,7 @@
+"""Benchmarks and load harnesses for the dashboard backend.
+
+Each module is runnable on its own, e.g. ``python -m backend.bench.feeds``.
+``python -m backend.bench.suite`` runs the routes, a threaded load test and
+collection cycles in one go and saves a JSON report to compare later runs
+against; ``python -m backend.bench.corpus`` builds a database to run it on.
+"""
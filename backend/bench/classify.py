@@ -0,0 +1,79 @@
+# bench/classify.py
+"""Batch classifier throughput vs. one POST /api/classify/<id> per row.
+
+Run ``python -m backend.bench.classify [--backlog 500000]``. Builds (and
+caches in ``--dir``) a synthetic database where ``--backlog`` rows have no
+category and about ``--labelled`` rows do, then labels a copy of it.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from backend import app as backend_app
+from backend import classifier, db
+from backend.bench.corpus import CATEGORIES, build_db
+
+
+def ensure_backlog_db(directory, backlog, labelled):
+    path = os.path.join(directory, f"classify-{backlog}-{labelled}.db")
+    if not os.path.exists(path):
+        known = {k: v for k, v in CATEGORIES.items() if k is not None}
+        # weight NULL so that about ``backlog`` of the rows are unlabelled
+        weights = {**known, None: sum(known.values()) * backlog / labelled}
+        start = time.perf_counter()
+        build_db(path, backlog + labelled, categories=weights)
+        print(f"built {path} in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--backlog", type=int, default=500_000)
+    ap.add_argument("--labelled", type=int, default=50_000)
+    ap.add_argument("--chunk", type=int, default=classifier.CHUNK)
+    ap.add_argument("--per-row", type=int, default=1000, help="rows labelled through the old endpoint")
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    args = ap.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    cached = ensure_backlog_db(args.dir, args.backlog, args.labelled)
+    path = cached + ".run"
+    shutil.copyfile(cached, path)
+    try:
+        with db.connection(path, readonly=True) as conn:
+            pending = conn.execute("SELECT COUNT(*) FROM news WHERE category IS NULL").fetchone()[0]
+        print(f"{pending:,} unlabelled rows")
+
+        # old path: one request, connection and commit per row
+        backend_app.DB = path
+        client = backend_app.app.test_client()
+        with db.connection(path, readonly=True) as conn:
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM news WHERE category IS NULL ORDER BY id DESC LIMIT ?", (args.per_row,))]
+        start = time.perf_counter()
+        for news_id in ids:
+            client.post(f"/api/classify/{news_id}", json={"category": "Conflict", "bias": None})
+        elapsed = time.perf_counter() - start
+        print(f"  per-row POST   {len(ids):9,} rows {elapsed:8.2f}s {len(ids) / elapsed:10,.0f} rows/s")
+
+        start = time.perf_counter()
+        model = classifier.get_model(path, retrain=True)
+        print(f"  train          {time.perf_counter() - start:8.2f}s")
+        start = time.perf_counter()
+        n = classifier.classify_backlog(path, model, args.chunk)
+        elapsed = time.perf_counter() - start
+        print(f"  batch (chunk {args.chunk}) {n:9,} rows {elapsed:8.2f}s {n / elapsed:10,.0f} rows/s")
+    finally:
+        db.close_all()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        model_file = classifier.model_path(path)
+        if os.path.exists(model_file):
+            os.remove(model_file)
+
+
+if __name__ == "__main__":
+    main()
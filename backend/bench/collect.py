@@ -0,0 +1,119 @@
+# bench/collect.py
+"""/api/threats latency while a collection cycle runs in the web process.
+
+Serves the app on a threaded local server, keeps ``--clients`` threads
+requesting uncached /api/threats pages, and runs ``fetch_and_store``
+against canned HTML-heavy feeds (bench/feeds.py). This happens once with
+feeds parsed inline on the download threads (``PARSE_WORKERS = 0``, the
+old behaviour) and once with the parse process pool.
+
+    python -m backend.bench.collect --rows 100000 --feeds 24 --items 200
+"""
+import argparse
+import http.client
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from backend import db, fetcher
+from backend.bench.endpoints import ensure_db
+from backend.bench.feeds import FeedHandler, feed_urls, start_server
+from backend.bench.load import percentile, serve
+
+
+def client_loop(port, stop, samples, seed):
+    rnd = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while not stop.is_set():
+        # random offsets keep the response cache out of the measurement
+        path = f"/api/threats?limit=50&offset={rnd.randrange(5000)}"
+        start = time.perf_counter()
+        conn.request("GET", path)
+        conn.getresponse().read()
+        end = time.perf_counter()
+        samples.append((end, (end - start) * 1000))
+    conn.close()
+
+
+def summarize(samples, start, end):
+    window = sorted(ms for t, ms in samples if start <= t <= end)
+    if not window:
+        return "no samples"
+    return (f"n={len(window):5d}  p50 {statistics.median(window):7.2f} ms  "
+            f"p99 {percentile(window, 99):7.2f} ms  max {window[-1]:7.2f} ms")
+
+
+def run(mode_workers, path, urls, args):
+    from backend import app as backend_app
+
+    fetcher.shutdown_parse_pool()
+    fetcher.PARSE_WORKERS = mode_workers
+    if mode_workers:
+        # a long-running server has its pool up already; don't time startup
+        fetcher._get_parse_pool().submit(fetcher.parse_entries, b"<rss/>").result()
+
+    backend_app.DB = path
+    backend_app.FEEDS = {url: "Conflict" for url in urls}
+    server, port = serve(backend_app.app)
+    stop = threading.Event()
+    samples = []
+    clients = [threading.Thread(target=client_loop, args=(port, stop, samples, i))
+               for i in range(args.clients)]
+    for t in clients:
+        t.start()
+
+    time.sleep(args.idle)
+    idle_end = time.perf_counter()
+    backend_app.fetch_and_store()
+    cycle_end = time.perf_counter()
+    stop.set()
+    for t in clients:
+        t.join()
+    server.shutdown()
+
+    label = f"parse pool ({mode_workers} procs)" if mode_workers else "inline parse"
+    print(f"{label}: cycle {cycle_end - idle_end:.2f}s")
+    print(f"  idle     {summarize(samples, idle_end - args.idle, idle_end)}")
+    print(f"  cycle    {summarize(samples, idle_end, cycle_end)}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--feeds", type=int, default=24)
+    ap.add_argument("--items", type=int, default=200, help="items per canned feed")
+    ap.add_argument("--clients", type=int, default=4)
+    ap.add_argument("--idle", type=float, default=3.0, help="seconds measured before the cycle")
+    ap.add_argument("--workers", type=int, default=2, help="parse processes")
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    args = ap.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    cached = ensure_db(args.dir, args.rows)
+    FeedHandler.items_per_feed = args.items
+    FeedHandler.rich = True
+    feed_server, base = start_server()
+    urls = feed_urls(base, args.feeds, 0)
+    try:
+        for workers in (0, args.workers):
+            # fresh copy each time so every feed is new (200, not 304)
+            path = cached + ".collect"
+            shutil.copyfile(cached, path)
+            try:
+                run(workers, path, urls, args)
+            finally:
+                db.close_all()
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+    finally:
+        feed_server.shutdown()
+        fetcher.shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench/columnar.py
+"""/api/threats payload size and encode time, item objects vs columnar.
+
+Run ``python -m backend.bench.columnar [--items 10000]``. The rows are read
+once from the cached bench database. Building and serializing the body is
+then timed for:
+
+* ``items/jsonify``: today's response, a dict per item through Flask's JSON,
+* ``items/orjson``: the same dicts through orjson (for reference),
+* ``columnar/json`` and ``columnar/orjson``: ``threats.threat_columns``
+  with the stdlib encoder and with orjson.
+
+Bytes are shown raw and gzipped, as negotiated by the route. The last lines
+time whole requests (response cache cleared) through the test client.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from flask import jsonify
+
+from backend import app as backend_app, httpcache, timeseries
+from backend.bench.endpoints import ensure_db
+from backend.db import connection
+from backend.threats import THREAT_SELECT, threat_columns, threat_item, trend_key
+
+
+def best_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100_000, help="bench database size")
+    ap.add_argument("--items", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=15)
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    args = ap.parse_args()
+
+    path = ensure_db(args.dir, args.rows)
+    with connection(path, readonly=True) as conn:
+        rows = conn.execute(f"SELECT {THREAT_SELECT} FROM news ORDER BY timestamp DESC, id DESC LIMIT ?",
+                            (args.items,)).fetchall()
+        series = timeseries.trends(conn, {trend_key(r) for r in rows})
+
+    def stdlib(payload):
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    modes = {
+        "items/jsonify": lambda: jsonify({"items": [threat_item(r, series) for r in rows]}).get_data(),
+        "items/orjson": lambda: httpcache.dumps({"items": [threat_item(r, series) for r in rows]}),
+        "columnar/json": lambda: stdlib(threat_columns(rows, series)),
+        "columnar/orjson": lambda: httpcache.dumps(threat_columns(rows, series)),
+    }
+    print(f"{len(rows):,} items, orjson {'installed' if httpcache.orjson else 'missing'}")
+    print(f"{'mode':<16} {'encode ms':>10} {'bytes':>11} {'gzip bytes':>11} {'gzip ms':>8}")
+    with backend_app.app.test_request_context():
+        for name, fn in modes.items():
+            ms, body = best_ms(fn, args.repeat)
+            gz_ms, packed = best_ms(lambda: httpcache.gzip_bytes(body), 5)
+            print(f"{name:<16} {ms:10.1f} {len(body):11,} {len(packed):11,} {gz_ms:8.1f}")
+
+    backend_app.DB = path
+    client = backend_app.app.test_client()
+    print(f"{'request':<48} {'ms':>8} {'bytes on wire':>14}")
+    for query in ("", "&format=columnar"):
+        for headers in ({}, {"Accept-Encoding": "gzip"}):
+            url = f"/api/threats?limit={args.items}{query}"
+
+            def fetch():
+                httpcache.clear()
+                return client.get(url, headers=headers)
+            ms, resp = best_ms(fetch, args.repeat)
+            label = url + (" +gzip" if headers else "")
+            print(f"{label:<48} {ms:8.1f} {len(resp.data):14,}")
+
+
+if __name__ == "__main__":
+    main()
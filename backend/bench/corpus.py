@@ -0,0 +1,149 @@
+# bench/corpus.py
+"""Synthetic news corpus for benchmarks.
+
+Everything is driven by a seeded ``random.Random`` so runs are repeatable.
+Build a database with your own mix from the command line:
+
+    python -m backend.bench.corpus /tmp/news.db --rows 200000 --days 30 \
+        --categories Conflict=70,Economy=20,none=10 --regions Ukraine=5,Gaza=3,none=2
+
+Weights are relative; ``none`` stands for no category, no bias or no place.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from backend import clusters
+from backend.models import INSERT_NEWS_SQL, init_db
+from backend.threats import derive
+
+SUBJECTS = [
+    "Officials", "Markets", "Residents", "Scientists", "Protesters", "Lawmakers",
+    "Farmers", "Investors", "Doctors", "Engineers", "Regulators", "Voters",
+]
+VERBS = [
+    "warn of", "brace for", "respond to", "report", "debate", "assess",
+    "prepare for", "track", "face", "discuss",
+]
+TOPICS = [
+    "storm", "flood risk", "virus outbreak", "border attack", "trade war",
+    "election", "chip shortage", "drought", "bank collapse", "heatwave",
+    "summit", "budget", "protest", "ceasefire talks", "bus strike", "rates",
+]
+PLACES = [
+    "in Gaza", "in Ukraine", "in China", "across the US", "in the UK", "in India",
+    "in Brazil", "in Kenya", "near Kyiv", "in Washington", "in Taiwan", "in Europe",
+    "", "", "",
+]
+# weights for --regions; how each name reads in a headline
+REGIONS = {"Gaza": 1, "Ukraine": 1, "China": 1, "US": 1, "UK": 1, "India": 1, "Brazil": 1, "Kenya": 1,
+           "Kyiv": 1, "Washington": 1, "Taiwan": 1, "Europe": 1, None: 3}
+PLACE_PHRASES = {"US": "across the US", "UK": "in the UK", "Kyiv": "near Kyiv"}
+
+
+def place_phrase(region):
+    if not region:
+        return ""
+    return PLACE_PHRASES.get(region, f"in {region}")
+
+
+def synthetic_headlines(n, seed=42, regions=None):
+    """``regions`` weights the place a headline names (see REGIONS); the
+    default draws uniformly from PLACES, as databases built before did."""
+    rnd = random.Random(seed)
+    places = None
+    if regions is not None:
+        places = iter([place_phrase(r) for r in _weighted(random.Random(seed + 1), regions, n)])
+    return [
+        " ".join(filter(None, (rnd.choice(SUBJECTS), rnd.choice(VERBS), rnd.choice(TOPICS),
+                               rnd.choice(PLACES) if places is None else next(places))))
+        for _ in range(n)
+    ]
+
+
+CATEGORIES = {
+    "Conflict": 45, "Economy": 15, "Environment": 15, "Technology": 12,
+    "Health": 5, "Climate": 2, None: 6,
+}
+BIASES = {None: 80, "Neutral": 12, "Potential Bias": 8}
+HOSTS = [
+    "www.bbc.co.uk", "www.reuters.com", "edition.cnn.com", "www.aljazeera.com",
+    "www.theguardian.com", "www.nytimes.com", "arstechnica.com",
+]
+
+
+def _weighted(rnd, table, n):
+    return rnd.choices(list(table), weights=list(table.values()), k=n)
+
+
+def synthetic_rows(n, seed=42, days=90, categories=CATEGORIES, biases=BIASES, regions=None, end=None):
+    """Yield ``(headline, source, timestamp, category, bias)`` tuples, oldest
+    first, spread evenly over the ``days`` before ``end`` (default: now)."""
+    rnd = random.Random(seed)
+    end = end or datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    step = (end - start) / max(1, n)
+    headlines = synthetic_headlines(n, seed, regions)
+    cats = _weighted(rnd, categories, n)
+    bias = _weighted(rnd, biases, n)
+    for i in range(n):
+        host = rnd.choice(HOSTS)
+        ts = (start + step * i).strftime("%Y-%m-%d %H:%M:%S")
+        yield (headlines[i], f"https://{host}/news/{seed}-{i}", ts, cats[i], bias[i])
+
+
+def build_db(path, rows, seed=42, days=90, **dist):
+    """Create a migrated database at ``path`` filled with ``rows`` synthetic
+    news rows (derived threat fields included)."""
+    if os.path.exists(path):
+        os.remove(path)
+    init_db(path)
+    conn = sqlite3.connect(path)
+    batch = []
+    for row in synthetic_rows(rows, seed, days, **dist):
+        batch.append(row + derive(row[0], row[1], row[3], row[4]))
+        if len(batch) >= 10_000:
+            conn.executemany(INSERT_NEWS_SQL, batch)
+            batch.clear()
+    conn.executemany(INSERT_NEWS_SQL, batch)
+    # insert_news clusters as it goes; bulk loads cluster the recent window once
+    clusters.backfill(conn)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return path
+
+
+def parse_weights(spec):
+    """``"Conflict=3,none=1"`` -> ``{"Conflict": 3.0, None: 1.0}``."""
+    weights = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, sep, weight = part.rpartition("=")
+        if not sep or not name:
+            raise argparse.ArgumentTypeError(f"expected name=weight, got {part!r}")
+        weights[None if name.lower() == "none" else name] = float(weight)
+    return weights
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("path")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--days", type=int, default=90, help="spread rows over the days up to now")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--categories", type=parse_weights, default=CATEGORIES)
+    ap.add_argument("--biases", type=parse_weights, default=BIASES)
+    ap.add_argument("--regions", type=parse_weights, default=None, help="default: uniform over PLACES")
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+    build_db(args.path, args.rows, args.seed, args.days,
+             categories=args.categories, biases=args.biases, regions=args.regions)
+    print(f"built {args.path}: {args.rows:,} rows over {args.days} days in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# bench/endpoints.py
+"""API endpoint latency against synthetic databases of increasing size.
+
+Run ``python -m backend.bench.endpoints [--sizes 10000,100000,1000000]``.
+Databases are cached in ``--dir`` and reused when the row count matches.
+``--drop-indexes`` removes the indexes added by schema migration 3 to show
+the unindexed baseline.
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from backend import app as backend_app
+from backend.bench.corpus import build_db
+from backend.models import init_db
+
+MIGRATION_3_INDEXES = ["idx_news_timestamp", "idx_news_day", "idx_news_category", "idx_news_bias"]
+
+
+def endpoints(conn):
+    """GET urls covering every /api route and its main variants, for rows
+    from the middle of ``conn``'s news table. (/api/stream never completes,
+    and the POST routes write, so those are left to their callers.)"""
+    day, news_id = conn.execute(
+        "SELECT day, id FROM news ORDER BY id LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM news)").fetchone()
+    return [
+        "/api/news",
+        f"/api/news?date={day}",
+        "/api/news?cursor=&limit=50",
+        "/api/news?q=storm",
+        "/api/dates",
+        "/api/stats",
+        "/api/insights",
+        "/api/threats",
+        "/api/threats?threatType=Armed%20Conflict&emergency=High",
+        "/api/threats?q=storm&sort=recent",
+        "/api/threats?group=cluster",
+        "/api/threats?limit=1000&format=columnar",
+        "/api/timeseries?bucket=day",
+        "/api/timeseries?bucket=hour",
+        f"/api/analysis/{news_id}",
+        "/api/export?limit=1000",
+        "/api/export?format=csv&limit=1000",
+        "/api/scheduler",
+        "/api/pool",
+        "/metrics",
+    ]
+
+
+def ensure_db(directory, rows):
+    path = os.path.join(directory, f"bench-{rows}.db")
+    if os.path.exists(path):
+        conn = sqlite3.connect(path)
+        try:
+            if conn.execute("SELECT COUNT(*) FROM news").fetchone()[0] == rows:
+                # cached from an older checkout: bring the schema up to date
+                init_db(path)
+                return path
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+    start = time.perf_counter()
+    build_db(path, rows)
+    print(f"built {path} in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def measure(client, url, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resp = client.get(url)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200, (url, resp.status_code)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    ap.add_argument("--drop-indexes", action="store_true")
+    args = ap.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    client = backend_app.app.test_client()
+    for rows in (int(s) for s in args.sizes.split(",")):
+        path = ensure_db(args.dir, rows)
+        conn = sqlite3.connect(path)
+        for name in MIGRATION_3_INDEXES:
+            if args.drop_indexes:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+        urls = endpoints(conn)
+        conn.close()
+
+        backend_app.DB = path
+        print(f"\n{rows:,} rows{' (no indexes)' if args.drop_indexes else ''}")
+        print(f"  {'endpoint':58} {'p50 ms':>9} {'p95 ms':>9}")
+        for url in urls:
+            p50, p95 = measure(client, url, args.repeat)
+            print(f"  {url:58} {p50:9.2f} {p95:9.2f}")
+        if args.drop_indexes:
+            # the cached file no longer matches schema v3; rebuild next time
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
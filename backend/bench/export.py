@@ -0,0 +1,100 @@
+# bench/export.py
+"""Peak memory and time for pulling every row out of the API.
+
+Each mode runs in a fresh process so that its peak RSS (``ru_maxrss``) is
+its own. Peak RSS includes the database pages SQLite memory-maps
+(``mmap_size``, up to 256 MB), so anonymous memory (``RssAnon``, the Python
+heap) is also sampled while the body is read:
+
+* ``fetchall``: the whole result in one ``query_db`` list plus one JSON
+  body, which is what one huge /api/news page costs,
+* ``paged``: /api/news with limit/offset, as analysts export today
+  (capped at ``--paged`` rows, because deep offsets get slow),
+* ``ndjson`` / ``csv`` / ``ndjson+gzip``: /api/export, streamed.
+
+    python -m backend.bench.export --rows 1000000
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import tempfile
+import time
+
+from backend.bench.endpoints import ensure_db
+
+
+def _peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _anon_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_mode(path, mode, args, out):
+    from backend import app as backend_app
+
+    backend_app.DB = path
+    client = backend_app.app.test_client()
+    # warm the import-time allocations out of the measurement
+    client.get("/api/export?limit=1").close()
+    base = _peak_mb()
+    anon = _anon_mb()
+    start = time.perf_counter()
+    rows = size = 0
+    if mode == "fetchall":
+        result = backend_app.query_db(
+            "SELECT id, headline, source, timestamp, category, bias FROM news ORDER BY timestamp DESC, id DESC")
+        body = json.dumps([dict(r) for r in result])
+        rows, size = len(result), len(body)
+        anon = max(anon, _anon_mb())
+    elif mode == "paged":
+        while rows < args.paged:
+            page = client.get(f"/api/news?limit={args.page}&offset={rows}")
+            got = len(page.json)
+            rows, size = rows + got, size + len(page.data)
+            anon = max(anon, _anon_mb())
+            if got < args.page:
+                break
+    else:
+        fmt, _, gz = mode.partition("+")
+        headers = {"Accept-Encoding": "gzip"} if gz else {}
+        resp = client.get(f"/api/export?format={fmt}", headers=headers, buffered=False)
+        for i, piece in enumerate(resp.iter_encoded()):
+            size += len(piece)
+            if i % 50 == 0:
+                anon = max(anon, _anon_mb())
+        resp.close()
+        rows = args.rows
+    out.put((mode, rows, size, time.perf_counter() - start, base, _peak_mb(), anon))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--paged", type=int, default=100_000, help="rows pulled through /api/news pages")
+    ap.add_argument("--page", type=int, default=1000)
+    ap.add_argument("--modes", default="fetchall,paged,ndjson,csv,ndjson+gzip")
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    args = ap.parse_args()
+
+    path = ensure_db(args.dir, args.rows)
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'mode':<12} {'rows':>9} {'MB out':>8} {'seconds':>8} {'rows/s':>9} {'RSS base':>9} {'RSS peak':>9} {'anon peak':>9}")
+    for mode in args.modes.split(","):
+        out = ctx.Queue()
+        p = ctx.Process(target=run_mode, args=(path, mode, args, out))
+        p.start()
+        mode, rows, size, elapsed, base, peak, anon = out.get()
+        p.join()
+        print(f"{mode:<12} {rows:9,} {size / 1e6:8.1f} {elapsed:8.2f} {rows / elapsed:9,.0f} "
+              f"{base:8.0f}M {peak:8.0f}M {anon:8.0f}M")
+
+
+if __name__ == "__main__":
+    main()
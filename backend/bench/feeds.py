@@ -0,0 +1,135 @@
+# bench/feeds.py
+"""Canned RSS feeds served from a local HTTP server with injected latency.
+
+Run ``python -m backend.bench.feeds`` to compare one collection cycle
+fetched serially vs. concurrently, plus a second (conditional) cycle in
+which every feed answers 304.
+"""
+import argparse
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from backend.fetcher import fetch_feeds
+
+LAST_MODIFIED = formatdate(usegmt=True)
+
+
+def _rich_description(feed_no, i):
+    """An HTML body like real feeds ship, for feedparser's sanitizer to chew on."""
+    paragraphs = "".join(
+        f'<p style="margin:0">Paragraph {p} of <a href="http://example.test/{feed_no}/{i}/{p}" '
+        f'onclick="track()">story {i}</a> with <b>bold</b>, <i>italic</i> and '
+        f'<img src="http://example.test/img/{p}.png" width="1"> inline media.</p>'
+        for p in range(8)
+    )
+    return f"<![CDATA[{paragraphs}<script>var x = {i};</script>]]>"
+
+
+def make_rss(feed_no, items=10, rich=False):
+    entries = "".join(
+        f"""
+    <item>
+      <title>Feed {feed_no} story {i}: storm risk rises in region {i % 7}</title>
+      <link>http://example.test/feed/{feed_no}/story/{i}</link>
+      <description>{_rich_description(feed_no, i) if rich else f"Synthetic item {i} of feed {feed_no}."}</description>
+      <pubDate>{LAST_MODIFIED}</pubDate>
+    </item>"""
+        for i in range(items)
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+  <channel>
+    <title>Bench feed {feed_no}</title>
+    <link>http://example.test/feed/{feed_no}</link>
+    <description>Canned feed for benchmarks</description>{entries}
+  </channel>
+</rss>
+""".encode("utf-8")
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """Serves /feed/<n>?delay=<seconds>, honouring If-None-Match."""
+
+    items_per_feed = 10
+    rich = False  # HTML item bodies (see make_rss)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        try:
+            feed_no = int(parts.path.rstrip("/").split("/")[-1])
+        except ValueError:
+            self.send_error(404)
+            return
+        delay = float(parse_qs(parts.query).get("delay", ["0"])[0])
+        if delay:
+            time.sleep(delay)
+
+        body = make_rss(feed_no, self.items_per_feed, self.rich)
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(host="127.0.0.1", port=0):
+    """Start the feed server on a daemon thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), FeedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def feed_urls(base_url, count, delay):
+    return [f"{base_url}/feed/{i}?delay={delay}" for i in range(count)]
+
+
+def timed_cycle(urls, state=None, max_workers=8):
+    start = time.perf_counter()
+    results = fetch_feeds(urls, state, max_workers=max_workers)
+    return time.perf_counter() - start, results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--feeds", type=int, default=24)
+    ap.add_argument("--delay", type=float, default=0.3, help="injected latency per feed (s)")
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args()
+
+    server, base = start_server()
+    urls = feed_urls(base, args.feeds, args.delay)
+    try:
+        serial, _ = timed_cycle(urls, max_workers=1)
+        concurrent, results = timed_cycle(urls, max_workers=args.workers)
+        state = {r["url"]: (r["etag"], r["modified"]) for r in results}
+        conditional, again = timed_cycle(urls, state, max_workers=args.workers)
+    finally:
+        server.shutdown()
+
+    entries = sum(len(r["entries"]) for r in results)
+    not_modified = sum(1 for r in again if r["status"] == 304)
+    print(f"feeds={args.feeds} delay={args.delay}s workers={args.workers} entries={entries}")
+    print(f"serial      {serial:8.3f}s")
+    print(f"concurrent  {concurrent:8.3f}s  ({serial / concurrent:.1f}x)")
+    print(f"conditional {conditional:8.3f}s  ({not_modified}/{args.feeds} not modified)")
+
+
+if __name__ == "__main__":
+    main()
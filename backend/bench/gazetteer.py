@@ -0,0 +1,96 @@
+# bench/gazetteer.py
+"""Region lookup cost against gazetteer size, plus the /api/analysis memo.
+
+Run ``python -m backend.bench.gazetteer [--rows N]``. The real gazetteer is
+padded with made-up places up to each size. For every size the inverted
+token index (``Gazetteer.find``) is timed against a scan that tries each
+alias in turn, which is how the old ``pop_map``/keyword loops scale.
+"""
+import argparse
+import csv
+import random
+import re
+
+from backend import analysis, gazetteer
+from backend.bench.corpus import HOSTS, synthetic_headlines
+from backend.bench.scoring import timed
+
+SIZES = (6, 50, 205, 1_000, 10_000, 100_000)
+SYLLABLES = ["ka", "lo", "vi", "ren", "mar", "tu", "sha", "dor", "bel", "qui", "zan", "es", "or", "ny"]
+
+
+def real_rows():
+    with open(gazetteer.DATA_FILE, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def padded_rows(size, seed=7):
+    """The real rows (trimmed to ``size``) plus made-up ones up to ``size``."""
+    rows = real_rows()
+    # keep the six original regions first so size 6 is the old table
+    original = ["UK", "China", "Middle East", "Ukraine", "US", "India"]
+    rows.sort(key=lambda r: original.index(r["name"]) if r["name"] in original else len(original))
+    rows = rows[:size]
+    rnd = random.Random(seed)
+    names = {r["name"] for r in rows}
+    while len(rows) < size:
+        name = "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 5))).capitalize()
+        if name in names:
+            continue
+        names.add(name)
+        rows.append({"name": name + "ia", "kind": "country", "iso2": "", "iso3": "",
+                     "population": str(rnd.randint(10_000, 50_000_000)),
+                     "aliases": f"{name} City;Port {name}", "demonyms": name + "ian"})
+    return rows
+
+
+def alias_scan(rows):
+    """One compiled word-boundary regex per alias, all tried on every text."""
+    patterns = []
+    for row in rows:
+        if row["kind"] == "world":
+            continue
+        aliases = [row["name"], *filter(None, row["aliases"].split(";")), *filter(None, row["demonyms"].split(";"))]
+        patterns.append((row["name"], [re.compile(r"(?<!\w)" + re.escape(a) + r"(?!\w)", re.IGNORECASE)
+                                       for a in aliases]))
+
+    def find(text):
+        return [name for name, pats in patterns if any(p.search(text) for p in pats)]
+    return find
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=20_000, help="headlines per measurement")
+    ap.add_argument("--scan-limit", type=int, default=10_000,
+                    help="skip the per-alias scan above this gazetteer size")
+    args = ap.parse_args()
+
+    rnd = random.Random(1)
+    texts = [f"{h} https://{rnd.choice(HOSTS)}/news/{i}" for i, h in enumerate(synthetic_headlines(args.rows))]
+
+    print(f"{'places':>8} {'aliases':>8} {'load ms':>8} {'index us/row':>13} {'scan us/row':>12}")
+    for size in SIZES:
+        rows = padded_rows(size)
+        load, gaz = timed(lambda: gazetteer.Gazetteer(rows))
+        aliases = sum(len(c) for c in gaz._index.values())
+        index, _ = timed(lambda: [gaz.find(t) for t in texts])
+        scan = "-"
+        if size <= args.scan_limit:
+            n = min(args.rows, max(100, 200_000 // size))  # fewer rows for big slow scans
+            find = alias_scan(rows)
+            secs, _ = timed(lambda: [find(t) for t in texts[:n]])
+            scan = f"{secs / n * 1e6:12.1f}"
+        print(f"{size:8,} {aliases:8,} {load * 1e3:8.1f} {index / args.rows * 1e6:13.1f} {scan:>12}")
+
+    # /api/analysis: cold analyses, then memo hits on the same rows
+    rows = [{"id": i, "headline": h, "source": t.split(" ")[-1], "category": "Conflict", "bias": None}
+            for i, (h, t) in enumerate(zip(synthetic_headlines(args.rows), texts))][:analysis.MEMO_SIZE]
+    analysis.invalidate()
+    cold, _ = timed(lambda: [analysis.analysis_for(r) for r in rows])
+    warm, _ = timed(lambda: [analysis.analysis_for(r) for r in rows])
+    print(f"analysis_for  cold {cold / len(rows) * 1e6:6.1f} us/row   memo hit {warm / len(rows) * 1e6:6.1f} us/row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# bench/load.py
+"""Threaded HTTP load test for /api/threats while ingestion writes.
+
+Serves the Flask app on a local threaded WSGI server, hammers it from
+``--clients`` keep-alive client threads, and meanwhile inserts
+``--batch`` synthetic rows every ``--write-interval`` seconds.
+
+    python -m backend.bench.load --rows 100000
+    python -m backend.bench.load --rows 100000 --journal delete --no-pool
+
+The second form approximates the old setup (rollback journal, a fresh
+connection per request) for comparison.
+"""
+import argparse
+import http.client
+import itertools
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from backend import db
+from backend.bench.corpus import synthetic_rows
+from backend.bench.endpoints import ensure_db
+from backend.models import insert_news
+from backend.threats import derive
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return float("nan")
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * pct / 100))]
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def serve(app, host="127.0.0.1"):
+    server = make_server(host, 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_port
+
+
+def client_loop(port, paths, stop, samples, errors, first=0):
+    """Request ``paths`` round-robin from index ``first`` until ``stop``."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    paths = itertools.cycle(paths[first % len(paths):] + paths[:first % len(paths)])
+    while not stop.is_set():
+        path = next(paths)
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+                continue
+        except Exception as e:
+            errors.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        samples.append((time.perf_counter() - start) * 1000)
+    conn.close()
+
+
+def writer_loop(path, stop, batch, interval, seed, written, errors):
+    n = 0
+    while not stop.is_set():
+        rows = [r + derive(r[0], r[1], r[3], r[4])
+                for r in synthetic_rows(batch, seed=seed + n, days=1)]
+        try:
+            with db.connection(path) as conn:
+                written.append(insert_news(conn, rows))
+        except Exception as e:
+            errors.append(repr(e))
+        n += 1
+        stop.wait(interval)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--write-interval", type=float, default=0.2)
+    ap.add_argument("--path", default="/api/threats?limit=50")
+    ap.add_argument("--journal", choices=["wal", "delete"], default="wal")
+    ap.add_argument("--no-pool", action="store_true", help="open a new connection per request")
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    args = ap.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    # run against a copy so the cached database keeps its size
+    path = ensure_db(args.dir, args.rows) + ".load"
+    shutil.copyfile(path[:-len(".load")], path)
+    db.PRAGMAS["journal_mode"] = args.journal.upper()
+    if args.no_pool:
+        db.MAX_IDLE = 0
+    with db.connection(path) as conn:
+        conn.execute(f"PRAGMA journal_mode={args.journal}")
+
+    from backend import app as backend_app
+    backend_app.DB = path
+    server, port = serve(backend_app.app)
+
+    stop = threading.Event()
+    samples, errors, written, write_errors = [], [], [], []
+    threads = [threading.Thread(target=client_loop, args=(port, [args.path], stop, samples, errors))
+               for _ in range(args.clients)]
+    threads.append(threading.Thread(
+        target=writer_loop,
+        args=(path, stop, args.batch, args.write_interval, int(time.time()), written, write_errors)))
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    server.shutdown()
+
+    samples.sort()
+    print(f"{args.path} rows={args.rows:,} clients={args.clients} journal={args.journal} "
+          f"pool={'off' if args.no_pool else 'on'}")
+    print(f"  requests {len(samples)} ({len(samples) / args.duration:.0f}/s), errors {len(errors)}")
+    if samples:
+        print(f"  p50 {statistics.median(samples):.2f} ms  p99 {percentile(samples, 99):.2f} ms  "
+              f"max {samples[-1]:.2f} ms")
+    print(f"  ingested {sum(written)} rows in {len(written)} batches, write errors {len(write_errors)}")
+    for e in (errors + write_errors)[:3]:
+        print("   ", e)
+    print(f"  pools {db.pool_stats()}")
+    db.close_all()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# bench/metrics.py
+"""What the metrics layer costs per request.
+
+Run ``python -m backend.bench.metrics [--rows N]``. Times one
+``Histogram.observe`` and a ``/metrics`` render, then the median latency of
+cheap routes (mostly response-cache hits, where the overhead shows most)
+with the request hooks and SQL timers on and off.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from contextlib import nullcontext
+
+from backend import app as backend_app, metrics
+from backend.bench.endpoints import ensure_db
+
+URLS = ["/api/stats", "/api/dates", "/api/threats?limit=20", "/api/news?limit=20"]
+
+
+def per_call_us(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def median_ms(client, url, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.get(url)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=2000)
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    args = ap.parse_args()
+
+    backend_app.DB = ensure_db(args.dir, args.rows)
+    client = backend_app.app.test_client()
+    app = backend_app.app
+
+    h = metrics.Histogram("bench_seconds", "bench", ("label",))
+    print(f"observe            {per_call_us(lambda: h.observe(0.003, 'x'), 200_000):6.2f} us")
+    for url in URLS:
+        client.get(url)
+    print(f"render /metrics    {per_call_us(metrics.render, 200):6.0f} us "
+          f"({len(metrics.render().splitlines())} lines)")
+
+    hooks = (app.before_request_funcs[None], app.after_request_funcs[None], backend_app.sql_timer)
+    print(f"{'route':<26} {'on ms':>8} {'off ms':>8} {'overhead us':>12}")
+    for url in URLS:
+        on, off = [], []
+        # alternate short rounds so warm-up and drift hit both sides
+        for _ in range(10):
+            on.append(median_ms(client, url, args.repeat // 10))
+            app.before_request_funcs[None], app.after_request_funcs[None] = [], []
+            backend_app.sql_timer = lambda label=None: nullcontext()
+            off.append(median_ms(client, url, args.repeat // 10))
+            app.before_request_funcs[None], app.after_request_funcs[None], backend_app.sql_timer = hooks
+        on, off = statistics.median(on), statistics.median(off)
+        print(f"{url:<26} {on:8.3f} {off:8.3f} {(on - off) * 1000:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
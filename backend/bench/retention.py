@@ -0,0 +1,116 @@
+# bench/retention.py
+"""Database size and query latency as the hot window shrinks.
+
+Run ``python -m backend.bench.retention [--rows N] [--hot 60,30,7]``. A
+copy of the cached bench database is switched to incremental auto-vacuum.
+Rows older than each hot window, measured back from the newest row, are
+then archived. After every step it prints the archive throughput, the main
+file size, and cold latencies (fresh connections, empty response cache)
+of the startup migration check and the main reads. It also prints the
+/api/news latency for a day that now lives in an archive file. /api/stats
+totals must not change.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from backend import app as backend_app, httpcache, retention
+from backend.bench.endpoints import ensure_db
+from backend.db import close_all
+from backend.models import init_db
+
+
+def cold_ms(client, url):
+    close_all()
+    httpcache.clear()
+    httpcache.expire_version()
+    start = time.perf_counter()
+    resp = client.get(url)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert resp.status_code == 200, (url, resp.status_code)
+    return elapsed, resp
+
+
+def file_mb(path):
+    return sum(os.path.getsize(path + ext) for ext in ("", "-wal") if os.path.exists(path + ext)) / 1e6
+
+
+def report(client, path, label, archived_day):
+    close_all()
+    start = time.perf_counter()
+    init_db(path)
+    startup = (time.perf_counter() - start) * 1000
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        hot = conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+    row = [f"{label:<14}", f"{hot:10,}", f"{file_mb(path):8.1f}", f"{startup:8.1f}"]
+    stats = None
+    for url in ("/api/dates", "/api/stats", "/api/threats", "/api/news"):
+        ms, resp = cold_ms(client, url)
+        if url == "/api/stats":
+            stats = resp.json
+        row.append(f"{ms:8.1f}")
+    if archived_day:
+        ms, resp = cold_ms(client, f"/api/news?date={archived_day}&limit=50")
+        assert resp.json, archived_day
+        row.append(f"{ms:8.1f}")
+    else:
+        row.append(f"{'-':>8}")
+    print(" ".join(row))
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--hot", default="60,30,7", help="hot windows in days, applied in turn")
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    args = ap.parse_args()
+
+    source = ensure_db(args.dir, args.rows)
+    work = tempfile.mkdtemp(prefix="retention-", dir=args.dir)
+    path = os.path.join(work, os.path.basename(source))
+    shutil.copy(source, path)
+    backend_app.DB = path
+    client = backend_app.app.test_client()
+    try:
+        with sqlite3.connect(path) as conn:
+            newest, oldest = conn.execute("SELECT MAX(timestamp), MIN(day) FROM news").fetchone()
+        now = datetime.strptime(newest, "%Y-%m-%d %H:%M:%S")
+
+        print(f"{'step':<14} {'hot rows':>10} {'file MB':>8} {'init ms':>8} {'dates':>8} {'stats':>8} "
+              f"{'threats':>8} {'news':>8} {'archived':>8}")
+        before = report(client, path, "original", None)
+        start = time.perf_counter()
+        retention.convert(path)
+        report(client, path, f"convert {time.perf_counter() - start:.1f}s", None)
+
+        for hot_days in (int(d) for d in args.hot.split(",")):
+            start = time.perf_counter()
+            moved, promoted = retention.archive_old(path, hot_days, now=now, budget=float("inf"))
+            archived = time.perf_counter() - start
+            start = time.perf_counter()
+            freed = retention.vacuum(path)
+            retention.analyze(path)
+            compact = time.perf_counter() - start
+            print(f"  hot {hot_days}d: {moved:,} rows archived in {archived:.1f}s "
+                  f"({moved / max(archived, 1e-9):,.0f} rows/s), {promoted} clusters re-led, "
+                  f"{freed:,} pages freed + ANALYZE in {compact:.1f}s")
+            after = report(client, path, f"hot {hot_days}d", oldest)
+            assert after["total"] == before["total"], (before, after)
+            assert after["categories"] == before["categories"], (before, after)
+
+        archives = sorted(os.listdir(retention.archive_dir(path)))
+        total = sum(os.path.getsize(os.path.join(retention.archive_dir(path), a)) for a in archives) / 1e6
+        print(f"archives: {len(archives)} files, {total:.1f} MB; /api/stats totals unchanged")
+    finally:
+        close_all()
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# bench/scheduler.py
+"""Leader election across processes: fetches per feed with N schedulers.
+
+Starts ``--procs`` processes, standing in for gunicorn workers, each
+running the app's scheduler against canned local feeds with a short
+interval. Halfway through, the current leader is killed with SIGKILL. The
+feed server logs every request, and from that log the bench reports:
+
+* fetches per feed against what a single scheduler would make,
+* fetches of the same feed closer together than half its interval
+  (more than one process collecting),
+* the longest gap between fetches of a feed (how long the takeover took).
+
+    python -m backend.bench.scheduler --procs 4 --interval 2 --seconds 20
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+from collections import defaultdict
+
+from backend.bench.feeds import FeedHandler, feed_urls, start_server
+from backend.db import connection
+from backend.models import init_db
+
+requests = []  # (monotonic time, path) for every feed request
+
+
+class LoggingFeedHandler(FeedHandler):
+    def do_GET(self):
+        requests.append((time.monotonic(), self.path))
+        super().do_GET()
+
+
+def worker(path, urls, interval, tick, ttl):
+    from backend import app as backend_app
+    from backend import fetcher
+    from backend.scheduler import Scheduler
+
+    fetcher.PARSE_WORKERS = 0  # keep each process single
+    backend_app.DB = path
+    backend_app.FEEDS = {url: "Conflict" for url in urls}
+    Scheduler(path, backend_app.FEEDS, backend_app.fetch_and_store,
+              {url: interval for url in urls}, tick=tick, ttl=ttl).loop()
+
+
+def leader_pid(path):
+    with connection(path, readonly=True) as conn:
+        row = conn.execute("SELECT holder FROM scheduler_lease").fetchone()
+    return int(row[0].split(":")[1]) if row else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--procs", type=int, default=4)
+    ap.add_argument("--feeds", type=int, default=8)
+    ap.add_argument("--interval", type=float, default=2.0, help="per-feed interval (s)")
+    ap.add_argument("--tick", type=float, default=0.2)
+    ap.add_argument("--ttl", type=float, default=3.0, help="lease lifetime (s)")
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    args = ap.parse_args()
+
+    path = os.path.join(args.dir, "bench-scheduler.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    init_db(path)
+
+    server, base = start_server()
+    server.RequestHandlerClass = LoggingFeedHandler
+    urls = feed_urls(base, args.feeds, 0)
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=worker, args=(path, urls, args.interval, args.tick, args.ttl), daemon=True)
+             for _ in range(args.procs)]
+    killed_at = None
+    try:
+        start = time.monotonic()
+        for p in procs:
+            p.start()
+        time.sleep(args.seconds / 2)
+        pid = leader_pid(path)
+        if pid:
+            os.kill(pid, signal.SIGKILL)
+            killed_at = time.monotonic()
+        time.sleep(args.seconds / 2)
+        end = time.monotonic()
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+            p.join()
+        server.shutdown()
+
+    by_feed = defaultdict(list)
+    for t, feed in requests:
+        by_feed[feed].append(t)
+    # the first cycle waits for the children to import the app
+    first = min(t for t, _ in requests) if requests else end
+    expected = (end - first) / args.interval + 1
+    fetches = [len(by_feed[u.split(base)[1]]) for u in urls]
+    close = sum(1 for ts in by_feed.values() for a, b in zip(ts, ts[1:]) if b - a < args.interval / 2)
+    gaps = [b - a for ts in by_feed.values() for a, b in zip(ts, ts[1:])]
+    print(f"{args.procs} processes, {args.feeds} feeds every {args.interval}s for {end - start:.0f}s "
+          f"(tick {args.tick}s, lease {args.ttl}s); leader killed at {killed_at - start:.1f}s"
+          if killed_at else "no leader found")
+    print(f"  fetches per feed  min {min(fetches)}  max {max(fetches)}  "
+          f"(one scheduler: ~{expected:.0f}, every process: ~{expected * args.procs:.0f})")
+    print(f"  fetches < interval/2 apart: {close}")
+    print(f"  longest gap between fetches of a feed: {max(gaps):.1f}s")
+
+
+if __name__ == "__main__":
+    main()
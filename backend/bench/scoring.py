@@ -0,0 +1,70 @@
+# bench/scoring.py
+"""Compiled keyword matcher vs. the original nested substring loops.
+
+Run ``python -m backend.bench.scoring [--rows N]``.
+"""
+import argparse
+import time
+
+from backend import scoring
+from backend.bench.corpus import synthetic_headlines
+
+# the per-keyword loops that scoring.py replaced, kept here for comparison
+LEGACY_SEVERITY = {
+    30: ["risk", "risk of", "threat"],
+    40: ["flood", "storm", "typhoon", "hurricane", "drought", "climate"],
+    50: ["disease", "outbreak", "pandemic", "virus", "infection"],
+    60: ["protest", "unrest", "violence", "attack", "killed", "dead", "death"],
+    80: ["war", "invasion", "massacre", "genocide", "collapse", "crisis"]
+}
+LEGACY_REGIONS = {
+    "UK": ["UK", "Britain", "Britain's", "British", "England"],
+    "China": ["China", "Chinese", "Taiwan"],
+    "Middle East": ["Gaza", "Israel", "Palestine", "Syria", "Iraq"],
+    "Ukraine": ["Ukraine", "Kiev", "Kyiv"],
+    "US": ["US", "United States", "America", "Washington"],
+    "India": ["India", "Indian"],
+}
+
+
+def legacy_scan(text):
+    t = text.lower()
+    score = 0
+    for pts, kws in LEGACY_SEVERITY.items():
+        for kw in kws:
+            if kw in t:
+                score = max(score, pts)
+    regions = []
+    for name, kws in LEGACY_REGIONS.items():
+        for kw in kws:
+            if kw.lower() in t:
+                regions.append(name)
+                break
+    return score, regions
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100_000)
+    args = ap.parse_args()
+
+    headlines = synthetic_headlines(args.rows)
+    legacy, old = timed(lambda: [legacy_scan(h) for h in headlines])
+    single, new = timed(lambda: [scoring.scan(h) for h in headlines])
+    batch, _ = timed(lambda: scoring.score_batch(headlines))
+    differ = sum(1 for a, b in zip(old, new) if a != b)
+
+    print(f"rows={args.rows}")
+    for name, secs in (("legacy loops", legacy), ("scan()", single), ("score_batch()", batch)):
+        print(f"{name:14} {secs:7.3f}s  {args.rows / secs:12,.0f} rows/s")
+    print(f"rows scored differently (word boundaries, plurals): {differ}")
+
+
+if __name__ == "__main__":
+    main()
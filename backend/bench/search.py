@@ -0,0 +1,84 @@
+# bench/search.py
+"""Headline search: FTS5 MATCH vs. ``LIKE '%term%'`` scans.
+
+"LIKE ms" is a newest-first page, which stops early when the term is
+common but scans the whole table when it is rare; the count columns show
+the full-scan cost either way.
+
+Run ``python -m backend.bench.search [--rows 1000000]``. Uses the cached
+synthetic database from bench/endpoints.py (migrating it builds news_fts).
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from backend.bench.endpoints import ensure_db
+from backend.search import FTS_JOIN, FTS_MATCH, RANK_ORDER, RECENT_ORDER, SNIPPET_SQL, match_expr
+
+TERMS = ["flood", "protest", "bank collapse", "ukraine", "zzzunmatched"]
+
+
+def like_query(conn, term, limit):
+    clauses = " AND ".join("headline LIKE ?" for _ in term.split())
+    return conn.execute(
+        f"SELECT id, headline FROM news WHERE {clauses} ORDER BY timestamp DESC, id DESC LIMIT ?",
+        [f"%{w}%" for w in term.split()] + [limit],
+    ).fetchall()
+
+
+def like_count(conn, term):
+    clauses = " AND ".join("headline LIKE ?" for _ in term.split())
+    return conn.execute(f"SELECT COUNT(*) FROM news WHERE {clauses}",
+                        [f"%{w}%" for w in term.split()]).fetchone()[0]
+
+
+def fts_query(conn, term, limit, order=RANK_ORDER):
+    return conn.execute(
+        f"""SELECT news.id, news.headline, {SNIPPET_SQL} FROM news {FTS_JOIN}
+            WHERE {FTS_MATCH} ORDER BY {order} LIMIT ?""",
+        (match_expr(term), limit),
+    ).fetchall()
+
+
+def fts_count(conn, term):
+    return conn.execute(f"SELECT COUNT(*) FROM news {FTS_JOIN} WHERE {FTS_MATCH}",
+                        (match_expr(term),)).fetchone()[0]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    args = ap.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    conn = sqlite3.connect(ensure_db(args.dir, args.rows))
+    print(f"{args.rows:,} rows, page of {args.limit}, median of {args.repeat}")
+    print(f"  {'term':16} {'matches':>9} {'LIKE ms':>9} {'FTS rank':>9} {'FTS recent':>11} {'LIKE count':>11} {'FTS count':>10}")
+    for term in TERMS:
+        matches = fts_count(conn, term)
+        print(f"  {term:16} {matches:9,} "
+              f"{timed(lambda: like_query(conn, term, args.limit), args.repeat):9.2f} "
+              f"{timed(lambda: fts_query(conn, term, args.limit), args.repeat):9.2f} "
+              f"{timed(lambda: fts_query(conn, term, args.limit, RECENT_ORDER), args.repeat):11.2f} "
+              f"{timed(lambda: like_count(conn, term), args.repeat):11.2f} "
+              f"{timed(lambda: fts_count(conn, term), args.repeat):10.2f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# bench/startup.py
+"""Import time and time to first 200 for the web process.
+
+Run ``python -m backend.bench.startup [--tree DIR]``. ``--tree`` points
+at another checkout (e.g. a ``git worktree`` of an older commit) to
+measure it with the same harness.
+
+* import: ``python -X importtime -c "import backend.app"``, the
+  cumulative time of ``backend.app`` and the backend modules it loads;
+* first 200: spawn a server process the way ``python -m backend.app``
+  starts one, against a copy of the cached bench database, with its feeds
+  pointed at a local feed server that answers after ``--delay`` seconds.
+  The time is from spawn until ``/api/stats`` returns 200. The first
+  collection finishing is timed too, from the server's log.
+"""
+import argparse
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import urllib.request
+
+from backend.bench.endpoints import ensure_db
+from backend.bench.feeds import feed_urls, start_server
+
+# runs in the child: start the app as that tree's backend/app.py __main__
+# does, on a free port
+SERVER = textwrap.dedent("""
+    import sys
+    from backend import app as backend_app, models
+    backend_app.DB = models.DB_FILE = sys.argv[1]
+    backend_app.FEEDS.clear()
+    backend_app.FEEDS.update(dict.fromkeys(sys.argv[3:], "Conflict"))
+    app = backend_app.app
+    if hasattr(backend_app, "create_app"):
+        app = backend_app.create_app()
+    elif hasattr(backend_app, "start_scheduler"):
+        backend_app.init_db(backend_app.DB)
+        backend_app.start_scheduler()
+    else:
+        # the original: one blocking collection before the port is bound
+        models.init_db()
+        backend_app.fetch_and_store()
+    app.run(host="127.0.0.1", port=int(sys.argv[2]), debug=False)
+""")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_times(tree, runs):
+    """Median cumulative ms of backend.app and of each backend module."""
+    totals, modules = [], {}
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend.app"],
+                             cwd=tree, env=dict(os.environ, PYTHONPATH=tree), capture_output=True, text=True).stderr
+        for line in out.splitlines():
+            m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", line)
+            if not m:
+                continue
+            us, name = int(m.group(1)), m.group(2)
+            if name == "backend.app":
+                totals.append(us / 1000)
+            elif name in ("flask", "numpy", "feedparser") or (name.startswith("backend.") and name.count(".") == 1):
+                modules.setdefault(name, []).append(us / 1000)
+    return statistics.median(totals), {k: statistics.median(v) for k, v in modules.items()}
+
+
+def first_200(tree, db, urls, timeout=120):
+    port = free_port()
+    log = tempfile.TemporaryFile("w+")
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-u", "-c", SERVER, db, str(port), *urls],
+                            cwd=tree, env=dict(os.environ, PYTHONPATH=tree), stdout=log, stderr=subprocess.STDOUT)
+    first = collected = None
+    try:
+        while time.perf_counter() - start < timeout:
+            if first is None:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/stats", timeout=5) as resp:
+                        if resp.status == 200:
+                            first = time.perf_counter() - start
+                except OSError:
+                    pass
+            log.seek(0)
+            if collected is None and ("Saved" in log.read()):
+                collected = time.perf_counter() - start
+            if first is not None and collected is not None:
+                break
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+        log.close()
+    return first, collected
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--tree", default=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--feeds", type=int, default=10)
+    ap.add_argument("--delay", type=float, default=2.0, help="seconds each feed takes to answer")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    args = ap.parse_args()
+
+    total, modules = import_times(args.tree, args.runs)
+    # flask alone swings by tens of ms between runs on a busy machine
+    print(f"import backend.app: {total:.1f} ms, {total - modules.get('flask', 0):.1f} ms besides flask "
+          f"(median of {args.runs})")
+    for name, ms in sorted(modules.items(), key=lambda kv: -kv[1]):
+        if ms >= 1:
+            print(f"  {name:<24} {ms:7.1f} ms")
+
+    source = ensure_db(args.dir, args.rows)
+    server, base = start_server()
+    work = tempfile.mkdtemp(dir=args.dir)
+    firsts, collects = [], []
+    try:
+        for _ in range(args.runs):
+            db = os.path.join(work, "startup.db")
+            shutil.copy(source, db)
+            first, collected = first_200(args.tree, db, feed_urls(base, args.feeds, args.delay))
+            firsts.append(first)
+            collects.append(collected)
+            for ext in ("", "-wal", "-shm"):
+                if os.path.exists(db + ext):
+                    os.remove(db + ext)
+    finally:
+        server.shutdown()
+        shutil.rmtree(work)
+    print(f"first 200 from /api/stats: {statistics.median(firsts) * 1000:.0f} ms, "
+          f"first collection done: {statistics.median(collects) * 1000:.0f} ms "
+          f"({args.feeds} feeds answering after {args.delay}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# bench/static.py
+"""Page loads per second for the React build, old route vs manifest.
+
+Run ``python -m backend.bench.static [--seconds S]``. A synthetic CRA-style
+build (index.html, hashed main/chunk JS and CSS, favicon, manifest.json) is
+written to a temp dir and precompressed. A page load fetches index.html and
+every asset it references, as a browser sending
+``Accept-Encoding: gzip, deflate, br`` would:
+
+* cold: an empty browser cache,
+* warm: a repeat visit. Cached ``no-cache`` files are revalidated with
+  If-None-Match, and ``immutable`` ones are not requested at all.
+
+``legacy`` is the old ``serve()`` (``os.path.exists`` plus
+``send_from_directory`` per request); ``manifest`` is backend/static.py.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from flask import Flask, send_from_directory
+
+from backend import static
+
+ASSETS = {
+    "static/js/main.3f2a1b9c.js": 620_000,
+    "static/js/787.1a2b3c4d.chunk.js": 48_000,
+    "static/css/main.9e8d7c6b.css": 38_000,
+    "favicon.ico": 3_870,
+    "manifest.json": 492,
+}
+WORDS = ["function", "return", "const", "props", "state", "useEffect", "null", "this", "map", "filter",
+         "className", "children", "value", "onClick", "div", "span", "severity", "threat", "=>", "{", "}"]
+
+
+def make_build(root, seed=3):
+    rnd = random.Random(seed)
+    for name, size in ASSETS.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        words = []
+        while sum(map(len, words)) + len(words) < size:
+            words.append(rnd.choice(WORDS) + (str(rnd.randint(0, 999)) if rnd.random() < 0.3 else ""))
+        with open(path, "w") as f:
+            f.write(" ".join(words)[:size])
+    tags = "".join(f'<script defer src="/{n}"></script>' if n.endswith(".js") else f'<link href="/{n}">'
+                   for n in ASSETS)
+    with open(os.path.join(root, "index.html"), "w") as f:
+        f.write(f"<!doctype html><html><head><title>GCAI</title>{tags}</head>"
+                f"<body><div id=root></div>{' ' * 1500}</body></html>")
+
+
+def legacy_app(root):
+    app = Flask(__name__, static_folder=None)
+
+    @app.route("/", defaults={"path": ""})
+    @app.route("/<path:path>")
+    def serve(path):
+        if path != "" and os.path.exists(os.path.join(root, path)):
+            return send_from_directory(root, path)
+        return send_from_directory(root, "index.html")
+    return app
+
+
+def manifest_app(root):
+    app = Flask(__name__, static_folder=None)
+    site = static.Manifest(root)
+
+    @app.route("/", defaults={"path": ""})
+    @app.route("/<path:path>")
+    def serve(path):
+        return static.response(site.get(path) or site.get(static.INDEX))
+    return app
+
+
+class Browser:
+    def __init__(self, client):
+        self.client = client
+        self.cache = {}  # url -> (etag, immutable)
+        self.requests = self.bytes = 0
+
+    def get(self, url):
+        headers = {"Accept-Encoding": "gzip, deflate, br"}
+        cached = self.cache.get(url)
+        if cached:
+            if cached[1]:
+                return
+            headers["If-None-Match"] = cached[0]
+        resp = self.client.get(url, headers=headers)
+        body = resp.get_data()
+        self.requests += 1
+        self.bytes += len(body)
+        etag = resp.headers.get("ETag")
+        if etag:
+            self.cache[url] = (etag, "immutable" in resp.headers.get("Cache-Control", ""))
+
+    def load(self):
+        self.get("/")
+        for name in ASSETS:
+            self.get("/" + name)
+
+
+def measure(app, warm, seconds):
+    client = app.test_client()
+    browser = Browser(client)
+    if warm:
+        browser.load()
+    loads, requests, sent = 0, 0, 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        if not warm:
+            browser = Browser(client)
+        before = browser.requests, browser.bytes
+        browser.load()
+        loads += 1
+        requests += browser.requests - before[0]
+        sent += browser.bytes - before[1]
+    elapsed = time.perf_counter() - start
+    return loads / elapsed, requests / loads, sent / loads
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--seconds", type=float, default=5.0)
+    args = ap.parse_args()
+
+    root = tempfile.mkdtemp(prefix="build-")
+    try:
+        make_build(root)
+        raw = sum(os.path.getsize(os.path.join(root, n)) for n in [*ASSETS, "index.html"])
+        written = static.precompress(root)
+        print(f"build: {raw / 1e3:.0f} kB in {len(ASSETS) + 1} files, {written} variants written "
+              f"({'br+gzip' if static.brotli else 'gzip only; brotli not installed'})")
+        print(f"{'server':<10} {'visit':<6} {'loads/s':>9} {'reqs/load':>10} {'kB/load':>9}")
+        for name, make in (("legacy", legacy_app), ("manifest", manifest_app)):
+            app = make(root)
+            for warm in (False, True):
+                rate, reqs, sent = measure(app, warm, args.seconds)
+                print(f"{name:<10} {'warm' if warm else 'cold':<6} {rate:9.0f} {reqs:10.1f} {sent / 1e3:9.1f}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
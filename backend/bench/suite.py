@@ -0,0 +1,347 @@
+# bench/suite.py
+"""The backend end to end in one reproducible run, saved as a JSON report.
+
+    python -m backend.bench.suite --rows 100000 --out before.json
+    python -m backend.bench.suite --rows 100000 --out after.json --baseline before.json
+    python -m backend.bench.suite --compare after.json --baseline before.json
+
+A run works on a copy of the cached synthetic database (bench/corpus.py;
+``--db`` uses another file, e.g. one built with ``python -m
+backend.bench.corpus``) and has three stages:
+
+* routes: each GET url from ``endpoints.endpoints`` (every /api route but
+  the never-ending /api/stream) through Flask's test client, ``--repeat``
+  times with the response cache cleared first (uncached) and ``--repeat``
+  times warm (cached); then POST /api/classify/<id>, which writes;
+* load: ``--clients`` keep-alive threads cycling over the same urls on a
+  local threaded server for ``--duration`` seconds;
+* collect: ``fetch_and_store`` against ``--feeds`` canned feeds
+  (bench/feeds.py), each full cycle followed by a conditional one in which
+  every feed answers 304; medians of ``--cycles``.
+
+The report holds requests per second, p50/p95/p99 latency in ms, the peak
+RSS (``ru_maxrss``) after each stage, and the anonymous RSS at its end. Peak
+RSS counts every page of the database each pooled connection has mapped,
+once per connection, so memory the code itself holds shows in
+``anon_rss_mb``. ``--baseline`` compares it with a saved
+report and lists every number that moved more than ``--threshold`` percent
+(and, for latencies, more than ``--min-ms``). If one of the ``--gate``
+numbers got worse, the exit status is 1; tail latencies over a few dozen
+requests are too noisy to gate on by default.
+
+Reports are only comparable when made on the same machine with the same
+arguments; ``meta`` records both, and ``calibration_ms`` (a fixed pure
+Python loop) shows whether the machine itself was slower for one of them.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from backend import app as backend_app, db, fetcher, httpcache, metrics
+from backend.bench.endpoints import endpoints, ensure_db
+from backend.bench.feeds import FeedHandler, feed_urls, start_server
+from backend.bench.load import client_loop, percentile, serve
+from backend.models import init_db
+
+# leaf name -> -1 when lower is better, 1 when higher is; others are not compared
+DIRECTIONS = {"p50_ms": -1, "p95_ms": -1, "p99_ms": -1, "rps": 1, "seconds": -1, "peak_rss_mb": -1,
+              "anon_rss_mb": -1}
+GATE = "p50_ms,rps,seconds,anon_rss_mb"
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def anon_rss_mb():
+    """Private (heap) resident memory now; None off Linux."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def summary(samples, elapsed=None):
+    """Latency percentiles of ``samples`` (ms), and the rate over ``elapsed`` s."""
+    samples = sorted(samples)
+    out = {"n": len(samples)}
+    if elapsed:
+        out["rps"] = round(len(samples) / elapsed, 1)
+    for pct in (50, 95, 99):
+        out[f"p{pct}_ms"] = round(percentile(samples, pct), 3)
+    out["max_ms"] = round(samples[-1], 3) if samples else None
+    return out
+
+
+def calibrate(runs=5):
+    """Median ms of a fixed CPU-bound loop, to tell a slow machine from slow code."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        sum(i * i for i in range(300_000))
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def git_revision():
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return rev + ("+dirty" if dirty else "")
+
+
+def request_ms(client, url, method="GET", body=None, clear=False):
+    if clear:
+        httpcache.clear()
+    start = time.perf_counter()
+    resp = client.open(url, method=method, json=body)
+    resp.get_data()  # streamed bodies (export) are produced here
+    return (time.perf_counter() - start) * 1000, resp.status_code
+
+
+def run_routes(urls, news_id, repeat):
+    client = backend_app.app.test_client()
+    failed = {}
+    for url in urls:
+        _, status = request_ms(client, url)  # warm the pool and the page cache
+        if status != 200:
+            failed[url] = status
+    urls = [url for url in urls if url not in failed]
+    samples = {url: ([], []) for url in urls}
+    # a pass over every url at a time, so a slow spell on a busy machine is
+    # spread over all of them instead of landing on a few
+    for _ in range(repeat):
+        for url in urls:
+            uncached, cached = samples[url]
+            uncached.append(request_ms(client, url, clear=True)[0])  # and caches it again
+            cached.append(request_ms(client, url)[0])
+
+    report = {f"GET {url}": {"status": status} for url, status in failed.items()}
+    for url in urls:
+        uncached, cached = map(summary, samples[url])
+        report[f"GET {url}"] = {"uncached": uncached, "cached": cached}
+        print(f"  {url:58} {uncached['p50_ms']:9.3f} {cached['p50_ms']:9.3f}")
+    for url, status in failed.items():
+        print(f"  {url:58} {status:>9}")
+
+    # writes, so last: it expires every cached response
+    url = f"/api/classify/{news_id}"
+    samples = [request_ms(client, url, "POST", {"category": "Conflict", "bias": "Neutral"})[0]
+               for _ in range(repeat)]
+    report["POST /api/classify/<id>"] = {"write": summary(samples)}
+    return report
+
+
+def run_load(urls, clients, duration):
+    server, port = serve(backend_app.app)
+    stop = threading.Event()
+    samples, errors = [], []
+    threads = [threading.Thread(target=client_loop, args=(port, urls, stop, samples, errors, i))
+               for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    return {"clients": clients, "errors": len(errors), **summary(samples, elapsed)}
+
+
+def collect_cycle(urls):
+    """Seconds for one fetch_and_store over ``urls``, rows inserted, and
+    feeds that answered 304."""
+    def not_modified():
+        return sum(metrics.FEED_RESULTS.value(url, "not_modified") for url in urls)
+
+    inserted, skipped = metrics.COLLECT_ROWS.value("inserted"), not_modified()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend_app.fetch_and_store(urls)
+    return (time.perf_counter() - start, metrics.COLLECT_ROWS.value("inserted") - inserted,
+            not_modified() - skipped)
+
+
+def run_collect(feeds, items, delay, cycles):
+    FeedHandler.items_per_feed = items
+    server, base = start_server()
+    if fetcher.PARSE_WORKERS:
+        # a long-running server has its pool up already; don't time startup
+        fetcher._get_parse_pool().submit(fetcher.parse_entries, b"<rss/>").result()
+    report = {}
+    try:
+        full, conditional = [], []
+        for n in range(cycles):
+            # new urls have no stored validators, so every feed is downloaded
+            # and parsed again; the rows after the first cycle are duplicates
+            urls = [f"{url}&cycle={n}" for url in feed_urls(base, feeds, delay)]
+            backend_app.FEEDS = {url: "Conflict" for url in urls}
+            full.append(collect_cycle(urls))
+            conditional.append(collect_cycle(urls))
+        for name, results in (("cycle", full), ("conditional", conditional)):
+            report[name] = {
+                "seconds": round(statistics.median(r[0] for r in results), 3),
+                "inserted": sum(r[1] for r in results),
+                "not_modified": sum(r[2] for r in results),
+            }
+    finally:
+        server.shutdown()
+        fetcher.shutdown_parse_pool()
+    return report
+
+
+def run(args):
+    os.makedirs(args.dir, exist_ok=True)
+    source = args.db or ensure_db(args.dir, args.rows)
+    work = tempfile.mkdtemp(dir=args.dir)
+    path = os.path.join(work, "suite.db")
+    shutil.copyfile(source, path)
+    init_db(path)
+    conn = sqlite3.connect(path)
+    urls = endpoints(conn)
+    rows, news_id = conn.execute("SELECT COUNT(*), MAX(id) FROM news").fetchone()
+    conn.close()
+
+    backend_app.DB = path
+    report = {"meta": {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "database": args.db or f"synthetic, {rows} rows",
+        "rows": rows,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "calibration_ms": calibrate(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "compare", "dir")},
+    }}
+    rss = report["peak_rss_mb"] = {}
+    anon = report["anon_rss_mb"] = {}
+    try:
+        print(f"routes ({rows:,} rows, {args.repeat} requests each)")
+        print(f"  {'url':58} {'p50 ms':>9} {'cached':>9}")
+        report["routes"] = run_routes(urls, news_id, args.repeat)
+        rss["routes"], anon["routes"] = peak_rss_mb(), anon_rss_mb()
+
+        report["load"] = load = run_load(urls, args.clients, args.duration)
+        rss["load"], anon["load"] = peak_rss_mb(), anon_rss_mb()
+        print(f"load: {load['rps']:.0f} req/s over {args.clients} clients, p50 {load['p50_ms']} ms, "
+              f"p99 {load['p99_ms']} ms, {load['errors']} errors")
+
+        report["collect"] = collect = run_collect(args.feeds, args.items, args.feed_delay, args.cycles)
+        rss["collect"], anon["collect"] = peak_rss_mb(), anon_rss_mb()
+        rss["children"] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+        print(f"collect: {collect['cycle']['seconds']}s per cycle, conditional {collect['conditional']['seconds']}s "
+              f"({collect['conditional']['not_modified']}/{args.feeds * args.cycles} not modified); "
+              f"medians of {args.cycles}")
+        print(f"peak rss: {rss['collect']} MB (parse pool {rss['children']} MB), anonymous {anon['collect']} MB")
+    finally:
+        db.close_all()
+        shutil.rmtree(work)
+    return report
+
+
+def flatten(report, prefix=()):
+    for key, value in report.items():
+        if isinstance(value, dict):
+            yield from flatten(value, prefix + (key,))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield prefix + (key,), value
+
+
+def compare(new, old, threshold, min_ms, gate=GATE.split(",")):
+    """Print the numbers that moved between two reports; return the keys of
+    the ``gate`` numbers that got worse."""
+    old_values = dict(flatten({k: v for k, v in old.items() if k != "meta"}))
+    new_values = dict(flatten({k: v for k, v in new.items() if k != "meta"}))
+    compared, regressions = 0, []
+    print(f"\nbaseline {old['meta'].get('revision')} ({old['meta'].get('created')}), "
+          f"now {new['meta'].get('revision')} ({new['meta'].get('created')})")
+    speed = old["meta"].get("calibration_ms"), new["meta"].get("calibration_ms")
+    if all(speed) and abs(speed[1] - speed[0]) / speed[0] * 100 > threshold:
+        print(f"note: the machine itself ran at a different speed (calibration {speed[0]} ms, now {speed[1]} ms)")
+    print(f"{'':70} {'baseline':>10} {'now':>10} {'change':>8}")
+    for key, value in new_values.items():
+        # peak_rss_mb and anon_rss_mb hold one number per stage
+        metric = key[0] if key[0] in ("peak_rss_mb", "anon_rss_mb") else key[-1]
+        if metric not in DIRECTIONS or key not in old_values:
+            continue
+        compared += 1
+        before = old_values[key]
+        change = (value - before) / before * 100 if before else 0.0
+        if abs(change) <= threshold or (metric.endswith("_ms") and abs(value - before) < min_ms):
+            continue
+        worse = DIRECTIONS[metric] * change < 0
+        if worse and metric in gate:
+            regressions.append(key)
+        mark = ("worse !" if metric in gate else "worse") if worse else "better"
+        print(f"{' '.join(key)[:70]:70} {before:10.3f} {value:10.3f} {change:+7.1f}%  {mark}")
+    unmatched = len(set(old_values) ^ set(new_values))
+    print(f"{compared} numbers compared{f', {unmatched} in only one report' if unmatched else ''}; "
+          f"{len(regressions)} gated regressions beyond {threshold}%")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--db", help="run against a copy of this database instead of a synthetic one")
+    ap.add_argument("--repeat", type=int, default=50, help="requests per url and mode")
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    ap.add_argument("--feeds", type=int, default=10)
+    ap.add_argument("--items", type=int, default=50, help="items per canned feed")
+    ap.add_argument("--feed-delay", type=float, default=0.05, help="seconds each feed takes to answer")
+    ap.add_argument("--cycles", type=int, default=5, help="collection cycles, each followed by a conditional one")
+    ap.add_argument("--dir", default=tempfile.gettempdir())
+    ap.add_argument("--out", default="bench-report.json")
+    ap.add_argument("--baseline", help="saved report to compare with")
+    ap.add_argument("--compare", metavar="REPORT", help="compare this saved report instead of running")
+    ap.add_argument("--threshold", type=float, default=10.0, help="percent change that counts as worse")
+    ap.add_argument("--min-ms", type=float, default=0.2, help="smaller latency changes are not listed")
+    ap.add_argument("--gate", default=GATE, help="numbers that fail the run when worse")
+    args = ap.parse_args()
+
+    if args.compare:
+        if not args.baseline:
+            ap.error("--compare needs --baseline")
+        with open(args.compare) as f:
+            report = json.load(f)
+    else:
+        report = run(args)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold, args.min_ms, args.gate.split(",")):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
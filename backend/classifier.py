@@ -0,0 +1,246 @@
+# classifier.py
+"""Batch category/bias classification for rows stored without labels.
+
+collector.py stores rows with ``category`` and ``bias`` NULL. Here they are
+labelled in chunks by a linear model over hashed bag-of-words features:
+headline unigrams and bigrams plus the source host, hashed into DIM
+buckets. The weights come from multinomial naive Bayes fitted on the rows
+that already have labels, whether from a feed's category or a manual
+/api/classify. Rows the model labelled itself (``label_source = 'model'``)
+are never used for training.
+
+Scoring a chunk is one gather and one ``np.add.reduceat`` over the
+flattened feature ids. Each chunk is then written with a single
+``executemany`` in its own short transaction, which also refreshes the
+derived threat fields.
+
+    python -m backend.classifier              # train if needed, label the backlog
+    python -m backend.classifier --retrain --limit 10000
+"""
+import argparse
+import os
+import re
+import time
+import zlib
+
+import numpy as np
+
+from backend.db import connection
+from backend.threats import DERIVED_COLUMNS, derive
+
+DIM = 1 << 18  # hashed feature space
+ALPHA = 0.1  # additive smoothing
+CHUNK = 5000  # rows per read/score/write round
+MIN_TRAINING = 20  # labelled rows needed before a head is trained
+# bias is mostly unlabelled, so only confident predictions are written
+BIAS_CONFIDENCE = 0.9
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_HOST_RE = re.compile(r"^[a-z]+://(?:www\.)?([^/:]+)", re.IGNORECASE)
+_ALL = "__all__"  # present in every row, so no row has zero features
+_feature_ids = {}
+
+
+def _fid(token):
+    fid = _feature_ids.get(token)
+    if fid is None:
+        if len(_feature_ids) > 1_000_000:
+            _feature_ids.clear()
+        fid = _feature_ids[token] = zlib.crc32(token.encode("utf-8")) & (DIM - 1)
+    return fid
+
+
+def features(headline, source):
+    """Hashed feature ids for one row (duplicates removed)."""
+    words = _WORD_RE.findall((headline or "").lower())
+    tokens = [_ALL, *words, *(f"{a} {b}" for a, b in zip(words, words[1:]))]
+    host = _HOST_RE.match(source or "")
+    if host:
+        tokens.append("host:" + host.group(1).lower())
+    return list({_fid(t) for t in tokens})
+
+
+def featurize(rows):
+    """``(ids, offsets)`` for ``(headline, source)`` pairs: the flattened
+    feature ids and the start of each row in them."""
+    ids, offsets = [], []
+    for headline, source in rows:
+        offsets.append(len(ids))
+        ids.extend(features(headline, source))
+    return np.asarray(ids, dtype=np.int64), np.asarray(offsets, dtype=np.int64)
+
+
+class Head:
+    """One linear classifier: ``labels``, ``weights`` (classes x DIM), ``prior``."""
+
+    def __init__(self, labels, weights, prior):
+        self.labels = list(labels)
+        self.weights = weights
+        self.prior = prior
+
+    @classmethod
+    def fit(cls, ids, offsets, targets):
+        labels = sorted(set(targets))
+        index = {label: i for i, label in enumerate(labels)}
+        y = np.asarray([index[t] for t in targets], dtype=np.int64)
+        # class of every flattened feature id
+        per_id = np.repeat(y, np.diff(np.append(offsets, len(ids))))
+        counts = np.bincount(per_id * DIM + ids, minlength=len(labels) * DIM)
+        counts = counts.reshape(len(labels), DIM).astype(np.float32) + ALPHA
+        weights = np.log(counts / counts.sum(axis=1, keepdims=True))
+        prior = np.log(np.bincount(y, minlength=len(labels)) / len(y)).astype(np.float32)
+        return cls(labels, weights, prior)
+
+    def predict(self, ids, offsets):
+        """(label index, probability) arrays, one entry per row."""
+        scores = np.add.reduceat(self.weights[:, ids], offsets, axis=1).T + self.prior
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return best, probs[np.arange(len(best)), best]
+
+
+class Model:
+    def __init__(self, category, bias=None):
+        self.category = category
+        self.bias = bias
+
+    def save(self, path):
+        arrays = {}
+        for name, head in (("category", self.category), ("bias", self.bias)):
+            if head is not None:
+                arrays[f"{name}_labels"] = np.asarray(head.labels)
+                arrays[f"{name}_weights"] = head.weights
+                arrays[f"{name}_prior"] = head.prior
+        # write-then-rename so a running server never loads half a file
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, dim=DIM, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["dim"]) != DIM:
+                raise ValueError(f"{path} was trained with a different feature size")
+            heads = {}
+            for name in ("category", "bias"):
+                if f"{name}_labels" in data:
+                    heads[name] = Head([str(x) for x in data[f"{name}_labels"]],
+                                       data[f"{name}_weights"], data[f"{name}_prior"])
+        return cls(heads["category"], heads.get("bias"))
+
+    def predict(self, rows):
+        """``(category, bias)`` per ``(headline, source)``; bias is None below
+        BIAS_CONFIDENCE."""
+        ids, offsets = featurize(rows)
+        cat_idx, _ = self.category.predict(ids, offsets)
+        categories = [self.category.labels[i] for i in cat_idx]
+        if self.bias is None:
+            return [(c, None) for c in categories]
+        bias_idx, bias_prob = self.bias.predict(ids, offsets)
+        return [(c, self.bias.labels[b] if p >= BIAS_CONFIDENCE else None)
+                for c, b, p in zip(categories, bias_idx, bias_prob)]
+
+
+def model_path(db_path):
+    return os.path.splitext(db_path)[0] + ".classifier.npz"
+
+
+def train(conn):
+    """Fit a Model on labelled, non-model rows; None if there are too few."""
+    rows = conn.execute(
+        """SELECT headline, source, category, bias FROM news
+           WHERE category IS NOT NULL AND label_source IS NOT 'model'"""
+    ).fetchall()
+    if len(rows) < MIN_TRAINING or len({r[2] for r in rows}) < 2:
+        return None
+    ids, offsets = featurize([(r[0], r[1]) for r in rows])
+    category = Head.fit(ids, offsets, [r[2] for r in rows])
+
+    bias = None
+    labelled = [i for i, r in enumerate(rows) if r[3] is not None]
+    if len(labelled) >= MIN_TRAINING and len({rows[i][3] for i in labelled}) >= 2:
+        ids, offsets = featurize([(rows[i][0], rows[i][1]) for i in labelled])
+        bias = Head.fit(ids, offsets, [rows[i][3] for i in labelled])
+    return Model(category, bias)
+
+
+_models = {}  # model file -> (mtime, Model)
+
+
+def get_model(db_path, retrain=False):
+    """Load the saved model for ``db_path``, training and saving one first
+    if there is none or ``retrain`` is set. None if nothing can be trained."""
+    path = model_path(db_path)
+    if retrain or not os.path.exists(path):
+        with connection(db_path, readonly=True) as conn:
+            model = train(conn)
+        if model is None:
+            return None
+        model.save(path)
+    mtime = os.path.getmtime(path)
+    cached = _models.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    model = Model.load(path)
+    _models[path] = (mtime, model)
+    return model
+
+
+UPDATE_SQL = "UPDATE news SET category=?, bias=?, label_source='model', {} WHERE id=? AND category IS NULL".format(
+    ", ".join(f"{col}=?" for col in DERIVED_COLUMNS)
+)
+
+
+def classify_backlog(db_path, model, chunk=CHUNK, limit=None):
+    """Label rows with ``category IS NULL`` in id order; returns the number
+    updated. Each chunk commits on its own, so readers and the collector
+    only ever wait for one chunk."""
+    done, last_id = 0, 0
+    while limit is None or done < limit:
+        size = chunk if limit is None else min(chunk, limit - done)
+        with connection(db_path, readonly=True) as conn:
+            rows = conn.execute(
+                "SELECT id, headline, source FROM news WHERE category IS NULL AND id > ? ORDER BY id LIMIT ?",
+                (last_id, size),
+            ).fetchall()
+        if not rows:
+            break
+        labels = model.predict([(r[1], r[2]) for r in rows])
+        params = [
+            (category, bias) + derive(r[1], r[2], category, bias) + (r[0],)
+            for r, (category, bias) in zip(rows, labels)
+        ]
+        with connection(db_path) as conn:
+            done += conn.executemany(UPDATE_SQL, params).rowcount
+        last_id = rows[-1][0]
+    return done
+
+
+def main():
+    from backend.models import DB_FILE, init_db
+
+    ap = argparse.ArgumentParser(description="Label unclassified news rows in batches.")
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--retrain", action="store_true", help="refit the model before labelling")
+    ap.add_argument("--chunk", type=int, default=CHUNK)
+    ap.add_argument("--limit", type=int, default=None, help="label at most this many rows")
+    args = ap.parse_args()
+
+    init_db(args.db)
+    start = time.perf_counter()
+    model = get_model(args.db, retrain=args.retrain)
+    if model is None:
+        print(f"{args.db}: not enough labelled rows to train on")
+        return
+    trained = time.perf_counter()
+    n = classify_backlog(args.db, model, args.chunk, args.limit)
+    elapsed = time.perf_counter() - trained
+    print(f"{args.db}: model ready in {trained - start:.1f}s, labelled {n} rows in {elapsed:.1f}s "
+          f"({n / elapsed if elapsed else 0:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
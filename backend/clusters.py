@@ -0,0 +1,183 @@
+# clusters.py
+"""Near-duplicate story clustering at ingest (MinHash + LSH).
+
+The same event syndicated by several outlets arrives as several rows with
+different links and slightly different headlines. Each new headline is
+reduced to a MinHash signature: NUM_PERM minimums over hashed character
+shingles of its words, with stopwords dropped, so word order, plurals and
+"Russia"/"Russian" barely matter. The signature is split into BANDS bands.
+Rows that share any band value land in the same LSH bucket in
+``news_lsh``. A new row is compared only with the few recent rows in its
+buckets, never with the whole table, and joins the cluster of the most
+similar one when their estimated Jaccard similarity reaches THRESHOLD.
+Headlines that name different regions (scoring.scan) never merge.
+Templated headlines like "... in the UK" / "... in India" are otherwise
+close.
+
+``news.cluster_id`` is the id of the cluster's first row. It stays NULL on
+that first row, so ``cluster_id IS NULL`` selects one row per story. Only
+rows from the last WINDOW_DAYS are candidates: syndication happens within
+hours, and this keeps buckets small.
+"""
+import operator
+import re
+from array import array
+from hashlib import blake2b
+
+from backend.scoring import scan
+
+SHINGLE = 4  # characters per shingle, word edges padded with spaces
+NUM_PERM = 32  # signature length
+BANDS = 8  # LSH bands of NUM_PERM // BANDS values; ~0.6 Jaccard finds a bucket
+THRESHOLD = 0.5  # estimated Jaccard needed to join a cluster
+WINDOW_DAYS = 3
+PER_BUCKET = 4  # most recent bucket-mates compared per band
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or over
+says said than that the their this to up was were will with after amid
+""".split())
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_ROWS = NUM_PERM // BANDS
+# fixed: signatures are stored, so the hash family must never change
+_PERSONS = [b"gcai-minhash-%d" % i for i in range(NUM_PERM // 16)]
+
+
+def shingles(headline):
+    grams = set()
+    for word in _WORD_RE.findall((headline or "").lower()):
+        if word in STOPWORDS:
+            continue
+        padded = f" {word} "
+        if len(padded) <= SHINGLE:
+            grams.add(padded)
+        else:
+            grams.update(padded[i:i + SHINGLE] for i in range(len(padded) - SHINGLE + 1))
+    return grams
+
+
+def signature(headline):
+    """MinHash signature as an ``array('I')``, or None for an empty headline.
+
+    Each shingle is hashed once into a 64-byte blake2b digest. Its 16 lanes
+    act as 16 independent hash functions, so NUM_PERM values cost
+    NUM_PERM / 16 digests per shingle instead of NUM_PERM hash evaluations.
+    """
+    grams = shingles(headline)
+    if not grams:
+        return None
+    lanes = [array("I", b"".join([blake2b(g.encode("utf-8"), person=p).digest() for p in _PERSONS]))
+             for g in grams]
+    return array("I", map(min, zip(*lanes)))
+
+
+def band_keys(sig):
+    """One signed 64-bit bucket key per band."""
+    keys = []
+    for band in range(BANDS):
+        chunk = sig[band * _ROWS:(band + 1) * _ROWS].tobytes()
+        digest = blake2b(chunk, digest_size=8, person=bytes([band])).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(map(operator.eq, a, b)) / NUM_PERM
+
+
+def create_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS news_minhash (
+                    id INTEGER PRIMARY KEY,
+                    sig BLOB NOT NULL
+                )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS news_lsh (
+                    bucket INTEGER NOT NULL,
+                    news_id INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, news_id)
+                ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_lsh_news ON news_lsh(news_id)")
+    # removing a row drops its signature and buckets with it
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS news_clusters_ad AFTER DELETE ON news BEGIN
+                    DELETE FROM news_minhash WHERE id = OLD.id;
+                    DELETE FROM news_lsh WHERE news_id = OLD.id;
+                END''')
+
+
+def _candidates(conn, keys, news_id, timestamp):
+    # newest few per bucket straight off the (bucket, news_id) key, so a
+    # crowded bucket costs no more than a quiet one
+    per_bucket = " UNION ".join(
+        f"SELECT * FROM (SELECT news_id FROM news_lsh WHERE bucket = ? AND news_id < ? "
+        f"ORDER BY news_id DESC LIMIT {PER_BUCKET})"
+        for _ in keys
+    )
+    params = []
+    for key in keys:
+        params += [key, news_id]
+    return conn.execute(
+        f"""SELECT c.news_id, m.sig, n.cluster_id, n.headline FROM ({per_bucket}) c
+            JOIN news n ON n.id = c.news_id
+            JOIN news_minhash m ON m.id = c.news_id
+            WHERE n.timestamp >= datetime(?, '-{WINDOW_DAYS} days')""",
+        params + [timestamp],
+    ).fetchall()
+
+
+def _regions(headline):
+    return set(scan(headline)[1])
+
+
+def assign(conn, rows):
+    """Cluster ``(id, headline, timestamp)`` rows, in id order.
+
+    Stores each row's signature and buckets and sets ``cluster_id`` on rows
+    that match an earlier story. Returns the number of rows joined to a
+    cluster. The caller owns the transaction.
+    """
+    joined = 0
+    for news_id, headline, timestamp in rows:
+        sig = signature(headline)
+        if sig is None:
+            continue
+        keys = band_keys(sig)
+        best, best_sim, regions = None, THRESHOLD, None
+        for cand_id, cand_sig, cand_cluster, cand_headline in _candidates(conn, keys, news_id, timestamp):
+            sim = similarity(sig, array("I", cand_sig))
+            if sim < best_sim:
+                continue
+            if regions is None:
+                regions = _regions(headline)
+            cand_regions = _regions(cand_headline)
+            if regions and cand_regions and not regions & cand_regions:
+                continue
+            best, best_sim = cand_cluster or cand_id, sim
+        conn.execute("INSERT OR REPLACE INTO news_minhash (id, sig) VALUES (?, ?)", (news_id, sig.tobytes()))
+        conn.executemany("INSERT OR IGNORE INTO news_lsh (bucket, news_id) VALUES (?, ?)",
+                         [(k, news_id) for k in keys])
+        if best is not None:
+            conn.execute("UPDATE news SET cluster_id = ? WHERE id = ?", (best, news_id))
+            joined += 1
+    return joined
+
+
+def assign_after(conn, after_id):
+    """Cluster every row with id > ``after_id`` that has no signature yet."""
+    rows = conn.execute(
+        """SELECT n.id, n.headline, n.timestamp FROM news n
+           LEFT JOIN news_minhash m ON m.id = n.id
+           WHERE n.id > ? AND m.id IS NULL ORDER BY n.id""",
+        (after_id,),
+    ).fetchall()
+    return assign(conn, rows)
+
+
+def backfill(conn):
+    """Cluster the rows inside the window that have no signature yet; older
+    rows can no longer gain duplicates and stay their own stories."""
+    start = conn.execute(
+        f"""SELECT COALESCE(MIN(id), 0) - 1 FROM news
+            WHERE timestamp >= datetime((SELECT MAX(timestamp) FROM news), '-{WINDOW_DAYS} days')"""
+    ).fetchone()[0]
+    return assign_after(conn, start)
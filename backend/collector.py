@@ -1,9 +1,13 @@
-import feedparser
-import sqlite3
-from datetime import datetime
-import time
-import schedule
-from models import init_db
+# collector.py
+"""Extra world-news feeds, stored without a category for the batch
+classifier (backend/classifier.py) to label.
+
+They are scheduled together with the web app's own FEEDS (app.py merges
+both lists), under the one collection lease in backend/scheduler.py. So
+running this module is the same as ``python -m backend.scheduler``: a
+dedicated collector process for every feed and maintenance job, which the
+web workers stand by for.
+"""
 
 # Example RSS feeds (you can add more later)
 FEEDS = [
@@ -47,38 +51,7 @@ FEEDS = [
 ]
 
 
-def fetch_and_store():
-    print("🔄 Fetching news feeds...")
-    conn = sqlite3.connect("gcaiphase1.db")
-    c = conn.cursor()
-
-    for url in FEEDS:
-        feed = feedparser.parse(url)
-        for entry in feed.entries[:5]:  # latest 5 from each feed
-            # Avoid duplicates
-            c.execute("SELECT * FROM news WHERE headline=?", (entry.title,))
-            if not c.fetchone():
-                c.execute(
-                    "INSERT INTO news (headline, source, timestamp, category, bias) VALUES (?, ?, ?, ?, ?)",
-                    (entry.title, entry.link, datetime.now().strftime("%Y-%m-%d %H:%M"), None, None)
-                )
-                print(f"✅ Stored: {entry.title}")
-
-    conn.commit()
-    conn.close()
-    print("✔ Fetch complete.\n")
-
 if __name__ == "__main__":
-    init_db()
-
-    # Run once at start
-    fetch_and_store()
-
-    # Schedule every 10 minutes
-    schedule.every(10).minutes.do(fetch_and_store)
-
-    print("🕒 Collector running... will fetch every 10 minutes.\n")
+    from backend.scheduler import main
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    main()
@@ -0,0 +1,161 @@
+# db.py
+"""Pooled SQLite connections shared by the Flask routes and the collectors.
+
+Connections are reused instead of opened per request, and every new one is
+tuned: WAL journaling (readers no longer block on the scheduler's writes),
+``synchronous=NORMAL``, a small page cache and memory-mapped I/O (reads are
+served from the shared mapping, so the per-connection cache stays small).
+GET routes borrow read-only connections (``mode=ro``) so they can never take
+the write lock.
+
+Each pool opens at most MAX_OPEN connections, however many request threads
+there are; a thread past that waits for one to come back, and gets
+``sqlite3.OperationalError`` after ACQUIRE_TIMEOUT.
+
+    with connection(DB, readonly=True) as conn:
+        rows = conn.execute(...).fetchall()
+
+Read-write connections commit when the block exits cleanly and roll back if
+it raises. ``connect`` opens a tuned connection outside any pool, for
+readers that hold one for as long as a client takes (``/api/export``).
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# applied to every new connection; journal_mode is persistent in the file and
+# only set from read-write connections
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -4000,  # KiB, i.e. ~4 MB per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+BUSY_TIMEOUT = 10  # seconds
+MAX_IDLE = 8  # idle connections kept per (path, mode)
+MAX_OPEN = int(os.environ.get("GCAI_DB_MAX_OPEN", 16))  # connections per (path, mode), idle or in use
+ACQUIRE_TIMEOUT = BUSY_TIMEOUT  # seconds to wait for a free connection
+
+
+def connect(path, readonly=False):
+    """A new connection with PRAGMAS applied; read-only ones use ``mode=ro``."""
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    for name, value in PRAGMAS.items():
+        if name == "journal_mode" and readonly:
+            continue
+        conn.execute(f"PRAGMA {name}={value}")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class Pool:
+    """Idle connections for one database file and mode."""
+
+    def __init__(self, path, readonly):
+        self.path = path
+        self.readonly = readonly
+        self.max_idle = MAX_IDLE
+        self.max_open = MAX_OPEN
+        self.slots = threading.BoundedSemaphore(self.max_open)
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "closed": 0, "in_use": 0, "peak_in_use": 0, "waited": 0}
+
+    def acquire(self):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.stats["waited"] += 1
+            if not self.slots.acquire(timeout=ACQUIRE_TIMEOUT):
+                raise sqlite3.OperationalError(
+                    f"no free connection to {self.path} after {ACQUIRE_TIMEOUT}s ({self.max_open} in use)")
+        try:
+            conn = self.idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            try:
+                conn = connect(self.path, self.readonly)
+            except BaseException:
+                self.slots.release()
+                raise
+            reused = False
+        with self.lock:
+            self.stats["reused" if reused else "created"] += 1
+            self.stats["in_use"] += 1
+            self.stats["peak_in_use"] = max(self.stats["peak_in_use"], self.stats["in_use"])
+        return conn
+
+    def release(self, conn, broken=False):
+        with self.lock:
+            self.stats["in_use"] -= 1
+        try:
+            if not broken and self.idle.qsize() < self.max_idle:
+                self.idle.put_nowait(conn)
+                return
+            conn.close()
+            with self.lock:
+                self.stats["closed"] += 1
+        finally:
+            self.slots.release()
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats, idle=self.idle.qsize(), max_idle=self.max_idle, max_open=self.max_open)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path, readonly=False):
+    key = (path, readonly)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(key, Pool(path, readonly))
+    return pool
+
+
+@contextmanager
+def connection(path, readonly=False):
+    pool = get_pool(path, readonly)
+    conn = pool.acquire()
+    broken = False
+    try:
+        yield conn
+        if conn.in_transaction:
+            conn.commit()
+    except BaseException:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            broken = True
+        raise
+    finally:
+        pool.release(conn, broken)
+
+
+def pool_stats():
+    """Per-pool counters, keyed ``"<path> (ro|rw)"``."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {f"{p.path} ({'ro' if p.readonly else 'rw'})": p.snapshot() for p in pools}
+
+
+def close_all():
+    """Close every idle connection (tests, benchmarks, shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for p in pools:
+        while True:
+            try:
+                p.idle.get_nowait().close()
+            except queue.Empty:
+                break
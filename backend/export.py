@@ -0,0 +1,144 @@
+# export.py
+"""Bulk export of threat rows as NDJSON or CSV, streamed in constant memory.
+
+``/api/export`` runs one query and hands back a generator. It pulls
+CHUNK rows at a time from the SQLite cursor, formats each chunk into a
+single string, and optionally gzips it on the fly. At no point is more
+than one chunk in memory.
+
+An export holds its read-only connection (and its WAL snapshot) until the
+response finishes or the client goes away, which for a slow client can be
+minutes. So it opens its own connection instead of borrowing one from the
+pool the other routes share, and at most MAX_EXPORTS run at once per
+process; /api/export answers 503 with Retry-After past that.
+"""
+import csv
+import io
+import json
+import os
+import threading
+import zlib
+
+from backend.db import connect
+from backend.threats import MATURITY_SQL
+
+CHUNK = 1000  # rows per fetch and per chunk written to the client
+GZIP_LEVEL = 6
+MAX_EXPORTS = int(os.environ.get("GCAI_EXPORT_MAX", 4))  # concurrent exports per process
+RETRY_AFTER = 30  # seconds a refused export is asked to wait
+
+_slots = threading.BoundedSemaphore(MAX_EXPORTS)
+
+# API field name, in output order -> SQL expression
+COLUMNS = {
+    "id": "news.id",
+    "title": "news.headline",
+    "source": "source",
+    "time": "timestamp",
+    "category": "category",
+    "bias": "bias",
+    "threatType": "threat_type",
+    "locationScope": "location_scope",
+    "locationName": "location_name",
+    "severity": "severity",
+    "emergency": "emergency",
+    "maturity": f"({MATURITY_SQL})",
+    # the first row of the story this one duplicates (backend/clusters.py)
+    "clusterId": "news.cluster_id",
+}
+# added with group=cluster: the story's links, its first row's first, as in
+# /api/threats
+CLUSTER_COLUMNS = {
+    "sources": """(SELECT json_group_array(source) FROM (
+                       SELECT source FROM news AS m WHERE m.id = news.id
+                       UNION ALL
+                       SELECT * FROM (SELECT source FROM news AS m WHERE m.cluster_id = news.id ORDER BY m.id)))""",
+    "clusterSize": "(SELECT COUNT(*) + 1 FROM news AS m WHERE m.cluster_id = news.id)",
+}
+JSON_FIELDS = {"sources"}  # JSON text from SQL: nested in NDJSON, as is in CSV
+FIELDS = list(COLUMNS)
+EXPORT_SELECT = ", ".join(COLUMNS.values())
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+
+def columns(grouped=False):
+    """API field name -> SQL expression, with CLUSTER_COLUMNS if ``grouped``."""
+    return dict(COLUMNS, **CLUSTER_COLUMNS) if grouped else COLUMNS
+
+
+def reserve():
+    """Take an export slot; False when MAX_EXPORTS are running. Pair a True
+    with release()."""
+    return _slots.acquire(blocking=False)
+
+
+def release():
+    _slots.release()
+
+
+def fetch_chunks(db_path, sql, params, chunk=CHUNK):
+    """Yield lists of row tuples from ``sql`` without materializing the result."""
+    conn = connect(db_path, readonly=True)
+    try:
+        cur = conn.cursor()
+        cur.row_factory = None  # plain tuples; the formatters zip with the field names
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def ndjson_chunks(chunks, fields=FIELDS):
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    nested = [i for i, name in enumerate(fields) if name in JSON_FIELDS]
+    for rows in chunks:
+        if nested:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for i in nested:
+                    row[i] = json.loads(row[i])
+        yield "".join(dumps(dict(zip(fields, row))) + "\n" for row in rows)
+
+
+def csv_chunks(chunks, fields=FIELDS):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(fields)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def encode(text_chunks, gzip=False):
+    """UTF-8 bytes for the response; gzip-compressed on the fly if asked."""
+    if not gzip:
+        for text in text_chunks:
+            yield text.encode("utf-8")
+        return
+    # wbits 31: a gzip header and trailer around the deflate stream
+    z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for text in text_chunks:
+        out = z.compress(text.encode("utf-8"))
+        if out:
+            yield out
+    yield z.flush()
+
+
+def stream(db_path, sql, params, fmt, gzip=False, chunk=CHUNK, fields=FIELDS):
+    """Response body generator for ``fmt`` (a FORMATS key); ``sql`` selects
+    the columns named by ``fields``."""
+    chunks = fetch_chunks(db_path, sql, params, chunk)
+    text = ndjson_chunks(chunks, fields) if fmt == "ndjson" else csv_chunks(chunks, fields)
+    return encode(text, gzip)
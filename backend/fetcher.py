@@ -0,0 +1,241 @@
+# fetcher.py
+"""Concurrent RSS fetching with conditional GET.
+
+Feeds are downloaded on a bounded thread pool so one slow host no longer
+stalls the whole cycle. The socket timeout only bounds each read, so a
+host that trickles bytes is also cut off by a wall-clock deadline per feed
+(FEED_DEADLINE), and ``fetch_feeds`` stops waiting for any feed still
+running when the cycle's deadline passes. Each feed remembers the ETag / Last-Modified the
+server sent last time; unchanged feeds answer 304 and are never parsed.
+
+Parsing (feedparser's XML and HTML sanitizing, all pure Python) runs in a
+small process pool. The raw bytes go out and only compact
+``{"title", "link"}`` entries come back, so a collection cycle inside the
+web process no longer holds the GIL against request threads.
+``PARSE_WORKERS = 0`` (env ``GCAI_PARSE_WORKERS``) parses inline instead.
+
+Download and parse times, entry counts and outcomes are recorded per feed
+in backend/metrics.py.
+"""
+import atexit
+import gzip
+import multiprocessing
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit
+
+import feedparser
+
+from backend import metrics
+
+MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 10  # seconds, per socket operation
+FEED_DEADLINE = 30  # seconds, wall clock for one feed's download
+READ_CHUNK = 64 * 1024
+PARSE_WORKERS = int(os.environ.get("GCAI_PARSE_WORKERS", min(2, os.cpu_count() or 1)))
+
+# per-host overrides for hosts known to be slow (hostname -> seconds)
+HOST_TIMEOUTS = {}
+
+USER_AGENT = "GCAI-Dashboard/1.0 (+https://github.com/RAVIDHARSHEN/GCAI_DASHBOARD)"
+
+
+def timeout_for(url):
+    host = urlsplit(url).hostname or ""
+    return HOST_TIMEOUTS.get(host, DEFAULT_TIMEOUT)
+
+
+def parse_entries(data, headers=None, max_entries=None):
+    """Parse feed bytes into ``[{"title", "link"}]``, at most ``max_entries``.
+
+    Runs in the parse pool, so it takes and returns only plain picklable
+    values.
+    """
+    feed = feedparser.parse(data, response_headers=headers or {})
+    return [
+        {"title": entry.get("title", ""), "link": entry.get("link")}
+        for entry in feed.entries[:max_entries]
+    ]
+
+
+# ------------------ PARSE POOL ------------------
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool():
+    """The shared parse pool, started on first use; None when disabled."""
+    global _parse_pool
+    if PARSE_WORKERS <= 0:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # never fork the threaded web process: forkserver children start
+            # from a clean single-threaded server that has feedparser loaded
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload(["backend.fetcher"])
+            else:
+                ctx = multiprocessing.get_context("spawn")
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=ctx)
+        return _parse_pool
+
+
+def shutdown_parse_pool():
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+atexit.register(shutdown_parse_pool)
+
+
+def _parse(data, headers, max_entries):
+    pool = _get_parse_pool()
+    if pool is not None:
+        try:
+            return pool.submit(parse_entries, data, headers, max_entries).result()
+        except BrokenProcessPool:
+            # a worker died; start a fresh pool next cycle, parse this one here
+            shutdown_parse_pool()
+    return parse_entries(data, headers, max_entries)
+
+
+def _read(resp, deadline):
+    """The response body, or TimeoutError once ``deadline`` (perf_counter)
+    passes. read1 returns after one socket read, so the check runs often."""
+    chunks = []
+    while True:
+        chunk = resp.read1(READ_CHUNK)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"download took longer than {FEED_DEADLINE}s")
+
+
+def _new_result(url, etag=None, modified=None):
+    return {
+        "url": url,
+        "status": None,
+        "entries": [],
+        "etag": etag,
+        "modified": modified,
+        "error": None,
+        "elapsed": 0.0,
+        "parse_elapsed": 0.0,
+    }
+
+
+def fetch_feed(url, etag=None, modified=None, timeout=None, max_entries=None, deadline=None):
+    """Fetch and parse one feed.
+
+    Returns a dict with keys: url, status, entries, etag, modified, error,
+    elapsed. ``entries`` is a list of ``{"title", "link"}`` dicts, at most
+    ``max_entries``. ``status`` is 304 (and ``entries`` empty) when the
+    server says the feed has not changed since ``etag`` / ``modified``.
+    ``elapsed`` covers download and parse; ``parse_elapsed`` the parse alone.
+    A download still running after ``deadline`` seconds (default
+    FEED_DEADLINE) is an error.
+    """
+    result = _new_result(url, etag, modified)
+    headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+
+    start = time.perf_counter()
+    try:
+        req = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(req, timeout=timeout or timeout_for(url)) as resp:
+            data = _read(resp, start + (deadline or FEED_DEADLINE))
+            result["status"] = resp.status
+            if resp.headers.get("Content-Encoding", "").lower() == "gzip":
+                data = gzip.decompress(data)
+            result["etag"] = resp.headers.get("ETag")
+            result["modified"] = resp.headers.get("Last-Modified")
+            response_headers = dict(resp.headers)
+        downloaded = time.perf_counter()
+        metrics.FEED_FETCH_SECONDS.observe(downloaded - start, url)
+        # the connection is closed; the download thread waits on the pool
+        result["entries"] = _parse(data, response_headers, max_entries)
+        result["parse_elapsed"] = time.perf_counter() - downloaded
+        metrics.FEED_PARSE_SECONDS.observe(result["parse_elapsed"], url)
+        metrics.FEED_ENTRIES.inc(len(result["entries"]), url)
+    except urllib.error.HTTPError as e:
+        result["status"] = e.code
+        if e.code != 304:
+            result["error"] = f"HTTP {e.code}"
+    except Exception as e:
+        result["error"] = str(e) or e.__class__.__name__
+    result["elapsed"] = time.perf_counter() - start
+    outcome = "error" if result["error"] else "not_modified" if result["status"] == 304 else "ok"
+    metrics.FEED_RESULTS.inc(1, url, outcome)
+    return result
+
+
+def fetch_feeds(urls, state=None, max_workers=MAX_WORKERS, max_entries=None):
+    """Fetch ``urls`` concurrently; results come back in input order.
+
+    ``state`` maps url -> (etag, modified) from the previous cycle;
+    ``max_entries`` caps the entries kept per feed.
+    """
+    state = state or {}
+    urls = list(urls)
+    if not urls:
+        return []
+
+    def one(url):
+        etag, modified = state.get(url, (None, None))
+        return fetch_feed(url, etag, modified, max_entries=max_entries)
+
+    workers = max(1, min(max_workers, len(urls)))
+    # every feed gets its deadline even when queued behind others; the slack
+    # covers a parse, and headers, which the per-feed deadline does not see
+    rounds = -(-len(urls) // workers)
+    cycle_deadline = rounds * FEED_DEADLINE + DEFAULT_TIMEOUT
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = [pool.submit(one, url) for url in urls]
+    done, _ = wait(futures, timeout=cycle_deadline)
+    # don't join threads still stuck on a socket; they end at its timeout
+    pool.shutdown(wait=False, cancel_futures=True)
+    results = []
+    for url, future in zip(urls, futures):
+        if future in done:
+            results.append(future.result())
+            continue
+        result = _new_result(url, *state.get(url, (None, None)))
+        result["error"] = f"no answer within the {cycle_deadline}s cycle deadline"
+        result["elapsed"] = float(cycle_deadline)
+        metrics.FEED_RESULTS.inc(1, url, "error")
+        results.append(result)
+    return results
+
+
+# ------------------ PER-FEED STATE ------------------
+def load_feed_state(conn):
+    rows = conn.execute("SELECT url, etag, modified FROM feed_state").fetchall()
+    return {url: (etag, modified) for url, etag, modified in rows}
+
+
+def save_feed_state(conn, results):
+    """Store validators from successful fetches and each feed's last error;
+    ``last_run`` belongs to the scheduler and is left alone."""
+    conn.executemany(
+        """INSERT INTO feed_state (url, etag, modified) VALUES (?, ?, ?)
+           ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, modified = excluded.modified, last_error = NULL""",
+        [(r["url"], r["etag"], r["modified"]) for r in results if r["error"] is None],
+    )
+    conn.executemany(
+        """INSERT INTO feed_state (url, last_error) VALUES (?, ?)
+           ON CONFLICT(url) DO UPDATE SET last_error = excluded.last_error""",
+        [(r["url"], r["error"]) for r in results if r["error"] is not None],
+    )
@@ -0,0 +1,103 @@
+# gazetteer.py
+"""Countries and regions with aliases, ISO codes and populations.
+
+``data/gazetteer.csv`` is read once per process into a Gazetteer. Every
+place's name, aliases, capitals and demonyms (plus plural demonyms) are
+tokenized and put in an inverted index keyed on their first token. Finding
+places in a text then costs one dict lookup per token of the text, plus a
+comparison against the few aliases that start with that token. The longest
+alias wins, so "South Sudan" is never also "Sudan" and "Latin America" is
+never "America". How big the gazetteer is makes no difference.
+
+As in scoring.py, all-caps aliases (US, UK, UAE, DRC) match case-sensitively
+and everything else is case-folded.
+"""
+import csv
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv")
+FALLBACK = "Global"  # the ``world`` row: never matched in text, used when nothing else is
+
+Place = namedtuple("Place", "name kind iso2 iso3 population")
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text or "")
+
+
+def _plural(demonym):
+    if demonym.endswith(("s", "sh", "ch", "ese")):
+        return None
+    return demonym + "s"
+
+
+class Gazetteer:
+    def __init__(self, rows):
+        """``rows`` are dicts with the gazetteer.csv columns; ``aliases`` and
+        ``demonyms`` are ``;``-separated."""
+        self.places = {}
+        # folded first token -> [(alias tokens, exact, Place)], longest first
+        self._index = {}
+        for row in rows:
+            place = Place(row["name"], row["kind"], row["iso2"] or None, row["iso3"] or None,
+                          int(row["population"]))
+            self.places[place.name] = place
+            if place.kind == "world":
+                continue
+            demonyms = [d for d in (row.get("demonyms") or "").split(";") if d]
+            aliases = [place.name, *(a for a in (row.get("aliases") or "").split(";") if a), *demonyms,
+                       *filter(None, map(_plural, demonyms))]
+            for alias in aliases:
+                self._add(alias, place)
+        for candidates in self._index.values():
+            candidates.sort(key=lambda c: -len(c[0]))
+
+    def _add(self, alias, place):
+        tokens = tokenize(alias)
+        if not tokens:
+            return
+        exact = alias.replace(".", "").isupper()
+        key = tuple(tokens) if exact else tuple(t.lower() for t in tokens)
+        self._index.setdefault(tokens[0].lower(), []).append((key, exact, place))
+
+    def __len__(self):
+        return len(self.places)
+
+    def get(self, name):
+        return self.places.get(name)
+
+    def find(self, text):
+        """Places named in ``text``, in order of first mention, each once."""
+        tokens = tokenize(text)
+        folded = [t.lower() for t in tokens]
+        found, seen = [], set()
+        i, n = 0, len(tokens)
+        index = self._index
+        while i < n:
+            step = 1
+            for key, exact, place in index.get(folded[i], ()):
+                k = len(key)
+                if tuple((tokens if exact else folded)[i:i + k]) == key:
+                    if place.name not in seen:
+                        seen.add(place.name)
+                        found.append(place)
+                    step = k
+                    break
+            i += step
+        return found
+
+
+def load(path=DATA_FILE):
+    with open(path, newline="", encoding="utf-8") as f:
+        return Gazetteer(csv.DictReader(f))
+
+
+@lru_cache(maxsize=None)
+def get_gazetteer():
+    """The shared Gazetteer for DATA_FILE, loaded on first use."""
+    return load()
@@ -0,0 +1,17 @@
+# gunicorn.conf.py
+"""Migrate and precompress the React build once in the master, before any
+worker exists. Each worker then builds the app with ``app:create_app()``
+(see the Procfile), which starts the collection scheduler unless
+GCAI_SCHEDULER=0. The lease in backend/scheduler.py lets only one worker
+fetch, and another takes over if that one dies. Set GCAI_SCHEDULER=0 on the
+web process when ``python -m backend.scheduler`` runs as its own process.
+"""
+
+
+def on_starting(server):
+    from backend.models import DB_FILE, init_db
+    from backend.static import precompress
+
+    # before any worker exists, so migrations and variant writes never race
+    init_db(DB_FILE)
+    precompress()
@@ -0,0 +1,160 @@
+# httpcache.py
+"""ETag / 304 handling and an in-process response cache for polling routes.
+
+Every write to ``news`` bumps ``meta.data_version`` through triggers (see
+``models._m5_data_version``). A response's ETag is derived from that version
+plus the route and its query args, so a dashboard re-polling unchanged data
+gets a bodyless 304. Other requests are served from a small LRU of
+serialized bodies until the version moves.
+
+The version itself is re-read at most once per ``VERSION_TTL`` seconds per
+process, so neither path touches the database in between.
+
+Views cached with ``gzip=True`` send a gzip body to clients that accept
+it. The compressed bytes are kept next to the plain ones, so a cache hit
+is never recompressed.
+"""
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, request
+
+from backend.db import connection
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder, several times slower on big payloads
+    orjson = None
+
+VERSION_TTL = 1.0  # seconds a data_version read is trusted
+CACHE_SIZE = 256  # serialized responses kept per process
+GZIP_LEVEL = 6
+GZIP_MIN_SIZE = 1024  # bytes; smaller bodies are sent as they are
+
+_versions = {}  # db path -> (version, checked_at)
+_cache = OrderedDict()  # (path, args) -> (etag, body, mimetype, gzipped body or None)
+_lock = threading.Lock()
+stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def data_version(path):
+    """Current ``meta.data_version`` for the database at ``path``."""
+    now = time.monotonic()
+    cached = _versions.get(path)
+    if cached and now - cached[1] < VERSION_TTL:
+        return cached[0]
+    with connection(path, readonly=True) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key='data_version'").fetchone()
+    version = row[0] if row else 0
+    _versions[path] = (version, now)
+    return version
+
+
+def expire_version(path=None):
+    """Forget the remembered version so the next request re-reads it; call
+    after a local write to skip the VERSION_TTL delay."""
+    if path is None:
+        _versions.clear()
+    else:
+        _versions.pop(path, None)
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+def _etag(version, key, clock):
+    raw = f"{version}|{clock}|{key[0]}|{key[1]}"
+    return '"%s"' % hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def dumps(payload):
+    """Compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def gzip_bytes(body):
+    # wbits 31: a gzip header and trailer around the deflate stream
+    z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return z.compress(body) + z.flush()
+
+
+def _wants_gzip():
+    return bool(request.accept_encodings["gzip"])
+
+
+def cached_json(version_source, clock=None, gzip=False):
+    """Cache a GET JSON view on ``version_source()`` and its query args.
+
+    ``clock`` (seconds) additionally rolls the ETag over on a time bucket,
+    for payloads that depend on the current time (e.g. threat maturity).
+    ``gzip`` compresses bodies of GZIP_MIN_SIZE and up for clients that
+    accept it; the gzip body has its own ETag (``-gz`` suffix).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            bucket = int(time.time() // clock) if clock else 0
+            etag = _etag(version_source(), key, bucket)
+            gz_etag = etag[:-1] + '-gz"'
+            wants_gzip = gzip and _wants_gzip()
+
+            if request.if_none_match.contains_weak(etag.strip('"')) or (
+                    gzip and request.if_none_match.contains_weak(gz_etag.strip('"'))):
+                with _lock:
+                    stats["not_modified"] += 1
+                resp = make_response("", 304)
+                resp.headers["ETag"] = gz_etag if wants_gzip else etag
+                if gzip:
+                    resp.vary.add("Accept-Encoding")
+                return resp
+
+            with _lock:
+                hit = _cache.get(key)
+                if hit and hit[0] == etag:
+                    _cache.move_to_end(key)
+                    stats["hits"] += 1
+                else:
+                    hit = None
+                    stats["misses"] += 1
+
+            if hit:
+                _, body, mimetype, packed = hit
+            else:
+                resp = make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+                body, mimetype, packed = resp.get_data(), resp.mimetype, None
+            if wants_gzip and packed is None and len(body) >= GZIP_MIN_SIZE:
+                packed = gzip_bytes(body)
+            if not hit or packed is not hit[3]:
+                with _lock:
+                    _cache[key] = (etag, body, mimetype, packed)
+                    _cache.move_to_end(key)
+                    while len(_cache) > CACHE_SIZE:
+                        _cache.popitem(last=False)
+
+            if wants_gzip and packed is not None:
+                resp = make_response(packed, 200)
+                resp.headers["Content-Encoding"] = "gzip"
+                resp.headers["ETag"] = gz_etag
+            else:
+                resp = make_response(body, 200)
+                resp.headers["ETag"] = etag
+            resp.mimetype = mimetype
+            if gzip:
+                resp.vary.add("Accept-Encoding")
+            # let browsers keep the body but always revalidate
+            resp.headers["Cache-Control"] = "no-cache"
+            return resp
+        return wrapper
+    return decorator
@@ -0,0 +1,179 @@
+# metrics.py
+"""In-process counters and latency histograms, served as Prometheus text.
+
+Every metric is a module-level Counter or Histogram. Each label set is a
+few integers updated under one lock, so recording costs a couple of
+microseconds and needs no extra dependency. ``/metrics`` renders them in
+the Prometheus text format (0.0.4), together with the gauges returned by
+functions passed to ``register`` (pool, response cache, analysis memo).
+
+Values are per process: with several gunicorn workers each one reports its
+own, so scrape every worker or run one worker with threads (the Procfile
+default).
+
+    with metrics.SQL_SECONDS.time("stats"):
+        ...
+    metrics.FEED_ENTRIES.inc(len(entries), url)
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; from a cached JSON hit to a slow feed download
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count; ``name`` carries the ``_total`` suffix, so the HELP,
+    TYPE and sample lines all use the same name."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _metrics.append(self)
+
+    def inc(self, amount=1, *labels):
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with _lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram of seconds (or ``buckets`` units)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        _metrics.append(self)
+
+    def observe(self, value, *labels):
+        i = 0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        with _lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[i] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the time spent in the ``with`` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels):
+        counts = self._values.get(labels)
+        return sum(counts[:-1]) if counts else 0
+
+    def samples(self):
+        with _lock:
+            values = sorted((labels, list(counts)) for labels, counts in self._values.items())
+        for labels, counts in values:
+            total = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                total += n
+                le = 'le="{}"'.format(_number(bound))
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {total}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(counts[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {total}"
+
+
+def register(collector):
+    """Add a function called on every render. It returns
+    ``[(name, help, [(labels dict, value), ...]), ...]``, rendered as gauges."""
+    _collectors.append(collector)
+    return collector
+
+
+def render():
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    for collector in _collectors:
+        for name, help, samples in collector():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Zero every metric (benchmarks)."""
+    with _lock:
+        for metric in _metrics:
+            metric._values.clear()
+
+
+# ------------------ METRICS ------------------
+REQUEST_SECONDS = Histogram(
+    "gcai_request_seconds", "Time to build a response, by route rule, method and status.",
+    ("route", "method", "status"))
+SQL_SECONDS = Histogram("gcai_sql_seconds", "Time running and fetching a query, by label.", ("query",))
+
+FEED_FETCH_SECONDS = Histogram("gcai_feed_fetch_seconds", "Feed download time, by feed url.", ("feed",))
+FEED_PARSE_SECONDS = Histogram(
+    "gcai_feed_parse_seconds", "Feed parse time including the wait for the parse pool, by feed url.", ("feed",))
+FEED_ENTRIES = Counter("gcai_feed_entries_total", "Entries parsed, by feed url.", ("feed",))
+FEED_RESULTS = Counter("gcai_feed_fetches_total", "Feed fetches, by url and outcome (ok, not_modified, error).",
+                       ("feed", "outcome"))
+
+COLLECT_SECONDS = Histogram("gcai_collect_seconds", "Collection cycle time, by stage (fetch, store, total).",
+                            ("stage",))
+COLLECT_ROWS = Counter("gcai_collect_rows_total", "Rows offered to and inserted into news, by result.", ("result",))
+ERRORS = Counter("gcai_errors_total", "Exceptions caught and logged, by where they happened.", ("where",))
+
+SCHEDULER_TICK_SECONDS = Histogram(
+    "gcai_scheduler_tick_seconds", "Scheduler tick time, including the feeds and jobs it ran.", ("role",))
+JOB_SECONDS = Histogram("gcai_job_seconds", "Scheduler maintenance job run time, by job.", ("job",),
+                        buckets=(*BUCKETS, 60.0, 300.0))
@@ -1,12 +1,81 @@
 # models.py
+"""Schema and versioned migrations for the news database.
+
+The schema version lives in ``PRAGMA user_version``. ``init_db`` runs every
+migration newer than that version, each in its own transaction, so an
+existing ``gcaiphase1.db`` is upgraded in place and a new file is built
+from scratch by the same steps. Append new steps to ``MIGRATIONS``; never
+edit one that has shipped.
+"""
+import os
 import sqlite3
+from backend import clusters
+from backend import retention
+from backend import scheduler
+from backend import timeseries
+from backend.search import create_fts, rebuild as rebuild_fts
+from backend.threats import DERIVED_COLUMNS, backfill_derived
+
+DB_FILE = os.environ.get("GCAI_DB", "gcaiphase1.db")
+
+# threat fields stored alongside each row (see backend/threats.py)
+DERIVED_COLUMNS_SQL = {
+    "threat_type": "TEXT",
+    "location_scope": "TEXT",
+    "location_name": "TEXT",
+    "severity": "INTEGER",
+    "emergency": "TEXT",
+}
+
+# raw row fields followed by the derived threat fields from threats.derive();
+# ``day`` is filled from the timestamp parameter (?3). Rows whose source is
+# already stored are skipped by the unique index.
+INSERT_NEWS_SQL = "INSERT OR IGNORE INTO news (headline, source, timestamp, category, bias, {}, day) VALUES ({}, date(?3))".format(
+    ", ".join(DERIVED_COLUMNS), ", ".join(f"?{i}" for i in range(1, 6 + len(DERIVED_COLUMNS)))
+)
+
+
+
+def insert_news(conn, rows):
+    """Insert INSERT_NEWS_SQL parameter tuples with one executemany, then
+    assign the new rows to near-duplicate clusters (backend/clusters.py).
+
+    Returns the number of rows actually inserted (the rest were duplicates).
+    The caller owns the transaction.
+    """
+    if not rows:
+        return 0
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM news").fetchone()[0]
+    inserted = conn.executemany(INSERT_NEWS_SQL, rows).rowcount
+    if inserted:
+        clusters.assign_after(conn, last_id)
+    return inserted
+
+
+def load_counts(conn):
+    """Category, bias and total counts from news_counts in one small query.
+
+    Returns ``{"category": {...}, "bias": {...}, "story": {...}, "total": n}``;
+    NULL category/bias values are counted under "Unclassified". "story"
+    counts categories once per near-duplicate cluster.
+    """
+    counts = {"category": {}, "bias": {}, "story": {}, "total": 0}
+    for kind, key, count in conn.execute("SELECT kind, key, count FROM news_counts WHERE count > 0"):
+        if kind == "total":
+            counts["total"] = count
+        else:
+            counts[kind][key] = count
+    return counts
+
+
+# ------------------ MIGRATIONS ------------------
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
 
-DB_FILE = "gcaiphase1.db"
 
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS news (
+def _m1_base_schema(conn):
+    """news + feed_state, with the stored threat columns."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS news (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     headline TEXT,
                     source TEXT,
@@ -14,5 +83,229 @@ def init_db():
                     category TEXT,
                     bias TEXT
                 )''')
-    conn.commit()
-    conn.close()
+    existing = _columns(conn, "news")
+    for col, decl in DERIVED_COLUMNS_SQL.items():
+        if col not in existing:
+            conn.execute(f"ALTER TABLE news ADD COLUMN {col} {decl}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_threat_type ON news(threat_type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_location ON news(location_scope, location_name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_emergency ON news(emergency)")
+    # conditional-GET validators remembered per feed
+    conn.execute('''CREATE TABLE IF NOT EXISTS feed_state (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    modified TEXT
+                )''')
+    backfill_derived(conn)
+
+
+def _m2_rescore(conn):
+    """Re-derive threat fields with the word-boundary keyword matcher."""
+    backfill_derived(conn, "1")
+
+
+def _m3_indexes(conn):
+    """Unique source, timestamp/day/category/bias indexes and a stored day."""
+    # older collectors deduplicated on headline, so the same link may be
+    # stored more than once; keep the first copy
+    conn.execute('''DELETE FROM news WHERE source IS NOT NULL AND id NOT IN (
+                        SELECT MIN(id) FROM news WHERE source IS NOT NULL GROUP BY source
+                    )''')
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_news_source ON news(source)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_timestamp ON news(timestamp)")
+    if "day" not in _columns(conn, "news"):
+        conn.execute("ALTER TABLE news ADD COLUMN day TEXT")
+    conn.execute("UPDATE news SET day = date(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_day ON news(day, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_category ON news(category)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_bias ON news(bias)")
+
+
+def _count_upsert(kind, expr, delta):
+    return f"""INSERT INTO news_counts (kind, key, count) VALUES ('{kind}', {expr}, {delta})
+                   ON CONFLICT(kind, key) DO UPDATE SET count = count + ({delta});"""
+
+
+def _m4_counts(conn):
+    """news_counts: category / bias / total counters kept by triggers."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS news_counts (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (kind, key)
+                ) WITHOUT ROWID''')
+    category = "COALESCE(NEW.category, 'Unclassified')"
+    bias = "COALESCE(NEW.bias, 'Unclassified')"
+    old_category = "COALESCE(OLD.category, 'Unclassified')"
+    old_bias = "COALESCE(OLD.bias, 'Unclassified')"
+    # no DELETE trigger: counts cover every row ever ingested, so rows
+    # moved out of the hot table later on stay counted
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_counts_ai AFTER INSERT ON news BEGIN
+                    {_count_upsert('category', category, 1)}
+                    {_count_upsert('bias', bias, 1)}
+                    {_count_upsert('total', "''", 1)}
+                END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_counts_au_category
+                AFTER UPDATE OF category ON news WHEN OLD.category IS NOT NEW.category BEGIN
+                    {_count_upsert('category', old_category, -1)}
+                    {_count_upsert('category', category, 1)}
+                END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_counts_au_bias
+                AFTER UPDATE OF bias ON news WHEN OLD.bias IS NOT NEW.bias BEGIN
+                    {_count_upsert('bias', old_bias, -1)}
+                    {_count_upsert('bias', bias, 1)}
+                END""")
+    conn.execute("DELETE FROM news_counts")
+    conn.execute('''INSERT INTO news_counts (kind, key, count)
+                    SELECT 'category', COALESCE(category, 'Unclassified'), COUNT(*) FROM news GROUP BY 1, 2
+                    UNION ALL
+                    SELECT 'bias', COALESCE(bias, 'Unclassified'), COUNT(*) FROM news GROUP BY 1, 2
+                    UNION ALL
+                    SELECT 'total', '', COUNT(*) FROM news''')
+
+
+def _m5_data_version(conn):
+    """meta.data_version, bumped by every write to news (HTTP ETags)."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )''')
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_version_{event[0].lower()}
+                    AFTER {event} ON news BEGIN
+                        UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+                    END""")
+
+
+def _m6_keyset_indexes(conn):
+    """(filter, timestamp) indexes so filtered keyset pages skip the sort.
+
+    Every index implicitly ends in the rowid (news.id), which is the
+    cursor's tie-breaker.
+    """
+    conn.execute("DROP INDEX IF EXISTS idx_news_threat_type")
+    conn.execute("DROP INDEX IF EXISTS idx_news_location")
+    conn.execute("DROP INDEX IF EXISTS idx_news_emergency")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_threat_type_ts ON news(threat_type, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_location_ts ON news(location_scope, location_name, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_emergency_ts ON news(emergency, timestamp)")
+
+
+def _m7_fts(conn):
+    """news_fts headline search index, synced by triggers (backend/search.py)."""
+    create_fts(conn)
+    rebuild_fts(conn)
+
+
+def _m8_clusters(conn):
+    """news.cluster_id, MinHash/LSH tables and per-story category counts."""
+    if "cluster_id" not in _columns(conn, "news"):
+        conn.execute("ALTER TABLE news ADD COLUMN cluster_id INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_cluster ON news(cluster_id) WHERE cluster_id IS NOT NULL")
+    clusters.create_tables(conn)
+    category = "COALESCE(NEW.category, 'Unclassified')"
+    old_category = "COALESCE(OLD.category, 'Unclassified')"
+    # a row counts as a story until it joins an earlier row's cluster
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_counts_ai_story AFTER INSERT ON news
+                WHEN NEW.cluster_id IS NULL BEGIN
+                    {_count_upsert('story', category, 1)}
+                END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_counts_au_story
+                AFTER UPDATE OF cluster_id, category ON news
+                WHEN OLD.cluster_id IS NULL OR NEW.cluster_id IS NULL BEGIN
+                    INSERT INTO news_counts (kind, key, count)
+                        SELECT 'story', {old_category}, -1 WHERE OLD.cluster_id IS NULL
+                        ON CONFLICT(kind, key) DO UPDATE SET count = count - 1;
+                    INSERT INTO news_counts (kind, key, count)
+                        SELECT 'story', {category}, 1 WHERE NEW.cluster_id IS NULL
+                        ON CONFLICT(kind, key) DO UPDATE SET count = count + 1;
+                END""")
+    conn.execute("DELETE FROM news_counts WHERE kind = 'story'")
+    conn.execute('''INSERT INTO news_counts (kind, key, count)
+                    SELECT 'story', COALESCE(category, 'Unclassified'), COUNT(*) FROM news
+                    WHERE cluster_id IS NULL GROUP BY 2''')
+    # existing rows inside the clustering window; the trigger above takes
+    # the ones that join a cluster out of the story counts
+    clusters.backfill(conn)
+
+
+
+def _m9_timeseries(conn):
+    """news_series hourly/daily counts, kept by triggers (backend/timeseries.py)."""
+    timeseries.create_tables(conn)
+    timeseries.backfill(conn)
+
+
+
+def _m10_label_source(conn):
+    """news.label_source: 'manual' or 'model' for labels set after ingest."""
+    if "label_source" not in _columns(conn, "news"):
+        conn.execute("ALTER TABLE news ADD COLUMN label_source TEXT")
+
+
+def _m11_scheduler(conn):
+    """scheduler_lease and feed_state.last_run/last_error (backend/scheduler.py)."""
+    scheduler.create_tables(conn)
+
+
+def _m12_retention(conn):
+    """archived_days for archived rows (backend/retention.py)."""
+    retention.create_tables(conn)
+
+
+def _m13_drop_rollup(conn):
+    """Drop news_rollup: nothing read it, since news_counts and news_series
+    already keep counting archived rows."""
+    conn.execute("DROP TABLE IF EXISTS news_rollup")
+
+
+MIGRATIONS = [
+    _m1_base_schema,
+    _m2_rescore,
+    _m3_indexes,
+    _m4_counts,
+    _m5_data_version,
+    _m6_keyset_indexes,
+    _m7_fts,
+    _m8_clusters,
+    _m9_timeseries,
+    _m10_label_source,
+    _m11_scheduler,
+    _m12_retention,
+    _m13_drop_rollup,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """Bring ``conn`` up to SCHEMA_VERSION; returns (old, new) versions."""
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    for version, step in enumerate(MIGRATIONS[current:], start=current + 1):
+        conn.execute("BEGIN")
+        try:
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return current, max(current, SCHEMA_VERSION)
+
+
+def init_db(path=None):
+    conn = sqlite3.connect(path or DB_FILE)
+    try:
+        # only takes effect on a new, empty file; older files are switched
+        # over once with ``python -m backend.retention --convert``
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL lets API readers proceed while the collector writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    old, new = init_db()
+    print(f"{DB_FILE}: schema version {old} -> {new}")
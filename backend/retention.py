@@ -0,0 +1,216 @@
+# retention.py
+"""Hot-window retention: old rows are moved to monthly archives.
+
+``news`` keeps the last HOT_DAYS days (env ``GCAI_HOT_DAYS``). A
+maintenance run moves every older row, BATCH at a time, to
+``archive/news-YYYY-MM.db`` next to the database:
+
+1. the rows are copied into the month's archive file through ``ATTACH``
+   with ``INSERT OR IGNORE``, and committed;
+2. in one transaction on the main file, their days are added to
+   ``archived_days``, any near-duplicate cluster whose leader is leaving
+   gets its oldest remaining member as leader, and the rows are deleted.
+
+WAL does not make a commit across attached files atomic. The two steps are
+therefore separate, and a run interrupted between them copies the same
+rows again harmlessly. news_counts and news_series have no delete
+triggers, so /api/stats, /api/insights and the time series keep counting
+archived rows. news_fts and the MinHash tables do drop them.
+
+Archive files are opened only when a request asks for an archived day
+(``archived_month``/``archive_path``), through the usual read-only pool.
+Startup and queries on the hot window never touch them, however many
+months pile up. Each run ends by returning free pages with
+``incremental_vacuum`` and refreshing planner statistics with a bounded
+``ANALYZE``.
+
+    python -m backend.retention                  # one maintenance run
+    python -m backend.retention --hot-days 30 --convert
+"""
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from backend.db import connection
+
+HOT_DAYS = int(os.environ.get("GCAI_HOT_DAYS", 90))
+BATCH = 5000  # rows per archive transaction
+RUN_BUDGET = 60  # seconds of archiving per run; the rest waits for the next
+INTERVAL = 60 * 60  # scheduler job interval (backend/scheduler.py)
+VACUUM_STEP = 2000  # pages returned per incremental_vacuum transaction
+ANALYSIS_LIMIT = 1000  # rows sampled per index by ANALYZE
+
+IDS = "SELECT value FROM json_each(?)"
+
+
+def create_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS archived_days (
+                    day TEXT PRIMARY KEY,
+                    month TEXT NOT NULL,
+                    rows INTEGER NOT NULL
+                ) WITHOUT ROWID''')
+
+
+def archive_dir(db_path):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "archive")
+
+
+def archive_path(db_path, month):
+    return os.path.join(archive_dir(db_path), f"news-{month}.db")
+
+
+def archived_month(conn, day):
+    """The archive month holding ``day``, or None if it is not archived."""
+    row = conn.execute("SELECT month FROM archived_days WHERE day = ?", (day,)).fetchone()
+    return row[0] if row else None
+
+
+def _copy_to_archive(conn, path, ids):
+    columns = [(r[1], r[2]) for r in conn.execute("PRAGMA main.table_info(news)")]
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS archive.news ({})".format(", ".join(
+            f"{name} {'INTEGER PRIMARY KEY' if name == 'id' else type_}" for name, type_ in columns)))
+        # archives made before a later migration lack its columns
+        have = {r[1] for r in conn.execute("PRAGMA archive.table_info(news)")}
+        for name, type_ in columns:
+            if name not in have:
+                conn.execute(f"ALTER TABLE archive.news ADD COLUMN {name} {type_}")
+        conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_news_day ON news(day, timestamp)")
+        names = ", ".join(name for name, _ in columns)
+        conn.execute(f"INSERT OR IGNORE INTO archive.news ({names}) SELECT {names} FROM main.news WHERE id IN ({IDS})",
+                     (json.dumps(ids),))
+        conn.commit()
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute("DETACH DATABASE archive")
+
+
+def _promote_leaders(conn, ids):
+    """Give clusters whose leader is in ``ids`` their oldest surviving member
+    as leader. The old leader's story stays counted in news_counts (no
+    delete trigger), so the count the promotion adds is taken back."""
+    moves = conn.execute(
+        f"""SELECT cluster_id, MIN(id) FROM news
+            WHERE cluster_id IN ({IDS}) AND id NOT IN ({IDS}) GROUP BY cluster_id""",
+        (json.dumps(ids), json.dumps(ids)),
+    ).fetchall()
+    for old, new in moves:
+        conn.execute("UPDATE news SET cluster_id = NULL WHERE id = ?", (new,))
+        conn.execute("UPDATE news SET cluster_id = ? WHERE cluster_id = ?", (new, old))
+        conn.execute(
+            """UPDATE news_counts SET count = count - 1 WHERE kind = 'story'
+               AND key = (SELECT COALESCE(category, 'Unclassified') FROM news WHERE id = ?)""",
+            (new,),
+        )
+    return len(moves)
+
+
+def _remove_from_hot(conn, month, ids):
+    params = (json.dumps(ids),)
+    conn.execute(
+        f"""INSERT INTO archived_days (day, month, rows)
+            SELECT day, ?, COUNT(*) FROM news WHERE id IN ({IDS}) GROUP BY day
+            ON CONFLICT(day) DO UPDATE SET rows = rows + excluded.rows""",
+        (month,) + params,
+    )
+    promoted = _promote_leaders(conn, ids)
+    conn.execute(f"DELETE FROM news WHERE id IN ({IDS})", params)
+    return promoted
+
+
+def archive_old(db_path, hot_days=HOT_DAYS, now=None, batch=BATCH, budget=RUN_BUDGET):
+    """Move rows older than ``hot_days`` to the monthly archives. Stops after
+    ``budget`` seconds. Returns ``(rows moved, clusters re-led)``."""
+    cutoff = ((now or datetime.now()) - timedelta(days=hot_days)).strftime("%Y-%m-%d")
+    os.makedirs(archive_dir(db_path), exist_ok=True)
+    moved = promoted = 0
+    deadline = time.monotonic() + budget
+    while time.monotonic() < deadline:
+        with connection(db_path, readonly=True) as conn:
+            # rows whose timestamp never parsed have no day and stay hot
+            rows = conn.execute(
+                "SELECT id, substr(day, 1, 7) FROM news WHERE day < ? ORDER BY day LIMIT ?", (cutoff, batch)
+            ).fetchall()
+        if not rows:
+            break
+        by_month = defaultdict(list)
+        for news_id, month in rows:
+            by_month[month].append(news_id)
+        for month, ids in sorted(by_month.items()):
+            with connection(db_path) as conn:
+                _copy_to_archive(conn, archive_path(db_path, month), ids)
+            with connection(db_path) as conn:
+                promoted += _remove_from_hot(conn, month, ids)
+            moved += len(ids)
+    return moved, promoted
+
+
+def vacuum(db_path, step=VACUUM_STEP):
+    """Return free pages to the filesystem in short transactions; returns the
+    number of pages freed (0 unless auto_vacuum is INCREMENTAL)."""
+    freed = 0
+    with connection(db_path) as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free:
+            # execute() steps the pragma once, which frees one page;
+            # executescript() runs it to completion
+            conn.executescript(f"PRAGMA incremental_vacuum({min(free, step)});")
+            left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if left >= free:
+                break
+            freed, free = freed + free - left, left
+    return freed
+
+
+def analyze(db_path):
+    """Refresh planner statistics from a bounded sample of each index."""
+    with connection(db_path) as conn:
+        conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+        conn.execute("ANALYZE")
+
+
+def convert(db_path):
+    """Switch an existing file to incremental auto-vacuum. This rewrites the
+    whole file with a full VACUUM, so run it once, off-peak."""
+    with connection(db_path) as conn:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+def run(db_path, hot_days=HOT_DAYS):
+    """One maintenance pass: archive, vacuum, analyze. Returns a summary."""
+    start = time.perf_counter()
+    moved, promoted = archive_old(db_path, hot_days)
+    freed = vacuum(db_path)
+    analyze(db_path)
+    summary = {"archived": moved, "clusters_reled": promoted, "pages_freed": freed,
+               "seconds": round(time.perf_counter() - start, 2)}
+    print("🧹 Retention:", summary)
+    return summary
+
+
+def main():
+    from backend.models import DB_FILE, init_db
+
+    ap = argparse.ArgumentParser(description="Archive rows older than the hot window and compact the database.")
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--hot-days", type=int, default=HOT_DAYS)
+    ap.add_argument("--convert", action="store_true",
+                    help="first switch the file to incremental auto-vacuum (full VACUUM)")
+    args = ap.parse_args()
+
+    init_db(args.db)
+    if args.convert:
+        convert(args.db)
+    run(args.db, args.hot_days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# scheduler.py
+"""Feed collection that only one process runs at a time.
+
+Every gunicorn worker starts a Scheduler (see gunicorn.conf.py), and so
+does ``python -m backend.scheduler`` if it runs as a separate process. Only
+the process that holds the ``scheduler_lease`` row fetches. A single
+conditional upsert takes and renews the lease, so SQLite's write lock
+makes it atomic: the upsert succeeds only when the row is already ours or
+has expired. The leader renews it every TICK, and while a collection or job
+runs (which can take longer than LEASE_TTL) a second thread keeps renewing
+it. If the leader dies, it stops renewing and another process takes over
+within LEASE_TTL. A leader that shuts down cleanly releases the lease
+straight away.
+
+Each feed has its own interval (``intervals``, default DEFAULT_INTERVAL).
+Maintenance ``jobs`` (e.g. backend/retention.py) get the same treatment
+and are stored in feed_state under ``job:<name>``.
+``feed_state.last_run`` records when a feed was last started, and it is
+claimed in the same transaction as the lease renewal. So a restart or a
+new leader keeps to the existing schedule instead of fetching everything
+again, and a feed already claimed is never claimed twice.
+
+    python -m backend.scheduler        # dedicated collector process
+    python -m backend.collector        # the same
+"""
+import atexit
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+
+from backend import metrics
+from backend.db import connection
+
+DEFAULT_INTERVAL = 10 * 60  # seconds between fetches of one feed
+TICK = 15  # seconds between lease renewals and due checks
+LEASE_TTL = 120  # a leader that stops renewing is replaced after this long
+LEASE_NAME = "collector"
+
+# insert the lease, or take it over only if it is ours or has expired; the
+# row count says whether we hold it
+ACQUIRE_SQL = """INSERT INTO scheduler_lease (name, holder, expires_at) VALUES (?, ?, ?)
+                 ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+                 WHERE scheduler_lease.holder = excluded.holder OR scheduler_lease.expires_at < ?"""
+
+
+def create_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS scheduler_lease (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )''')
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(feed_state)")}
+    if "last_run" not in columns:
+        conn.execute("ALTER TABLE feed_state ADD COLUMN last_run REAL")
+    if "last_error" not in columns:
+        conn.execute("ALTER TABLE feed_state ADD COLUMN last_error TEXT")
+
+
+def acquire(conn, holder, ttl=LEASE_TTL, now=None, name=LEASE_NAME):
+    """Take or renew the lease; True if ``holder`` holds it afterwards."""
+    now = time.time() if now is None else now
+    return conn.execute(ACQUIRE_SQL, (name, holder, now + ttl, now)).rowcount > 0
+
+
+def release(conn, holder, name=LEASE_NAME):
+    conn.execute("DELETE FROM scheduler_lease WHERE name = ? AND holder = ?", (name, holder))
+
+
+def due(conn, urls, interval, now):
+    """The feeds in ``urls`` whose interval has passed since their last run."""
+    last = dict(conn.execute("SELECT url, last_run FROM feed_state WHERE last_run IS NOT NULL"))
+    return [u for u in urls if u not in last or last[u] + interval(u) <= now]
+
+
+def claim(conn, urls, now):
+    conn.executemany(
+        """INSERT INTO feed_state (url, last_run) VALUES (?, ?)
+           ON CONFLICT(url) DO UPDATE SET last_run = excluded.last_run""",
+        [(u, now) for u in urls],
+    )
+
+
+def job_key(name):
+    return f"job:{name}"
+
+
+def record_error(conn, key, error):
+    conn.execute(
+        """INSERT INTO feed_state (url, last_error) VALUES (?, ?)
+           ON CONFLICT(url) DO UPDATE SET last_error = excluded.last_error""",
+        (key, error),
+    )
+
+
+def status(conn, urls, intervals=None, jobs=None):
+    """Lease holder, per-feed and per-job schedule, for /api/scheduler.
+    ``jobs`` maps job name -> interval."""
+    intervals = intervals or {}
+    lease = conn.execute(
+        "SELECT holder, expires_at FROM scheduler_lease WHERE name = ?", (LEASE_NAME,)
+    ).fetchone()
+    rows = {r[0]: r for r in conn.execute("SELECT url, last_run, last_error FROM feed_state")}
+
+    def entry(key, interval):
+        _, last_run, last_error = rows.get(key, (key, None, None))
+        return {
+            "interval": interval,
+            "last_run": last_run,
+            "next_run": last_run + interval if last_run is not None else None,
+            "last_error": last_error,
+        }
+
+    return {
+        "leader": lease[0] if lease else None,
+        "lease_expires_at": lease[1] if lease else None,
+        "feeds": [dict(url=url, **entry(url, intervals.get(url, DEFAULT_INTERVAL))) for url in urls],
+        "jobs": [dict(name=name, **entry(job_key(name), interval)) for name, interval in (jobs or {}).items()],
+    }
+
+
+class Scheduler:
+    """Calls ``run(urls)`` with the feeds of ``feeds`` that are due, while
+    this process holds the lease on ``db_path``.
+
+    ``feeds`` is iterated on every tick, so feeds added at runtime are picked
+    up. ``intervals`` maps url -> seconds. ``jobs`` maps a name to
+    ``(seconds, fn)``; a due job runs after the feeds, on the same thread.
+    """
+
+    def __init__(self, db_path, feeds, run, intervals=None, tick=TICK, ttl=LEASE_TTL, jobs=None):
+        self.db_path = db_path
+        self.feeds = feeds
+        self.run = run
+        self.intervals = intervals if intervals is not None else {}
+        self.jobs = {job_key(name): job for name, job in (jobs or {}).items()}
+        self.tick = tick
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.leader = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def interval(self, key):
+        if key in self.jobs:
+            return self.jobs[key][0]
+        return self.intervals.get(key, DEFAULT_INTERVAL)
+
+    def step(self, now=None):
+        """One tick: take or renew the lease, claim the due feeds and jobs
+        and run them. Returns the feed urls and job keys that were run."""
+        start = time.perf_counter()
+        now = time.time() if now is None else now
+        with connection(self.db_path) as conn:
+            leader = acquire(conn, self.holder, self.ttl, now)
+            keys = due(conn, [*self.feeds, *self.jobs], self.interval, now) if leader else []
+            if keys:
+                claim(conn, keys, now)
+        if leader != self.leader:
+            print(f"🕒 Scheduler {self.holder}: {'leading' if leader else 'standing by'}")
+            self.leader = leader
+        if keys:
+            with self.renewing():
+                urls = [k for k in keys if k not in self.jobs]
+                if urls:
+                    self.run(urls)
+                for key in keys:
+                    # the lease can be lost mid-run if renewal stalled
+                    if key in self.jobs and self.leader:
+                        self.run_job(key)
+        metrics.SCHEDULER_TICK_SECONDS.observe(time.perf_counter() - start, "leader" if leader else "standby")
+        return keys
+
+    @contextmanager
+    def renewing(self):
+        """Renew the lease every ``tick`` on another thread until the block
+        ends, so a run longer than ``ttl`` keeps it."""
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(self.tick):
+                try:
+                    with connection(self.db_path) as conn:
+                        held = acquire(conn, self.holder, self.ttl)
+                except Exception as e:
+                    metrics.ERRORS.inc(1, "scheduler")
+                    print("❌ Lease renewal error:", e)
+                    continue
+                if not held:
+                    print(f"🕒 Scheduler {self.holder}: lost the lease mid-run")
+                    self.leader = False
+                    return
+
+        thread = threading.Thread(target=renew, name="scheduler-lease", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def run_job(self, key):
+        error = None
+        try:
+            with metrics.JOB_SECONDS.time(key):
+                self.jobs[key][1]()
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            metrics.ERRORS.inc(1, key)
+            print(f"❌ {key}: {error}")
+            traceback.print_exc()
+        with connection(self.db_path) as conn:
+            record_error(conn, key, error)
+
+    def loop(self):
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                metrics.ERRORS.inc(1, "scheduler")
+                print("❌ Scheduler error:", e)
+                traceback.print_exc()
+            self._stop.wait(self.tick)
+
+    def start(self):
+        """Run ``loop`` on a daemon thread; the lease is released at exit."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.loop, name="scheduler", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.tick if timeout is None else timeout)
+        if self.leader:
+            with connection(self.db_path) as conn:
+                release(conn, self.holder)
+            self.leader = False
+
+
+def main():
+    from backend import app as backend_app
+    from backend.models import init_db
+
+    init_db(backend_app.DB)
+    scheduler = Scheduler(backend_app.DB, backend_app.FEEDS, backend_app.fetch_and_store,
+                          backend_app.FEED_INTERVALS, jobs=backend_app.scheduler_jobs())
+    print(f"🕒 Collector {scheduler.holder} running against {backend_app.DB}")
+    try:
+        scheduler.loop()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# scoring.py
+"""Single-pass keyword scoring for severity and locations.
+
+All keyword tables are compiled into one regular expression: keywords are
+folded into a prefix trie (so the engine never retries a shared prefix)
+and wrapped in word boundaries, so "US" no longer matches inside "bus".
+All-caps keywords (US, UK) are matched case-sensitively, which keeps "us"
+the pronoun out of the US bucket. One ``findall`` pass over a headline
+yields both the severity and every region it mentions.
+"""
+import re
+from urllib.parse import urlsplit
+
+SEVERITY_KEYWORDS = {
+    30: ["risk", "risk of", "threat", "threaten", "threatened"],
+    40: ["flood", "flooding", "storm", "typhoon", "hurricane", "drought", "climate"],
+    50: ["disease", "outbreak", "pandemic", "virus", "infection"],
+    60: ["protest", "protester", "unrest", "violence", "attack", "attacked", "killed", "dead", "death"],
+    80: ["war", "invasion", "massacre", "genocide", "collapse", "crisis"]
+}
+
+# order matters: location_from() reports the first region in this table
+REGION_KEYWORDS = {
+    "UK": ["UK", "Britain", "British", "England"],
+    "China": ["China", "Chinese", "Taiwan", "Beijing"],
+    "Middle East": ["Gaza", "Israel", "Palestine", "Syria", "Iraq"],
+    "Ukraine": ["Ukraine", "Kiev", "Kyiv"],
+    "US": ["US", "United States", "America", "Washington"],
+    "India": ["India", "Indian"],
+}
+REGION_ORDER = {name: i for i, name in enumerate(REGION_KEYWORDS)}
+
+
+def _plurals(word):
+    # with word boundaries "attacks" no longer contains "attack", so list
+    # the plural forms explicitly
+    if word.endswith("is"):
+        return [word, word[:-2] + "es"]
+    if word.endswith(("s", "x", "ch", "sh")):
+        return [word, word + "es"]
+    return [word, word + "s"]
+
+
+def _trie_regex(words):
+    """Alternation for ``words`` with shared prefixes factored out."""
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            # a longer keyword is tried before the shorter one that ends here
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+def _compile():
+    # normalized keyword -> points / region name; all-caps keywords are
+    # stored as-is, everything else lowercased
+    points, region_of = {}, {}
+    for pts, kws in SEVERITY_KEYWORDS.items():
+        for kw in kws:
+            for form in _plurals(kw.lower()):
+                points[form] = max(pts, points.get(form, 0))
+    for name, kws in REGION_KEYWORDS.items():
+        for kw in kws:
+            region_of.setdefault(kw if kw.isupper() else kw.lower(), name)
+
+    keys = list(points) + list(region_of)
+    exact = [k for k in keys if k.isupper()]
+    folded = [k for k in keys if not k.isupper()]
+    alternatives = []
+    if exact:
+        alternatives.append("(?-i:" + _trie_regex(exact) + ")")
+    alternatives.append(_trie_regex(folded))
+    pattern = re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w)", re.IGNORECASE)
+    return pattern, points, region_of
+
+
+KEYWORD_RE, KEYWORD_POINTS, KEYWORD_REGION = _compile()
+
+
+def scan(text):
+    """Return ``(severity, regions)`` for ``text`` in one pass.
+
+    ``severity`` is the keyword score before any bias adjustment; ``regions``
+    lists every matched region in REGION_KEYWORDS order.
+    """
+    score = 0
+    regions = []
+    for kw in KEYWORD_RE.findall(text or ""):
+        pts = KEYWORD_POINTS.get(kw) or KEYWORD_POINTS.get(kw.lower())
+        if pts:
+            if pts > score:
+                score = pts
+            continue
+        name = KEYWORD_REGION.get(kw) or KEYWORD_REGION[kw.lower()]
+        if name not in regions:
+            regions.append(name)
+    if len(regions) > 1:
+        regions.sort(key=REGION_ORDER.get)
+    return score, regions
+
+
+def score_batch(texts):
+    """``scan()`` each of ``texts``; returns a list of ``(severity, regions)``."""
+    return [scan(t) for t in texts]
+
+
+def scoring_text(headline, category, bias):
+    return (headline or "") + " " + (category or "") + " " + (bias or "")
+
+
+def bias_adjusted(score, bias):
+    # bias increases severity slightly
+    if bias and "potential" in bias.lower():
+        score = min(100, score + 5)
+    return score
+
+
+# where a row's outlet is, for headlines that name no place: hostname
+# fragment (a suffix when it starts with ".") -> (scope, name), first match
+# wins. Shared by the stored threat fields and /api/analysis
+# (backend/analysis.py).
+HOST_REGIONS = (
+    ("bbc", ("Region", "UK")),
+    (".co.uk", ("Region", "UK")),
+    ("aljazeera", ("Region", "Middle East")),
+    ("nytimes", ("Country", "US")),
+    ("reuters", ("Region", "Global")),
+)
+
+
+def host_region(source, table=HOST_REGIONS):
+    """``(scope, name)`` for the host of the ``source`` url, or None."""
+    host = urlsplit(source or "").hostname
+    if host:
+        for fragment, region in table:
+            if host.endswith(fragment) if fragment.startswith(".") else fragment in host:
+                return region
+    return None
+
+
+def location_from(regions, source):
+    """Return ``(scope, name)``: the first of ``regions``, else a rough guess
+    from the source hostname."""
+    if regions:
+        return ("Country", regions[0])
+    return host_region(source) or ("Global", "Global")
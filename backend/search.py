@@ -0,0 +1,104 @@
+# search.py
+"""Full-text search over headlines with SQLite FTS5.
+
+``news_fts`` is an external-content FTS5 table over ``news.headline``. It
+stores only the index, not a second copy of the text, and triggers keep it
+in sync (see ``models._m7_fts``). The routes join it on rowid:
+
+    SELECT ... FROM news JOIN news_fts ON news_fts.rowid = news.id
+    WHERE news_fts MATCH ? ORDER BY bm25(news_fts)
+
+``sort=recent`` on the routes orders matches newest first instead.
+
+User input never reaches MATCH as-is. ``match_expr`` turns it into quoted
+terms that are ANDed together, so stray quotes or operators cannot cause a
+syntax error.
+
+To rebuild the index of an existing database (for example after copying
+rows in with triggers disabled), run ``python -m backend.search --rebuild``.
+"""
+import argparse
+import re
+import sqlite3
+
+FTS_TABLE = "news_fts"
+# porter: "flooding" finds "floods"; remove_diacritics: "kyiv" finds "Kyïv"
+FTS_TOKENIZE = "porter unicode61 remove_diacritics 2"
+
+FTS_JOIN = f"JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = news.id"
+FTS_MATCH = f"{FTS_TABLE} MATCH ?"
+# bm25 is lower-is-better; ties fall back to newest first. Ranking scores
+# every match, so broad terms over large tables cost more than "recent",
+# which walks the index backwards and stops at the page size.
+RANK_ORDER = f"bm25({FTS_TABLE}), {FTS_TABLE}.rowid DESC"
+RECENT_ORDER = f"{FTS_TABLE}.rowid DESC"
+SEARCH_ORDER = {"relevance": RANK_ORDER, "recent": RECENT_ORDER}
+SNIPPET_SQL = f"snippet({FTS_TABLE}, 0, '<mark>', '</mark>', '…', 16)"
+
+MAX_TERMS = 16
+_TERM_RE = re.compile(r"\w+\*?", re.UNICODE)
+
+
+def match_expr(q):
+    """FTS5 MATCH expression for a free-text query, or None if it has no terms.
+
+    Every word becomes a quoted phrase and all of them must match. A
+    trailing ``*`` keeps prefix matching (``protest*``).
+    """
+    terms = []
+    for term in _TERM_RE.findall(q or "")[:MAX_TERMS]:
+        if term.endswith("*"):
+            terms.append(f'"{term[:-1]}"*')
+        else:
+            terms.append(f'"{term}"')
+    return " ".join(terms) or None
+
+
+def create_fts(conn):
+    """news_fts and the triggers that mirror headline writes into it."""
+    conn.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                    headline, content='news', content_rowid='id', tokenize='{FTS_TOKENIZE}'
+                )""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_fts_ai AFTER INSERT ON news BEGIN
+                    INSERT INTO {FTS_TABLE} (rowid, headline) VALUES (NEW.id, NEW.headline);
+                END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_fts_ad AFTER DELETE ON news BEGIN
+                    INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, headline) VALUES ('delete', OLD.id, OLD.headline);
+                END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_fts_au AFTER UPDATE OF headline ON news BEGIN
+                    INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, headline) VALUES ('delete', OLD.id, OLD.headline);
+                    INSERT INTO {FTS_TABLE} (rowid, headline) VALUES (NEW.id, NEW.headline);
+                END""")
+
+
+def rebuild(conn):
+    """Re-index every headline from ``news``; returns the row count."""
+    conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+    conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+
+def main():
+    from backend.models import DB_FILE, init_db
+
+    ap = argparse.ArgumentParser(description="Maintain the headline search index.")
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--rebuild", action="store_true", help="re-index all headlines")
+    args = ap.parse_args()
+
+    # migrating creates and fills news_fts on databases that predate it
+    old, new = init_db(args.db)
+    if old != new:
+        print(f"{args.db}: schema version {old} -> {new}")
+    if args.rebuild:
+        conn = sqlite3.connect(args.db)
+        try:
+            with conn:
+                n = rebuild(conn)
+        finally:
+            conn.close()
+        print(f"{args.db}: re-indexed {n} headlines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# static.py
+"""The React build (``build/`` next to this file) served from memory.
+
+``get_manifest()`` walks the build once per process. For every file it keeps
+the MIME type, a content hash (the ETag), its cache policy, and each
+precompressed ``.br`` / ``.gz`` sibling as a variant. A request is then a
+dict lookup: no ``os.path.exists`` and no open() for anything up to
+MEMORY_LIMIT bytes.
+
+* The variant served is chosen from ``Accept-Encoding`` (br, then gzip),
+  with ``Vary: Accept-Encoding``.
+* Content-hashed names from the CRA build (``main.3f2a1b9c.js``,
+  ``787.1a2b3c4d.chunk.js``) are cached for a year as ``immutable``, so
+  repeat visits never ask for them again.
+* Everything else, including ``index.html``, is ``no-cache`` with an ETag,
+  so a revalidation costs a bodyless 304.
+
+``precompress()`` writes the ``.gz`` (and ``.br`` when the optional
+``brotli`` package is installed) variants for text assets. gunicorn runs it
+once in the master before workers start (gunicorn.conf.py), or run it after
+``npm run build``:
+
+    python -m backend.static [build dir]
+
+The manifest is not refreshed while the process runs; deploy a new build
+with a restart.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+import tempfile
+from collections import namedtuple
+from functools import lru_cache
+
+from flask import Response, request
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:  # .br files made elsewhere are still served
+    brotli = None
+
+BUILD_DIR = os.environ.get("GCAI_BUILD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "build"))
+INDEX = "index.html"
+MEMORY_LIMIT = 2 * 1024 * 1024  # bytes; larger files (source maps) stream from disk
+MIN_SIZE = 1024  # smaller files are not worth a compressed variant
+COMPRESSIBLE = {".html", ".js", ".css", ".json", ".map", ".svg", ".txt", ".ico", ".xml", ".webmanifest"}
+
+# CRA names built files <name>.<8+ hex>.<ext>, e.g. main.3f2a1b9c.chunk.js
+HASHED_RE = re.compile(r"\.[0-9a-f]{8,}\.")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# preferred first: (Content-Encoding, file suffix)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+Variant = namedtuple("Variant", "path size body")  # body is None above MEMORY_LIMIT
+Asset = namedtuple("Asset", "mimetype etag cache_control variants")  # encoding -> Variant
+
+
+def _variant(path):
+    size = os.path.getsize(path)
+    body = None
+    if size <= MEMORY_LIMIT:
+        with open(path, "rb") as f:
+            body = f.read()
+    return Variant(path, size, body)
+
+
+def _digest(path):
+    h = hashlib.blake2b(digest_size=12)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Manifest:
+    def __init__(self, root=BUILD_DIR):
+        self.root = root
+        self.assets = {}  # url path relative to the root -> Asset
+        if not os.path.isdir(root):
+            return
+        for dirpath, _, names in os.walk(root):
+            present = set(names)
+            for name in names:
+                base, ext = os.path.splitext(name)
+                if ext in (".br", ".gz") and base in present:
+                    continue  # a variant of ``base``
+                path = os.path.join(dirpath, name)
+                variants = {"identity": _variant(path)}
+                mtime = os.path.getmtime(path)
+                for encoding, suffix in ENCODINGS:
+                    # a variant older than its source is left over from a previous build
+                    if name + suffix in present and os.path.getmtime(path + suffix) >= mtime:
+                        variants[encoding] = _variant(path + suffix)
+                key = os.path.relpath(path, root).replace(os.sep, "/")
+                self.assets[key] = Asset(
+                    mimetypes.guess_type(name)[0] or "application/octet-stream",
+                    _digest(path),
+                    IMMUTABLE if HASHED_RE.search(name) else REVALIDATE,
+                    variants,
+                )
+
+    def __len__(self):
+        return len(self.assets)
+
+    def get(self, path):
+        return self.assets.get(path)
+
+
+@lru_cache(maxsize=None)
+def get_manifest():
+    """The shared Manifest for BUILD_DIR, built on first use."""
+    return Manifest()
+
+
+def response(asset):
+    """The Response for ``asset`` under the current request: the best
+    encoding the client accepts, or a 304 when its ETag still matches."""
+    encoding = "identity"
+    for name, _ in ENCODINGS:
+        if name in asset.variants and request.accept_encodings[name]:
+            encoding = name
+            break
+    etag = asset.etag if encoding == "identity" else f"{asset.etag}-{encoding}"
+
+    if request.if_none_match.contains_weak(etag):
+        rv = Response(status=304)
+    else:
+        variant = asset.variants[encoding]
+        body = variant.body
+        if body is None:
+            body = wrap_file(request.environ, open(variant.path, "rb"))
+        rv = Response(body, mimetype=asset.mimetype, direct_passthrough=True)
+        rv.content_length = variant.size
+        if encoding != "identity":
+            rv.content_encoding = encoding
+    rv.set_etag(etag)
+    rv.headers["Cache-Control"] = asset.cache_control
+    if len(asset.variants) > 1:
+        rv.vary.add("Accept-Encoding")
+    return rv
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def precompress(root=BUILD_DIR, min_size=MIN_SIZE):
+    """Write missing or stale ``.gz`` (and ``.br`` with brotli installed)
+    variants of the text assets under ``root``. Returns the files written."""
+    written = 0
+    if not os.path.isdir(root):
+        return written
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if os.path.splitext(name)[1] not in COMPRESSIBLE:
+                continue
+            path = os.path.join(dirpath, name)
+            if os.path.getsize(path) < min_size:
+                continue
+            mtime = os.path.getmtime(path)
+            data = None
+            for encoding, suffix in ENCODINGS:
+                if encoding == "br" and brotli is None:
+                    continue
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    continue
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                if encoding == "br":
+                    packed = brotli.compress(data, quality=11)
+                else:
+                    packed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(packed) < len(data):
+                    _write_atomic(target, packed)
+                    written += 1
+    return written
+
+
+def main():
+    root = sys.argv[1] if len(sys.argv) > 1 else BUILD_DIR
+    written = precompress(root)
+    print(f"🗜️  {written} compressed variants written, {len(Manifest(root))} assets in {root}")
+
+
+if __name__ == "__main__":
+    main()
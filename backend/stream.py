@@ -0,0 +1,212 @@
+# stream.py
+"""Server-Sent Events fan-out of newly ingested threats.
+
+One ``Broadcaster`` per database runs a single watcher thread, and only
+while someone is subscribed. The watcher reads rows newer than the last id
+it has seen, either when the local collector calls ``notify()`` after a
+commit or every ``POLL_INTERVAL`` seconds (this picks up rows written by
+another process). Each new batch becomes events in a shared ring buffer,
+and every subscriber just waits for it. Idle connections therefore cost no
+query.
+
+Served by Flask, each stream holds a gthread worker thread, so at most
+MAX_SUBSCRIBERS are open per process and /api/stream answers 503 to the
+rest. ``python -m backend.streamserver`` serves the same stream from one
+asyncio loop, where an idle subscriber is a socket and a parked coroutine;
+route /api/stream to it when many dashboards stay open.
+
+Event ids are news ids, so a reconnecting ``EventSource`` resumes through
+``Last-Event-ID``. The buffer serves recent gaps and the database serves
+older ones, up to RESUME_LIMIT rows; a longer gap gets one ``reset`` event
+instead, telling the client to reload everything.
+"""
+import json
+import os
+import threading
+from collections import deque
+
+from backend.db import connection
+from backend.threats import THREAT_SELECT, threat_item, trend_key
+from backend.timeseries import trends
+
+POLL_INTERVAL = 2.0  # seconds between watcher checks when not notified
+KEEPALIVE = 15.0  # seconds between comment frames on idle streams
+BACKLOG = 1000  # events kept in memory for resuming subscribers
+RESUME_LIMIT = 500  # max rows replayed from the database on resume; more is a reset
+# streams per process; keep well under the worker's threads (Procfile: 64)
+MAX_SUBSCRIBERS = int(os.environ.get("GCAI_STREAM_MAX", 16))
+RETRY_AFTER = 60  # seconds a refused subscriber is asked to wait
+
+
+def format_event(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def stats_delta(rows):
+    """Per-batch increments in /api/stats shape."""
+    delta = {"categories": {}, "severity": {}, "total": len(rows)}
+    for r in rows:
+        cat = r["category"] if r["category"] is not None else "Unclassified"
+        bias = r["bias"] if r["bias"] is not None else "Unclassified"
+        delta["categories"][cat] = delta["categories"].get(cat, 0) + 1
+        delta["severity"][bias] = delta["severity"].get(bias, 0) + 1
+    return delta
+
+
+def events_for(rows, series=None):
+    """(id, frame) pairs: one ``threat`` per row plus one ``stats`` delta.
+    ``series`` is the trends() mapping for the rows."""
+    if not rows:
+        return []
+    frames = [(r["id"], format_event(r["id"], "threat", threat_item(r, series))) for r in rows]
+    last = rows[-1]["id"]
+    frames.append((last, format_event(last, "stats", stats_delta(rows))))
+    return frames
+
+
+def rows_after(path, last_id, limit):
+    """Rows with id > ``last_id`` and their trends() mapping."""
+    with connection(path, readonly=True) as conn:
+        rows = conn.execute(
+            f"SELECT {THREAT_SELECT} FROM news WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit),
+        ).fetchall()
+        return rows, trends(conn, {trend_key(r) for r in rows})
+
+
+class Broadcaster:
+    """Shared queue of SSE frames for one database file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.cond = threading.Condition()
+        self.frames = deque(maxlen=BACKLOG)  # (news id, frame)
+        self.last_id = None
+        self.subscribers = 0
+        self.wake = threading.Event()
+        self.watcher = None
+        self.listeners = set()  # called from the watcher after each new batch
+
+    def notify(self):
+        """Called after local commits so subscribers do not wait for a poll."""
+        self.wake.set()
+
+    def _head(self):
+        with connection(self.path, readonly=True) as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM news").fetchone()[0]
+
+    def _watch(self):
+        while True:
+            self.wake.wait(POLL_INTERVAL)
+            self.wake.clear()
+            with self.cond:
+                if not self.subscribers:
+                    self.watcher = None
+                    return
+            try:
+                rows, series = rows_after(self.path, self.last_id, BACKLOG)
+            except Exception as e:
+                print("❌ Stream watcher error:", e)
+                continue
+            if not rows:
+                continue
+            with self.cond:
+                self.frames.extend(events_for(rows, series))
+                self.last_id = rows[-1]["id"]
+                self.cond.notify_all()
+            for listener in list(self.listeners):
+                listener()
+
+    def subscribe(self, limit=MAX_SUBSCRIBERS):
+        """Register a subscriber; returns the current position, or None when
+        ``limit`` are already connected (None: no limit). Pair with
+        unsubscribe()."""
+        with self.cond:
+            if limit is not None and self.subscribers >= limit:
+                return None
+            if self.watcher is None:
+                # nobody was listening, so the buffer may have a gap: restart
+                # from the current head
+                self.frames.clear()
+                self.last_id = self._head()
+                self.watcher = threading.Thread(target=self._watch, daemon=True)
+                self.watcher.start()
+            self.subscribers += 1
+            return self.last_id
+
+    def unsubscribe(self):
+        with self.cond:
+            self.subscribers -= 1
+
+    def pending(self, after_id):
+        """Frames with id > after_id, without waiting."""
+        out = []
+        with self.cond:
+            # ids never decrease, so only the tail is new
+            for i, f in reversed(self.frames):
+                if i <= after_id:
+                    break
+                out.append((i, f))
+        out.reverse()
+        return out
+
+    def wait(self, after_id, timeout):
+        """Frames with id > after_id, blocking up to ``timeout`` for new ones."""
+        with self.cond:
+            if not self.frames or self.frames[-1][0] <= after_id:
+                self.cond.wait(timeout)
+            return [(i, f) for i, f in self.frames if i > after_id]
+
+    def covers(self, after_id):
+        """True if the buffer holds everything newer than ``after_id``."""
+        with self.cond:
+            if after_id >= self.last_id:
+                return True
+            # frames are contiguous from frames[0] up to last_id
+            return bool(self.frames) and self.frames[0][0] <= after_id + 1
+
+    def resume(self, position, last_event_id=None):
+        """``(frames, position)`` to start a subscriber at: the ``retry``
+        hint, then whatever it missed since ``last_event_id`` that the buffer
+        no longer holds, or a ``reset`` event when that is over RESUME_LIMIT
+        rows."""
+        frames = [f"retry: {int(POLL_INTERVAL * 1000)}\n\n"]
+        if last_event_id is not None and last_event_id < position and not self.covers(last_event_id):
+            # gap older than the buffer: replay it once from the database
+            rows, series = rows_after(self.path, last_event_id, RESUME_LIMIT + 1)
+            rows = [r for r in rows if r["id"] <= position]
+            if len(rows) > RESUME_LIMIT:
+                frames.append(format_event(position, "reset", {"missed": f"over {RESUME_LIMIT}"}))
+                return frames, position
+            frames.extend(frame for _, frame in events_for(rows, series))
+            position = rows[-1]["id"] if rows else position
+        elif last_event_id is not None:
+            position = last_event_id
+        return frames, position
+
+    def stream(self, position, last_event_id=None):
+        """Generator of SSE frames for a subscriber that subscribe() returned
+        ``position`` to. The caller unsubscribes when the response closes,
+        since a generator that never started has no ``finally`` to run."""
+        frames, position = self.resume(position, last_event_id)
+        yield from frames
+        while True:
+            frames = self.wait(position, KEEPALIVE)
+            if not frames:
+                yield ": keepalive\n\n"
+                continue
+            for event_id, frame in frames:
+                yield frame
+            position = frames[-1][0]
+
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+def get_broadcaster(path):
+    with _hubs_lock:
+        hub = _hubs.get(path)
+        if hub is None:
+            hub = _hubs[path] = Broadcaster(path)
+        return hub
@@ -0,0 +1,161 @@
+# streamserver.py
+"""/api/stream from one asyncio loop, for many idle dashboards.
+
+Under gunicorn's gthread worker every open stream holds one of the worker's
+threads, which is why the Flask route stops at stream.MAX_SUBSCRIBERS. This
+process serves the same events (the same ``Broadcaster``: watcher thread,
+ring buffer, ``Last-Event-ID`` resume) to any number of subscribers, each a
+coroutine parked on a shared future until the watcher publishes a batch.
+Only the watcher and resume queries touch the database, off the loop.
+
+Run it next to the web process and send /api/stream to it from the
+reverse proxy, or point the dashboard at it with ``REACT_APP_STREAM_URL``
+(then set ``GCAI_STREAM_ORIGIN`` to the dashboard's origin):
+
+    python -m backend.streamserver --port 8001
+"""
+import argparse
+import asyncio
+import os
+from urllib.parse import parse_qs, urlsplit
+
+from backend.stream import KEEPALIVE, get_broadcaster
+
+PORT = int(os.environ.get("GCAI_STREAM_PORT", 8001))
+ORIGIN = os.environ.get("GCAI_STREAM_ORIGIN")  # Access-Control-Allow-Origin, if set
+MAX_HEADER = 16 * 1024  # bytes of request line and headers read per client
+HEADER_TIMEOUT = 10  # seconds a client has to send its request
+LISTEN_BACKLOG = 1024  # pending connections, for a burst of reconnecting tabs
+
+
+class Fanout:
+    """Wakes every parked subscriber when the broadcaster has new frames."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.batch = loop.create_future()
+
+    def publish(self):
+        # called on the watcher thread
+        try:
+            self.loop.call_soon_threadsafe(self._publish)
+        except RuntimeError:
+            pass  # the loop has closed
+
+    def _publish(self):
+        batch, self.batch = self.batch, self.loop.create_future()
+        batch.set_result(None)
+
+    async def wait(self, timeout):
+        try:
+            await asyncio.wait_for(asyncio.shield(self.batch), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def read_request(reader):
+    """``(path, headers)`` of a request, or None if it is malformed."""
+    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT)
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ")
+    if len(parts) != 3 or parts[0] != "GET":
+        return None
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return parts[1], headers
+
+
+def response_head(status, headers):
+    lines = [f"HTTP/1.1 {status}", "Connection: close"]
+    if ORIGIN:
+        lines.append(f"Access-Control-Allow-Origin: {ORIGIN}")
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def handle(hub, fanout, reader, writer):
+    position = None
+    try:
+        try:
+            request = await read_request(reader)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+            return
+        if request is None:
+            writer.write(response_head("400 Bad Request", {"Content-Length": "0"}))
+            return
+        target, headers = request
+        url = urlsplit(target)
+        if url.path != "/api/stream":
+            writer.write(response_head("404 Not Found", {"Content-Length": "0"}))
+            return
+        last = headers.get("last-event-id") or parse_qs(url.query).get("lastEventId", [None])[0]
+        try:
+            last = int(last) if last else None
+        except ValueError:
+            last = None
+
+        position = await asyncio.to_thread(hub.subscribe, None)
+        frames, position = await asyncio.to_thread(hub.resume, position, last)
+        writer.write(response_head("200 OK", {
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }))
+        writer.write("".join(frames).encode("utf-8"))
+        await writer.drain()
+        while True:
+            frames = hub.pending(position)
+            if frames:
+                writer.write("".join(frame for _, frame in frames).encode("utf-8"))
+                position = frames[-1][0]
+            else:
+                await fanout.wait(KEEPALIVE)
+                if hub.pending(position):
+                    continue
+                writer.write(b": keepalive\n\n")
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        if position is not None:
+            hub.unsubscribe()
+        writer.close()
+
+
+async def start(db_path, host="0.0.0.0", port=PORT):
+    """A listening asyncio server streaming ``db_path``'s events."""
+    hub = get_broadcaster(db_path)
+    fanout = Fanout(asyncio.get_running_loop())
+    hub.listeners.add(fanout.publish)
+    return await asyncio.start_server(lambda r, w: handle(hub, fanout, r, w), host, port,
+                                      limit=MAX_HEADER, backlog=LISTEN_BACKLOG)
+
+
+async def serve(db_path, host="0.0.0.0", port=PORT):
+    server = await start(db_path, host, port)
+    print(f"📡 Stream server on {host}:{port} for {db_path}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    from backend.models import DB_FILE, init_db
+
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=PORT)
+    args = ap.parse_args()
+
+    init_db(args.db)
+    try:
+        asyncio.run(serve(args.db, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
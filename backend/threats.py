@@ -0,0 +1,162 @@
+# threats.py
+"""Threat fields derived from a news row.
+
+These used to be recomputed in ``/api/threats`` for every row on every
+request. They are now computed once when a row is ingested or
+reclassified and stored on the ``news`` row itself; only ``maturity``
+depends on the row's age, so it is evaluated in SQL (``MATURITY_SQL``).
+Keyword scoring itself lives in ``backend/scoring.py``.
+"""
+from backend.scoring import bias_adjusted, location_from, scan, score_batch, scoring_text
+
+# stored column name -> API field name
+DERIVED_COLUMNS = {
+    "threat_type": "threatType",
+    "location_scope": "locationScope",
+    "location_name": "locationName",
+    "severity": "severity",
+    "emergency": "emergency",
+}
+
+CATEGORY_MAP = {
+    "Conflict": "Armed Conflict",
+    "Economy": "Economic Collapse",
+    "Environment": "Climate Change",
+    "Technology": "Technology",
+    "Health": "Pandemic & Health",
+    "Climate": "Climate Change",
+}
+
+
+def map_category(cat):
+    if not cat:
+        return "Unknown"
+    return CATEGORY_MAP.get(cat, cat)
+
+
+def emergency_from(severity):
+    if severity >= 75:
+        return "High"
+    if severity >= 50:
+        return "Medium"
+    return "Low"
+
+
+def _fields(score, regions, source, category, bias):
+    severity = bias_adjusted(score, bias)
+    location_scope, location_name = location_from(regions, source)
+    return (map_category(category), location_scope, location_name, severity, emergency_from(severity))
+
+
+def derive(headline, source, category, bias):
+    """Return the stored threat fields for one row, in DERIVED_COLUMNS order.
+
+    Category and bias text take part in severity scoring (e.g. "Climate");
+    they never name a region, so one scan serves both.
+    """
+    score, regions = scan(scoring_text(headline, category, bias))
+    return _fields(score, regions, source, category, bias)
+
+
+# Same rules as the old Python ``maturity_from``: unparseable timestamps are
+# "Emerging"; whole days of age <= 1 is julianday difference < 2, etc.
+MATURITY_SQL = """CASE
+    WHEN julianday(timestamp) IS NULL THEN 'Emerging'
+    WHEN severity >= 80
+      OR (julianday('now', 'localtime') - julianday(timestamp) < 2 AND severity >= 60) THEN 'Critical'
+    WHEN severity >= 55
+      OR julianday('now', 'localtime') - julianday(timestamp) < 8 THEN 'Escalating'
+    ELSE 'Emerging'
+END"""
+
+
+# columns threat_item() needs, for SELECT lists
+# news.* qualified where a joined table (news_fts) has the same column
+THREAT_SELECT = f"""news.id AS id, news.headline AS headline, source, timestamp, category, bias, threat_type, location_scope,
+                   location_name, severity, emergency, {MATURITY_SQL} AS maturity"""
+
+
+def trend_key(r):
+    """(threat_type, location_name) key into timeseries.trends()."""
+    return (r["threat_type"] or "", r["location_name"] or "")
+
+
+def threat_item(r, trends=None):
+    """API threat item for a row selected with THREAT_SELECT; ``trend`` is
+    looked up in ``trends`` from timeseries.trends()."""
+    severity = r["severity"]
+    return {
+        "id": r["id"],
+        "title": r["headline"],
+        "threatType": r["threat_type"],
+        "locationScope": r["location_scope"],
+        "locationName": r["location_name"],
+        "emergency": r["emergency"],
+        "maturity": r["maturity"],
+        "severity": severity,
+        "sources": [r["source"]],
+        "time": r["timestamp"],
+        # daily counts for the item's threat type and location
+        "trend": (trends or {}).get(trend_key(r), []),
+    }
+
+
+# fields sent once per distinct value in the columnar format
+DICTIONARY_FIELDS = {
+    "threatType": "threat_type",
+    "locationScope": "location_scope",
+    "locationName": "location_name",
+    "emergency": "emergency",
+    "maturity": "maturity",
+}
+
+
+def _dictionary(values):
+    """``(codes, distinct values)``: each value's index in first-seen order."""
+    index = {}
+    codes = [index.setdefault(v, len(index)) for v in values]
+    return codes, list(index)
+
+
+def threat_columns(rows, trends=None, sources=None):
+    """/api/threats items as parallel arrays instead of one dict per item.
+
+    ``columns`` has one list per field, in row order. The
+    DICTIONARY_FIELDS and ``trend`` hold indexes into
+    ``dictionaries[field]``, so a location or a trend series shared by
+    hundreds of items is sent once. ``sources`` (id -> later links, for
+    group=cluster) adds ``sources`` and ``clusterSize`` columns in place
+    of ``source``.
+    """
+    columns = {
+        "id": [r["id"] for r in rows],
+        "title": [r["headline"] for r in rows],
+        "severity": [r["severity"] for r in rows],
+        "time": [r["timestamp"] for r in rows],
+    }
+    if sources is None:
+        columns["source"] = [r["source"] for r in rows]
+    else:
+        columns["sources"] = [[r["source"], *sources.get(r["id"], ())] for r in rows]
+        columns["clusterSize"] = [len(s) for s in columns["sources"]]
+    dictionaries = {}
+    for field, column in DICTIONARY_FIELDS.items():
+        columns[field], dictionaries[field] = _dictionary(r[column] for r in rows)
+    columns["trend"], keys = _dictionary(trend_key(r) for r in rows)
+    dictionaries["trend"] = [(trends or {}).get(key, []) for key in keys]
+    return {"columns": columns, "dictionaries": dictionaries}
+
+
+def backfill_derived(conn, where="severity IS NULL", args=()):
+    """Recompute stored threat fields for rows matching ``where``."""
+    rows = conn.execute(
+        f"SELECT id, headline, source, category, bias FROM news WHERE {where}", args
+    ).fetchall()
+    sets = ", ".join(f"{col}=?" for col in DERIVED_COLUMNS)
+    scores = score_batch([scoring_text(r[1], r[3], r[4]) for r in rows])
+    conn.executemany(
+        f"UPDATE news SET {sets} WHERE id=?",
+        [_fields(score, regions, source, category, bias) + (news_id,)
+         for (news_id, _, source, category, bias), (score, regions) in zip(rows, scores)],
+    )
+    return len(rows)
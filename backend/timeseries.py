@@ -0,0 +1,151 @@
+# timeseries.py
+"""Hourly and daily threat counts, kept up to date by triggers on news.
+
+``news_series`` holds one row per (bucket size, threat type, location,
+bucket), with the row count and severity sum. Insert and update triggers
+adjust those rows in the same transaction that writes ``news``, so reading
+a 90-day series touches at most a few thousand small aggregate rows and
+never the raw news rows. There is no delete trigger: like news_counts, the
+series keeps counting rows that are later moved out of ``news``.
+
+NULL threat types and locations are stored as ''.
+"""
+from datetime import datetime, timedelta
+
+# bucket size -> (strftime format for SQL and Python, step)
+BUCKETS = {
+    "hour": ("%Y-%m-%d %H:00", timedelta(hours=1)),
+    "day": ("%Y-%m-%d", timedelta(days=1)),
+}
+DEFAULT_SPAN = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+MAX_POINTS = 24 * 90  # buckets /api/timeseries may span: an hourly 90-day window
+TREND_DAYS = 7  # daily counts in each threat item's ``trend``
+
+
+def _upsert(size, row, sign):
+    fmt = BUCKETS[size][0]
+    return f"""INSERT INTO news_series (size, threat_type, location_name, bucket, count, severity_sum)
+                   VALUES ('{size}', COALESCE({row}.threat_type, ''), COALESCE({row}.location_name, ''),
+                           strftime('{fmt}', {row}.timestamp), {sign}1, {sign}COALESCE({row}.severity, 0))
+                   ON CONFLICT(size, threat_type, location_name, bucket) DO UPDATE SET
+                       count = count + excluded.count, severity_sum = severity_sum + excluded.severity_sum;"""
+
+
+def create_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS news_series (
+                    size TEXT NOT NULL,
+                    threat_type TEXT NOT NULL,
+                    location_name TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    severity_sum INTEGER NOT NULL,
+                    PRIMARY KEY (size, threat_type, location_name, bucket)
+                ) WITHOUT ROWID''')
+    # unfiltered series sum a bucket range across every key; covering, so
+    # the sum never visits the table
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_news_series_bucket ON news_series(size, bucket, count, severity_sum)")
+    # rows whose timestamp does not parse have no bucket and are skipped
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_series_ai AFTER INSERT ON news
+                WHEN julianday(NEW.timestamp) IS NOT NULL BEGIN
+                    {_upsert('hour', 'NEW', '')}
+                    {_upsert('day', 'NEW', '')}
+                END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_series_au_old
+                AFTER UPDATE OF timestamp, threat_type, location_name, severity ON news
+                WHEN julianday(OLD.timestamp) IS NOT NULL AND (OLD.timestamp IS NOT NEW.timestamp
+                    OR OLD.threat_type IS NOT NEW.threat_type OR OLD.location_name IS NOT NEW.location_name
+                    OR OLD.severity IS NOT NEW.severity) BEGIN
+                    {_upsert('hour', 'OLD', '-')}
+                    {_upsert('day', 'OLD', '-')}
+                END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS news_series_au_new
+                AFTER UPDATE OF timestamp, threat_type, location_name, severity ON news
+                WHEN julianday(NEW.timestamp) IS NOT NULL AND (OLD.timestamp IS NOT NEW.timestamp
+                    OR OLD.threat_type IS NOT NEW.threat_type OR OLD.location_name IS NOT NEW.location_name
+                    OR OLD.severity IS NOT NEW.severity) BEGIN
+                    {_upsert('hour', 'NEW', '')}
+                    {_upsert('day', 'NEW', '')}
+                END""")
+
+
+def backfill(conn):
+    """Rebuild news_series from the rows currently in news."""
+    conn.execute("DELETE FROM news_series")
+    for size, (fmt, _) in BUCKETS.items():
+        conn.execute(f"""INSERT INTO news_series (size, threat_type, location_name, bucket, count, severity_sum)
+                    SELECT '{size}', COALESCE(threat_type, ''), COALESCE(location_name, ''),
+                           strftime('{fmt}', timestamp), COUNT(*), COALESCE(SUM(severity), 0)
+                    FROM news WHERE julianday(timestamp) IS NOT NULL GROUP BY 2, 3, 4""")
+
+
+def parse_time(value):
+    """Naive local datetime from an ISO date or datetime string; raises
+    ValueError. An offset (``Z``, ``+02:00``) is converted to local time,
+    the zone stored timestamps and ``datetime.now()`` use."""
+    dt = datetime.fromisoformat(value.strip().replace("T", " "))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def bucket_labels(size, start, end):
+    """Every bucket label from ``start`` to ``end`` inclusive."""
+    fmt, step = BUCKETS[size]
+    if size == "hour":
+        t = start.replace(minute=0, second=0, microsecond=0)
+    else:
+        t = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    labels = []
+    while t <= end:
+        labels.append(t.strftime(fmt))
+        t += step
+    return labels
+
+
+def series(conn, size, start, end, threat_type=None, location_name=None):
+    """Zero-filled ``[{"t", "count", "severity"}]`` points for one key, or for
+    all types/locations when they are None. ``severity`` is the mean."""
+    labels = bucket_labels(size, start, end)
+    if not labels:
+        return []
+    where, params = ["size = ?", "bucket BETWEEN ? AND ?"], [size, labels[0], labels[-1]]
+    if threat_type is not None:
+        where.append("threat_type = ?")
+        params.append(threat_type)
+    if location_name is not None:
+        where.append("location_name = ?")
+        params.append(location_name)
+    found = {
+        bucket: (count, total)
+        for bucket, count, total in conn.execute(
+            f"""SELECT bucket, SUM(count), SUM(severity_sum) FROM news_series
+                WHERE {' AND '.join(where)} GROUP BY bucket""",
+            params,
+        )
+    }
+    points = []
+    for label in labels:
+        count, total = found.get(label, (0, 0))
+        points.append({"t": label, "count": count,
+                       "severity": round(total / count, 1) if count else None})
+    return points
+
+
+def trends(conn, keys, days=TREND_DAYS, end=None):
+    """Daily counts over the last ``days`` days for each (threat_type,
+    location_name) in ``keys``; returns ``{key: [count, ...]}``, oldest first."""
+    keys = {(t or "", l or "") for t, l in keys}
+    if not keys:
+        return {}
+    end = end or datetime.now()
+    labels = bucket_labels("day", end - timedelta(days=days - 1), end)
+    index = {label: i for i, label in enumerate(labels)}
+    out = {key: [0] * len(labels) for key in keys}
+    for threat_type, location_name in keys:
+        for bucket, count in conn.execute(
+            """SELECT bucket, count FROM news_series
+               WHERE size = 'day' AND threat_type = ? AND location_name = ? AND bucket BETWEEN ? AND ?""",
+            (threat_type, location_name, labels[0], labels[-1]),
+        ):
+            out[(threat_type, location_name)][index[bucket]] = count
+    return out
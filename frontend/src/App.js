@@ -1,4 +1,4 @@
-import React, { useMemo, useState, useEffect } from "react";
+import React, { useMemo, useState, useEffect, useRef } from "react";
 import axios from "axios";
 import FiltersSidebar from "./components/FiltersSidebar";
 import ThreatsTable from "./components/ThreatsTable";
@@ -9,6 +9,28 @@ import BottomSection from "./components/BottomSection";
 import AnalysisPanel from "./components/AnalysisPanel";
 import LoginPage from "./LoginPage";
 
+const POLL_MS = 60000; // without a live stream
+const RESYNC_MS = 5 * 60000; // full refresh alongside the stream
+const STREAM_RETRY_MS = 60000; // reopen a refused stream (the server's Retry-After)
+// backend/streamserver.py, when it is not behind the same origin
+const STREAM_URL = process.env.REACT_APP_STREAM_URL || "/api/stream";
+
+function mergeStats(prev, delta) {
+  const add = (a = {}, b = {}) => {
+    const out = { ...a };
+    Object.entries(b).forEach(([k, v]) => {
+      out[k] = (out[k] || 0) + v;
+    });
+    return out;
+  };
+  return {
+    ...prev,
+    categories: add(prev.categories, delta.categories),
+    severity: add(prev.severity, delta.severity),
+    total: (prev.total || 0) + delta.total,
+  };
+}
+
 function App() {
   const [loggedIn, setLoggedIn] = useState(false);
 
@@ -43,12 +65,77 @@ function App() {
   const [page, setPage] = useState(0);
   const pageSize = 15;
 
+  // latest view state and fetchAll for the live stream handlers and timers
+  const viewRef = useRef({});
+  viewRef.current = { filters, dateFilter, page };
+  const fetchAllRef = useRef(null);
+  fetchAllRef.current = fetchAll; // declared below
+
   useEffect(() => {
     if (!loggedIn) return;
-    fetchAll();
+    const refresh = () => fetchAllRef.current();
+    refresh();
     fetchDates();
-    const id = setInterval(fetchAll, 60000);
-    return () => clearInterval(id);
+
+    // push updates over SSE; fall back to polling without EventSource
+    if (!window.EventSource) {
+      const id = setInterval(refresh, POLL_MS);
+      return () => clearInterval(id);
+    }
+    // the stream only carries new rows; insights, filter options and
+    // reclassified stats still come from a slow full refresh
+    const resyncId = setInterval(refresh, RESYNC_MS);
+    let pollId = null;
+    let reopenId = null;
+    let source = null;
+
+    const open = () => {
+      reopenId = null;
+      source = new EventSource(STREAM_URL);
+      source.addEventListener("threat", onThreat);
+      source.addEventListener("stats", onStats);
+      // missed more rows than the server replays: reload everything
+      source.addEventListener("reset", refresh);
+      source.onopen = () => {
+        if (pollId) {
+          clearInterval(pollId);
+          pollId = null;
+          refresh();
+        }
+      };
+      source.onerror = () => {
+        // EventSource reconnects by itself; poll until it does
+        if (!pollId) pollId = setInterval(refresh, POLL_MS);
+        // a refused stream (503 when the server is full) is closed for good:
+        // try again later
+        if (source.readyState === EventSource.CLOSED && !reopenId) {
+          reopenId = setTimeout(open, STREAM_RETRY_MS);
+        }
+      };
+    };
+
+    const onThreat = (e) => {
+      const item = JSON.parse(e.data);
+      const { filters: f, dateFilter: d, page: p } = viewRef.current;
+      if (p !== 0 || d) return;
+      const matches = Object.entries(f).every(([k, v]) => !v || item[k] === v);
+      if (!matches) return;
+      setNewsRows((rows) =>
+        rows.some((r) => r.id === item.id) ? rows : [item, ...rows].slice(0, pageSize)
+      );
+    };
+    const onStats = (e) => {
+      const delta = JSON.parse(e.data);
+      setStats((prev) => mergeStats(prev, delta));
+    };
+    open();
+
+    return () => {
+      if (source) source.close();
+      clearInterval(resyncId);
+      if (pollId) clearInterval(pollId);
+      if (reopenId) clearTimeout(reopenId);
+    };
   }, [loggedIn]);
 
   async function fetchDates() {
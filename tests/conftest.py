@@ -0,0 +1,21 @@
+"""Shared fixtures: a small synthetic database and a Flask test client.
+
+Run from the repository root with ``python -m pytest``.
+"""
+import pytest
+
+from backend import app as backend_app
+from backend.bench.corpus import build_db
+
+
+@pytest.fixture(scope="session")
+def db_path(tmp_path_factory):
+    # a week of rows is dense enough to form near-duplicate clusters
+    return build_db(str(tmp_path_factory.mktemp("db") / "news.db"), 1000, days=7)
+
+
+@pytest.fixture
+def client(db_path):
+    app = backend_app.create_app(db_path, collect=False)
+    app.config["TESTING"] = True
+    return app.test_client()
@@ -0,0 +1,65 @@
+import json
+import threading
+
+import pytest
+
+from backend import db, export
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    """Pools of one connection that give up after half a second."""
+    db.close_all()
+    monkeypatch.setattr(db, "MAX_OPEN", 1)
+    monkeypatch.setattr(db, "ACQUIRE_TIMEOUT", 0.5)
+    yield
+    db.close_all()
+
+
+def open_export(client, **args):
+    resp = client.get("/api/export", query_string=dict(args, limit=-1), buffered=False,
+                      headers={"Accept-Encoding": "identity"})
+    assert resp.status_code == 200
+    body = iter(resp.response)
+    next(body)  # the query is running and its connection open
+    return resp
+
+
+def test_other_routes_work_while_exports_are_open(client, small_pool):
+    exports = [open_export(client, format="ndjson"), open_export(client, format="csv")]
+    try:
+        assert client.get("/api/stats").status_code == 200
+        assert client.get("/api/threats", query_string={"limit": 5}).status_code == 200
+    finally:
+        for resp in exports:
+            resp.close()
+
+
+def test_exports_past_the_cap_get_503(client, monkeypatch):
+    monkeypatch.setattr(export, "_slots", threading.BoundedSemaphore(1))
+    first = open_export(client)
+    try:
+        refused = client.get("/api/export")
+        assert refused.status_code == 503
+        assert refused.headers["Retry-After"] == str(export.RETRY_AFTER)
+    finally:
+        first.close()
+    resp = client.get("/api/export", query_string={"limit": 1})
+    assert resp.status_code == 200
+
+
+def test_cluster_export_merges_sources(client, db_path):
+    with db.connection(db_path, readonly=True) as conn:
+        leader, size = conn.execute(
+            "SELECT cluster_id, COUNT(*) + 1 FROM news WHERE cluster_id IS NOT NULL "
+            "GROUP BY cluster_id ORDER BY 2 DESC LIMIT 1").fetchone()
+        expected = [r[0] for r in conn.execute(
+            "SELECT source FROM news WHERE id = ? OR cluster_id = ? ORDER BY id", (leader, leader))]
+    resp = client.get("/api/export", query_string={"group": "cluster"}, headers={"Accept-Encoding": "identity"})
+    rows = {row["id"]: row for row in map(json.loads, resp.get_data(as_text=True).splitlines())}
+    assert rows[leader]["sources"] == expected
+    assert rows[leader]["clusterSize"] == size
+    assert all(row["clusterId"] is None for row in rows.values())
+
+    resp = client.get("/api/export", query_string={"group": "cluster", "format": "csv"})
+    assert resp.get_data(as_text=True).splitlines()[0].endswith(",sources,clusterSize")
@@ -0,0 +1,44 @@
+import threading
+import time
+
+from backend import scheduler
+from backend.models import init_db
+
+
+def test_lease_is_kept_through_a_run_longer_than_the_ttl(tmp_path):
+    path = str(tmp_path / "lease.db")
+    init_db(path)
+    ran = {"a": [], "b": []}
+
+    def slow_run(urls):
+        ran["a"].extend(urls)
+        time.sleep(2.5)
+
+    a = scheduler.Scheduler(path, ["https://feed.example/a"], slow_run, tick=0.2, ttl=1)
+    # a feed b would fetch straight away if it ever led
+    b = scheduler.Scheduler(path, ["https://feed.example/b"], ran["b"].extend, tick=0.2, ttl=1)
+    leader = threading.Thread(target=a.step)
+    leader.start()
+    time.sleep(0.1)
+    try:
+        # well past the TTL, while a's run is still going
+        while leader.is_alive():
+            b.step()
+            assert not b.leader
+            time.sleep(0.1)
+    finally:
+        leader.join()
+    assert ran == {"a": ["https://feed.example/a"], "b": []}
+    assert a.leader
+
+
+def test_standby_takes_over_once_renewal_stops(tmp_path):
+    path = str(tmp_path / "lease.db")
+    init_db(path)
+    a = scheduler.Scheduler(path, [], list, ttl=1)
+    b = scheduler.Scheduler(path, [], list, ttl=1)
+    a.step()
+    b.step()
+    assert a.leader and not b.leader
+    b.step(now=time.time() + 1.5)
+    assert b.leader
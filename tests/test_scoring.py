@@ -0,0 +1,20 @@
+from backend import scoring
+from backend.bench.corpus import synthetic_headlines
+
+
+def test_score_batch_matches_scan():
+    headlines = synthetic_headlines(200) + ["", None, "bus crash", "US and UK warn of war"]
+    assert scoring.score_batch(headlines) == [scoring.scan(h) for h in headlines]
+
+
+def test_word_boundaries():
+    assert scoring.scan("bus drivers protest") == (60, [])
+    assert scoring.scan("US storms hit Britain") == (40, ["UK", "US"])
+
+
+def test_host_fallback_for_stored_fields():
+    assert scoring.location_from([], "https://www.bbc.co.uk/news/1") == ("Region", "UK")
+    assert scoring.location_from([], "https://news.example.co.uk/a") == ("Region", "UK")
+    # stored rows have never placed CNN by host; /api/analysis does
+    assert scoring.location_from([], "https://edition.cnn.com/a") == ("Global", "Global")
+    assert scoring.location_from(["India"], "https://edition.cnn.com/a") == ("Country", "India")
@@ -0,0 +1,71 @@
+import asyncio
+import sqlite3
+import time
+
+from backend import stream, streamserver
+from backend.bench.corpus import build_db
+from backend.models import INSERT_NEWS_SQL
+from backend.threats import derive
+
+
+def head(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT MAX(id) FROM news").fetchone()[0]
+
+
+def insert_row(path, headline="War fears grow in Gaza"):
+    row = (headline, f"https://example.com/{time.time()}", time.strftime("%Y-%m-%d %H:%M:%S"), "Politics", "Left")
+    with sqlite3.connect(path) as conn:
+        conn.execute(INSERT_NEWS_SQL, row + derive(row[0], row[1], row[3], row[4]))
+
+
+def test_resume_replays_a_short_gap(db_path):
+    hub = stream.Broadcaster(db_path)
+    hub.last_id = position = head(db_path)
+    frames, resumed = hub.resume(position, position - 3)
+    assert resumed == position
+    assert sum(f.startswith("id:") and "event: threat" in f for f in frames) == 3
+
+
+def test_resume_past_the_limit_sends_reset(db_path, monkeypatch):
+    monkeypatch.setattr(stream, "RESUME_LIMIT", 5)
+    hub = stream.Broadcaster(db_path)
+    hub.last_id = position = head(db_path)
+    frames, resumed = hub.resume(position, position - 50)
+    assert resumed == position
+    assert not any("event: threat" in f for f in frames)
+    assert frames[-1] == stream.format_event(position, "reset", {"missed": "over 5"})
+
+
+def test_streamserver_fans_out_new_rows(tmp_path):
+    path = build_db(str(tmp_path / "stream.db"), 50, days=2)
+
+    async def read_until(reader, marker):
+        buf = b""
+        while marker not in buf:
+            buf += await asyncio.wait_for(reader.read(65536), 10)
+        return buf
+
+    async def run():
+        server = await streamserver.start(path, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        clients = []
+        try:
+            for _ in range(20):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"GET /api/stream HTTP/1.1\r\nHost: test\r\n\r\n")
+                clients.append((reader, writer))
+            for reader, _ in clients:
+                assert (await read_until(reader, b"retry:")).startswith(b"HTTP/1.1 200 OK")
+            assert stream.get_broadcaster(path).subscribers == 20
+            insert_row(path)
+            stream.get_broadcaster(path).notify()
+            for reader, _ in clients:
+                assert b"Gaza" in await read_until(reader, b"event: stats")
+        finally:
+            for _, writer in clients:
+                writer.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
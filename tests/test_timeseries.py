@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta, timezone
+
+from backend import timeseries
+
+
+def test_parse_time_converts_offsets_to_naive_local():
+    utc = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    parsed = timeseries.parse_time("2024-05-01T00:00:00Z")
+    assert parsed.tzinfo is None
+    assert parsed == utc.astimezone().replace(tzinfo=None)
+    assert timeseries.parse_time("2024-05-01") == datetime(2024, 5, 1)
+
+
+def test_timeseries_accepts_utc_bounds(client):
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=3)
+    resp = client.get("/api/timeseries", query_string={
+        "from": start.strftime("%Y-%m-%dT%H:%M:%S.000Z"), "to": end.strftime("%Y-%m-%dT%H:%M:%S.000Z")})
+    assert resp.status_code == 200
+    assert len(resp.get_json()["points"]) == 4
+
+
+def test_timeseries_from_with_offset_and_default_to(client):
+    start = (datetime.now(timezone.utc) - timedelta(days=2)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    resp = client.get("/api/timeseries", query_string={"from": start})
+    assert resp.status_code == 200
+
+
+def test_timeseries_rejects_reversed_range(client):
+    resp = client.get("/api/timeseries", query_string={"from": "2024-05-02T00:00:00Z", "to": "2024-05-01"})
+    assert resp.status_code == 400